@@ -0,0 +1,116 @@
+"""
+Compares the daily_data write paths per database dialect:
+the original to_dict("records") + 500-row INSERT ... ON CONFLICT batches versus each
+bulk_upsert strategy available on that dialect (COPY + merge and multi-row VALUES on
+PostgreSQL, executemany on SQLite), and checks that they store identical rows.
+
+Each strategy writes to its own fresh stocks inside one transaction that is rolled
+back, so the database is left untouched. By default it runs against DATABASE_URL
+and a temporary SQLite file.
+
+Usage: python benchmarks/bench_bulk_load.py [n_symbols] [n_days] [db_url ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from config import DATABASE_URL  # noqa: E402
+from src.data.fetcher import DatabaseManager, StockRepository  # noqa: E402
+from src.database.init_db import Base, DailyData  # noqa: E402
+from src.database.upsert import bulk_upsert  # noqa: E402
+
+STRATEGIES = {
+    "postgresql": ["copy", "values"],
+    "sqlite": ["executemany"],
+}
+
+
+def make_daily_frame(stock_ids, n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2015-01-01", periods=n_days).date
+    n = len(stock_ids) * n_days
+    close = np.abs(100 + rng.normal(0, 1, n).cumsum())
+    return pd.DataFrame(
+        {
+            "stock_id": np.repeat(stock_ids, n_days),
+            "date": np.tile(dates, len(stock_ids)),
+            "open": close * 0.99,
+            "high": close * 1.01,
+            "low": close * 0.98,
+            "close": close,
+            "volume": rng.integers(1_000, 1_000_000, n),
+        }
+    )
+
+
+def stored_checksum(session, stock_ids):
+    # Sum of closes and volumes of the rows written for these stocks
+    rows = (
+        session.query(DailyData.close, DailyData.volume)
+        .filter(DailyData.stock_id.in_(stock_ids))
+        .all()
+    )
+    return len(rows), round(sum(r[0] for r in rows), 6), sum(r[1] for r in rows)
+
+
+def run(db_url, n_symbols, n_days):
+    db_manager = DatabaseManager(db_url)
+    Base.metadata.create_all(db_manager.engine)
+    dialect = db_manager.engine.dialect.name
+    strategies = ["legacy"] + STRATEGIES[dialect]
+
+    session = db_manager.Session()
+    try:
+        repository = StockRepository(session)
+        symbols = [f"BENCH{i}.TO" for i in range(len(strategies) * n_symbols)]
+        stock_ids = list(
+            repository.resolve_stock_ids(symbols, create_missing=True).values()
+        )
+
+        print(f"{dialect}: {n_symbols * n_days:,} rows ({n_symbols} x {n_days} days)")
+        checksums = set()
+        for i, strategy in enumerate(strategies):
+            ids = stock_ids[i * n_symbols : (i + 1) * n_symbols]
+            daily_df = make_daily_frame(ids, n_days)
+
+            started = time.perf_counter()
+            if strategy == "legacy":
+                repository.bulk_upsert_daily_data(daily_df.to_dict("records"))
+            else:
+                bulk_upsert(
+                    session,
+                    DailyData.__table__,
+                    daily_df,
+                    ["stock_id", "date"],
+                    strategy=strategy,
+                )
+            session.flush()
+            elapsed = time.perf_counter() - started
+
+            checksums.add(stored_checksum(session, ids))
+            print(f"  {strategy:<12} {len(daily_df) / elapsed:12,.0f} rows/s")
+        print(f"  identical results: {len(checksums) == 1}")
+    finally:
+        session.rollback()
+        session.close()
+        StockRepository.clear_stock_id_cache()
+
+
+def main(n_symbols=200, n_days=1000, db_urls=None):
+    if not db_urls:
+        sqlite_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        db_urls = [DATABASE_URL, f"sqlite:///{sqlite_path}"]
+    for db_url in db_urls:
+        run(db_url, n_symbols, n_days)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(*[int(arg) for arg in args[:2]], db_urls=args[2:])
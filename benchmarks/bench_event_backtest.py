@@ -0,0 +1,94 @@
+"""
+Bars per second of the event-driven backtester on a synthetic universe streamed
+one date at a time, as DataService.iter_bars_by_date and
+AnalyticsSnapshot.iter_bars_by_date deliver it (a frame per date, turned into
+BarBatches), and its peak traced memory for half and all of the history, which
+should stay about the same.
+
+Usage: python benchmarks/bench_event_backtest.py [n_symbols] [n_days] [strategy]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.backtesting.events import (  # noqa: E402
+    BAR_COLUMNS,
+    EventBacktester,
+    bar_batches,
+)
+from src.backtesting.strategies import strategy_registry  # noqa: E402
+
+RSI_PERIOD = 14
+
+
+def stream_frames(symbols, n_days, seed=0):
+    # (date, frame) per date from per-symbol random walks; Wilder RSI and
+    # SMA200 are updated incrementally, so nothing grows with the history
+    rng = np.random.default_rng(seed)
+    n = len(symbols)
+    close = np.full(n, 100.0)
+    avg_gain = np.zeros(n)
+    avg_loss = np.zeros(n)
+    window = np.full((200, n), 100.0)
+    symbol_column = pd.Categorical(symbols)
+    for i, date in enumerate(pd.bdate_range("2015-01-01", periods=n_days)):
+        open_ = close * np.exp(rng.normal(0, 0.005, n))
+        new_close = open_ * np.exp(rng.normal(0, 0.02, n))
+        change = new_close - close
+        avg_gain += (np.maximum(change, 0) - avg_gain) / RSI_PERIOD
+        avg_loss += (np.maximum(-change, 0) - avg_loss) / RSI_PERIOD
+        close = new_close
+        window[i % 200] = close
+        yield date, pd.DataFrame(
+            {
+                "symbol": symbol_column,
+                "date": date,
+                "open": open_,
+                "high": np.maximum(open_, close) * 1.005,
+                "low": np.minimum(open_, close) * 0.995,
+                "close": close,
+                "volume": 100_000,
+                "RSI": 100 - 100 / (1 + avg_gain / np.maximum(avg_loss, 1e-12)),
+                "SMA50": window[(i - np.arange(50)) % 200].mean(axis=0),
+                "SMA200": window.mean(axis=0),
+            }
+        )
+
+
+def run(n_symbols, n_days, strategy_name):
+    symbols = [f"BENCH{i}.TO" for i in range(n_symbols)]
+    strategy = strategy_registry[strategy_name]()
+    columns = BAR_COLUMNS + ["RSI", "SMA50", "SMA200"]
+    batches = bar_batches(stream_frames(symbols, n_days), symbols, columns)
+    return EventBacktester(strategy, fee=0.001).run(batches, symbols)
+
+
+def main(n_symbols=1700, n_days=2520, strategy_name="trend_pullback"):
+    print(f"{strategy_name} on {n_days} days × {n_symbols} symbols")
+    started = time.perf_counter()
+    result = run(n_symbols, n_days, strategy_name)
+    elapsed = time.perf_counter() - started
+    summary = result.summary()
+    print(
+        f"  event-driven   {elapsed:8.2f}s  {result.bars / elapsed:12,.0f} bars/s  "
+        f"({summary['trades']:,} trades, total return {summary['total_return']:.1%})"
+    )
+
+    for days in (n_days // 2, n_days):
+        tracemalloc.start()
+        run(n_symbols, days, strategy_name)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  peak traced memory, {days:5} days  {peak / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(*[int(arg) for arg in args[:2]], *args[2:3])
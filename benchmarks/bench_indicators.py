@@ -0,0 +1,104 @@
+"""
+Per-symbol loop over the pandas functions in src/analysis/indicators.py versus
+the (bar × symbol) matrix engine in src/analysis/batch.py, computing every
+indicator and only RSI, on a synthetic universe held in memory (no database).
+
+Usage: python benchmarks/bench_indicators.py [n_symbols] [n_bars]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.analysis.batch import (  # noqa: E402
+    build_price_matrix,
+    calculate_indicator_matrix,
+)
+from src.analysis.indicators import (  # noqa: E402
+    bollinger_bands,
+    ema,
+    macd,
+    rsi,
+    sma,
+)
+
+
+def make_closes(n_symbols, n_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2015-01-01", periods=n_bars)
+    # Ragged histories, like recent listings in the real universe
+    lengths = rng.integers(n_bars // 2, n_bars + 1, n_symbols)
+    parts = [
+        pd.DataFrame(
+            {
+                "stock_id": stock_id,
+                "date": dates[-length:],
+                "close": np.abs(100 + rng.normal(0, 1, length).cumsum()),
+            }
+        )
+        for stock_id, length in enumerate(lengths)
+    ]
+    return pd.concat(parts, ignore_index=True)
+
+
+def pandas_indicators(close_prices, time_frame="daily"):
+    # Every column, one pandas call per indicator
+    indicators = pd.DataFrame(index=close_prices.index)
+    for period in (12, 26, 50, 200):
+        indicators[f"SMA{period}"] = sma(close_prices, period, time_frame=time_frame)
+    for period in (12, 26, 50, 200):
+        indicators[f"EMA{period}"] = ema(close_prices, period, time_frame=time_frame)
+    indicators["RSI"] = rsi(close_prices, 14, time_frame=time_frame)
+    macd_data = macd(close_prices, time_frame=time_frame)
+    indicators["MACD"] = macd_data["MACD"]
+    indicators["MACD_Signal"] = macd_data["Signal"]
+    indicators["MACD_Histogram"] = macd_data["Histogram"]
+    bollinger_data = bollinger_bands(close_prices, time_frame=time_frame)
+    indicators["BB_Middle"] = bollinger_data["SMA"]
+    indicators["BB_Upper"] = bollinger_data["Upper"]
+    indicators["BB_Lower"] = bollinger_data["Lower"]
+    return indicators
+
+
+def main(n_symbols=1700, n_bars=2500):
+    closes = make_closes(n_symbols, n_bars)
+    print(f"{n_symbols} symbols, up to {n_bars} bars ({len(closes):,} closes)")
+
+    started = time.perf_counter()
+    per_symbol = {
+        stock_id: pandas_indicators(group.set_index("date")["close"])
+        for stock_id, group in closes.groupby("stock_id")
+    }
+    loop = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matrix = build_price_matrix(closes)
+    results = calculate_indicator_matrix(matrix.values)
+    batch = time.perf_counter() - started
+
+    # Only what the RSI screener needs: the graph skips every other indicator
+    started = time.perf_counter()
+    calculate_indicator_matrix(matrix.values, outputs=["RSI"])
+    rsi_only = time.perf_counter() - started
+
+    # Compare the latest bar of every symbol
+    worst = 0.0
+    for col, stock_id in enumerate(matrix.keys):
+        expected = per_symbol[stock_id].iloc[-1]
+        for name, values in results.items():
+            if not np.isnan(expected[name]):
+                worst = max(worst, abs(values[-1, col] - expected[name]))
+
+    print(f"  per-symbol loop: {loop:7.2f}s")
+    print(f"  matrix engine:   {batch:7.2f}s  ({loop / batch:.1f}x)")
+    print(f"  RSI only:        {rsi_only:7.2f}s")
+    print(f"  max abs difference on latest bars: {worst:.2e}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,62 @@
+"""
+Summary metrics of many equity curves: a loop calling summary_metrics per
+curve versus run_metrics over the (runs × bars) return matrix, and the
+per-bar cost of RunningMetrics.
+
+Usage: python benchmarks/bench_metrics.py [n_runs] [n_bars]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.backtesting.metrics import (  # noqa: E402
+    RunningMetrics,
+    run_metrics,
+    summary_metrics,
+)
+
+# Curves timed in the per-curve loop (it is extrapolated to n_runs)
+LOOP_RUNS = 200
+
+# Trades per curve
+TRADES_PER_RUN = 50
+
+
+def main(n_runs=10_000, n_bars=2500):
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0.0003, 0.01, (n_runs, n_bars))
+    exposure = rng.random((n_runs, n_bars))
+    trade_returns = rng.normal(0.01, 0.05, n_runs * TRADES_PER_RUN)
+    runs = np.repeat(np.arange(n_runs), TRADES_PER_RUN)
+    print(f"{n_runs} curves × {n_bars} bars, {len(trade_returns)} trades")
+
+    started = time.perf_counter()
+    for run in range(min(LOOP_RUNS, n_runs)):
+        summary_metrics(
+            returns[run],
+            trade_returns[runs == run],
+            exposure[run],
+        )
+    loop_time = (time.perf_counter() - started) / min(LOOP_RUNS, n_runs) * n_runs
+    print(f"  per-curve loop     {loop_time:8.3f}s (extrapolated)")
+
+    started = time.perf_counter()
+    run_metrics(returns, trade_returns, runs, exposure)
+    batch_time = time.perf_counter() - started
+    print(f"  run_metrics        {batch_time:8.3f}s ({loop_time / batch_time:.0f}x)")
+
+    metrics = RunningMetrics()
+    started = time.perf_counter()
+    for ret, exp in zip(returns[0].tolist(), exposure[0].tolist()):
+        metrics.update(ret, exp)
+    per_bar = (time.perf_counter() - started) / n_bars
+    print(f"  RunningMetrics     {per_bar * 1e6:8.2f}µs per bar")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,91 @@
+"""
+Serial daily + weekly update_indicators versus update_indicators_parallel with a
+growing number of worker processes, on a synthetic universe loaded into a fresh
+SQLite file (or the database at db_url). The indicators table is cleared before
+each run, so every run computes and writes all rows.
+
+Usage: python benchmarks/bench_parallel_indicators.py [n_symbols] [n_days] [db_url]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.data.fetcher import DataService, StockRepository  # noqa: E402
+from src.database.init_db import Base, IndicatorValues  # noqa: E402
+
+START_DATE = "2016-01-01"
+END_DATE = "2030-12-31"
+
+
+def load_universe(data_service, n_symbols, n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2015-01-01", periods=n_days).date
+    symbols = [f"BENCH{i}.TO" for i in range(n_symbols)]
+    with data_service.db_manager.session_scope() as session:
+        repository = StockRepository(session)
+        stock_ids = list(
+            repository.resolve_stock_ids(symbols, create_missing=True).values()
+        )
+        n = n_symbols * n_days
+        close = np.abs(100 + rng.normal(0, 1, n).cumsum())
+        repository.upsert_daily_data(
+            pd.DataFrame(
+                {
+                    "stock_id": np.repeat(stock_ids, n_days),
+                    "date": np.tile(dates, n_symbols),
+                    "open": close,
+                    "high": close,
+                    "low": close,
+                    "close": close,
+                    "volume": rng.integers(1_000, 1_000_000, n),
+                }
+            )
+        )
+        repository.rebuild_weekly_data(stock_ids)
+    return symbols
+
+
+def clear_indicators(data_service):
+    with data_service.db_manager.session_scope() as session:
+        session.query(IndicatorValues).delete(synchronize_session=False)
+
+
+def main(n_symbols=1000, n_days=2500, db_url=None):
+    if not db_url:
+        db_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    data_service = DataService(db_url)
+    Base.metadata.create_all(data_service.db_manager.engine)
+    symbols = load_universe(data_service, n_symbols, n_days)
+    print(f"{n_symbols} symbols x {n_days} days, {os.cpu_count()} CPU cores")
+
+    clear_indicators(data_service)
+    started = time.perf_counter()
+    for time_frame in ("daily", "weekly"):
+        data_service.update_indicators(
+            symbols, START_DATE, END_DATE, time_frame=time_frame
+        )
+    serial = time.perf_counter() - started
+    print(f"  serial      {serial:8.2f}s")
+
+    workers = 1
+    while workers <= os.cpu_count():
+        clear_indicators(data_service)
+        started = time.perf_counter()
+        data_service.update_indicators_parallel(
+            symbols, START_DATE, END_DATE, workers=workers
+        )
+        elapsed = time.perf_counter() - started
+        print(f"  {workers:>2} workers  {elapsed:8.2f}s  ({serial / elapsed:.1f}x)")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(*[int(arg) for arg in args[:2]], db_url=args[2] if len(args) > 2 else None)
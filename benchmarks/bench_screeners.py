@@ -0,0 +1,123 @@
+"""
+Throughput of the registered screeners on a synthetic universe: the previous
+pandas CompositeScreener (each screener building its own Series temporaries,
+shift(1) on the long frame) versus the compiled expression engine, which
+evaluates all screeners together per symbol. Also counts the rows where the
+two disagree, i.e. the crosses the long-frame shift(1) reported across symbol
+boundaries, and times the report stage of run_screener (latest stats and price
+history of every matching symbol) with a groupby per screener versus
+CompositeScreener.run.
+
+Usage: python benchmarks/bench_screeners.py [n_symbols] [n_days]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.analysis.screeners import (  # noqa: E402
+    CompositeScreener,
+    ExpressionScreener,
+    screener_registry,
+)
+
+COLUMNS = ["close", "RSI", "MACD", "MACD_Signal", "SMA50", "SMA200"]
+COLUMNS += ["BB_Upper", "BB_Lower"]
+
+
+def make_frame(n_symbols, n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    n = n_symbols * n_days
+    frame = {
+        "symbol": np.repeat([f"BENCH{i}.TO" for i in range(n_symbols)], n_days),
+        "date": np.tile(pd.bdate_range("2015-01-01", periods=n_days), n_symbols),
+    }
+    for name in COLUMNS:
+        walk = rng.normal(0, 1, (n_symbols, n_days)).cumsum(axis=1) + 100
+        frame[name] = walk.ravel().astype(np.float32)
+    frame["RSI"] = rng.uniform(0, 100, n).astype(np.float32)
+    df = pd.DataFrame(frame)
+    # As returned by DataService.get_stock_data_with_indicators
+    df["symbol"] = df["symbol"].astype("category")
+    return df
+
+
+def pandas_masks(data):
+    # The screeners as written before the expression engine
+    def cross_above(a, b):
+        return (data[a] > data[b]) & (data[a].shift(1) <= data[b].shift(1))
+
+    def cross_below(a, b):
+        return (data[a] < data[b]) & (data[a].shift(1) >= data[b].shift(1))
+
+    return {
+        "rsi_oversold": data["RSI"] < 30,
+        "macd_bullish_cross": cross_above("MACD", "MACD_Signal"),
+        "bollinger_breakout": data["close"] > data["BB_Upper"],
+        "golden_cross": cross_above("SMA50", "SMA200"),
+        "macd_bearish_cross": cross_below("MACD", "MACD_Signal"),
+        "death_cross": cross_below("SMA50", "SMA200"),
+        "bollinger_breakdown": data["close"] < data["BB_Lower"],
+    }
+
+
+def main(n_symbols=1700, n_days=2500):
+    data = make_frame(n_symbols, n_days)
+    names = list(pandas_masks(data.head()))
+    screeners = [screener_registry[name]() for name in names]
+    assert all(isinstance(s, ExpressionScreener) for s in screeners)
+    print(f"{len(names)} screeners on {len(data):,} rows ({n_symbols} symbols)")
+
+    started = time.perf_counter()
+    expected = pandas_masks(data)
+    combined = pd.concat(list(expected.values()), axis=1).any(axis=1)
+    pandas_time = time.perf_counter() - started
+    print(f"  pandas CompositeScreener  {len(data) / pandas_time:14,.0f} rows/s")
+
+    composite = CompositeScreener(screeners, mode="OR")
+    started = time.perf_counter()
+    masks = composite.masks(data)
+    compiled = np.logical_or.reduce(masks)
+    compiled_time = time.perf_counter() - started
+    print(
+        f"  compiled expressions      {len(data) / compiled_time:14,.0f} rows/s "
+        f"({pandas_time / compiled_time:.1f}x)"
+    )
+
+    first_bars = (data["symbol"] != data["symbol"].shift(1)).to_numpy()
+    for name, mask in zip(names, masks):
+        differs = expected[name].to_numpy() != mask
+        assert not (differs & ~first_bars).any(), name
+        if differs.any():
+            print(f"  {name}: {differs.sum()} cross(es) at symbol boundaries dropped")
+    print(f"  combined rows: pandas {combined.sum()}, compiled {compiled.sum()}")
+
+    # Report stage of run_screener: per-screener groupby over the matched rows
+    # versus one CompositeScreener.run and its ScreeningResult
+    stats = {"latest_price": "close", "rsi": "RSI", "sma50": "SMA50"}
+    started = time.perf_counter()
+    for name in names:
+        screened = data[expected[name]]
+        for symbol, df_symbol in screened.groupby("symbol", observed=True):
+            last_row = df_symbol.iloc[-1]
+            {key: last_row.get(column) for key, column in stats.items()}
+            df_symbol[["date", "close"]].sort_values("date").reset_index(drop=True)
+    groupby_time = time.perf_counter() - started
+    print(f"  report, groupby per screener  {groupby_time:8.2f}s")
+
+    started = time.perf_counter()
+    composite.run(data).detailed_results(stats)
+    run_time = time.perf_counter() - started
+    print(
+        f"  report, ScreeningResult       {run_time:8.2f}s "
+        f"({groupby_time / run_time:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,73 @@
+"""
+Time to load the whole universe's daily bars + indicators from the database
+(get_stock_data_with_indicators) versus from the Parquet snapshot, full width and
+with a screener-sized column projection, on a synthetic universe loaded into a
+fresh SQLite file (or the database at db_url).
+
+Usage: python benchmarks/bench_snapshot.py [n_symbols] [n_days] [db_url]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench_parallel_indicators import END_DATE, START_DATE, load_universe  # noqa: E402
+from src.data.fetcher import DataService  # noqa: E402
+from src.data.snapshot import AnalyticsSnapshot  # noqa: E402
+from src.database.init_db import Base  # noqa: E402
+
+SCREENER_COLUMNS = ["close", "RSI", "MACD", "MACD_Signal", "SMA50", "SMA200"]
+
+
+def timed(label, load, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        df = load()
+        best = min(best, time.perf_counter() - started)
+    print(f"  {label:<28} {best:8.3f}s  {len(df):,} rows x {df.shape[1]} columns")
+
+
+def main(n_symbols=1000, n_days=2500, db_url=None):
+    workdir = tempfile.mkdtemp()
+    if not db_url:
+        db_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    data_service = DataService(db_url)
+    Base.metadata.create_all(data_service.db_manager.engine)
+    symbols = load_universe(data_service, n_symbols, n_days)
+    data_service.update_indicators(symbols, START_DATE, END_DATE)
+
+    snapshot = AnalyticsSnapshot(os.path.join(workdir, "snapshot"))
+    started = time.perf_counter()
+    snapshot.export(data_service, START_DATE, END_DATE, time_frames=("daily",))
+    print(f"export: {time.perf_counter() - started:.2f}s")
+
+    timed(
+        "database",
+        lambda: data_service.get_stock_data_with_indicators(
+            symbols, START_DATE, END_DATE
+        ),
+        repeat=1,
+    )
+    timed(
+        "database, screener columns",
+        lambda: data_service.get_stock_data_with_indicators(
+            symbols, START_DATE, END_DATE, indicators=SCREENER_COLUMNS[1:]
+        ),
+        repeat=1,
+    )
+    timed("snapshot", lambda: snapshot.read(start_date=START_DATE, end_date=END_DATE))
+    timed(
+        "snapshot, screener columns",
+        lambda: snapshot.read(
+            columns=SCREENER_COLUMNS, start_date=START_DATE, end_date=END_DATE
+        ),
+    )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(*[int(arg) for arg in args[:2]], db_url=args[2] if len(args) > 2 else None)
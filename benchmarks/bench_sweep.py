@@ -0,0 +1,82 @@
+"""
+Parameter sweep throughput on a synthetic universe: a serial loop that
+recomputes the strategy's indicator columns for every parameter set versus
+run_sweep, which shares the market matrices with its workers and reuses
+computed columns across parameter sets with the same periods.
+
+Usage: python benchmarks/bench_sweep.py [n_symbols] [n_days] [strategy] [workers]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.analysis.batch import calculate_indicator_matrix  # noqa: E402
+from src.backtesting.strategies import strategy_registry  # noqa: E402
+from src.backtesting.sweep import parameter_grid, run_sweep  # noqa: E402
+from src.backtesting.vectorized import MarketData, run_backtest  # noqa: E402
+
+# Parameter sets timed in the serial loop (it is extrapolated to the grid)
+SERIAL_RUNS = 8
+
+
+def make_market(n_symbols, n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(rng.normal(0, 0.02, (n_days, n_symbols)).cumsum(axis=0))
+    columns = {
+        "open": close * np.exp(rng.normal(0, 0.005, (n_days, n_symbols))),
+        "close": close,
+        **calculate_indicator_matrix(close),
+    }
+    return MarketData(
+        pd.bdate_range("2015-01-01", periods=n_days).to_numpy(),
+        np.array([f"BENCH{i}.TO" for i in range(n_symbols)]),
+        columns,
+    )
+
+
+def main(n_symbols=1700, n_days=2520, strategy_name="rsi_reversion", workers=None):
+    market = make_market(n_symbols, n_days)
+    strategy_class = strategy_registry[strategy_name]
+    param_sets = parameter_grid(strategy_class.grid)
+    print(
+        f"{strategy_name}: {len(param_sets)} parameter sets on "
+        f"{n_days} days × {n_symbols} symbols"
+    )
+
+    started = time.perf_counter()
+    for params in param_sets[:SERIAL_RUNS]:
+        # Each run with its own copy of the market and no column reuse
+        copy = MarketData(
+            market.dates,
+            market.symbols,
+            {name: matrix.copy() for name, matrix in market.columns.items()},
+        )
+        entries, exits = strategy_class(**params).signals(copy)
+        run_backtest(copy, entries, exits, fee=0.001)
+    serial_time = time.perf_counter() - started
+    serial_rate = min(SERIAL_RUNS, len(param_sets)) / serial_time
+    print(f"  serial loop   {serial_rate:8.2f} sets/s")
+
+    started = time.perf_counter()
+    results = run_sweep(market, strategy_name, workers=workers, fee=0.001)
+    sweep_time = time.perf_counter() - started
+    print(
+        f"  run_sweep     {len(results) / sweep_time:8.2f} sets/s "
+        f"({workers or os.cpu_count()} workers, {sweep_time:.1f}s, "
+        f"{len(results) / sweep_time / serial_rate:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(
+        *[int(arg) for arg in args[:2]],
+        *args[2:3],
+        *[int(arg) for arg in args[3:4]],
+    )
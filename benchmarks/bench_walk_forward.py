@@ -0,0 +1,93 @@
+"""
+Walk-forward optimization time on a synthetic universe: a naive loop that
+recomputes each parameter set's indicator columns and signals on every
+window's bars versus run_walk_forward, which computes them once over the full
+history, slices them per window and runs parameter-set chunks on a process
+pool.
+
+Usage: python benchmarks/bench_walk_forward.py [n_symbols] [n_days] [strategy] [windows] [workers]
+"""
+
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench_sweep import make_market  # noqa: E402
+from src.backtesting.strategies import strategy_registry  # noqa: E402
+from src.backtesting.sweep import parameter_grid  # noqa: E402
+from src.backtesting.vectorized import run_backtest  # noqa: E402
+from src.backtesting.walkforward import (  # noqa: E402
+    IN_SAMPLE_BARS,
+    _market_slice,
+    run_walk_forward,
+    walk_forward_windows,
+)
+
+# (parameter set, window) pairs timed in the naive loop (it is extrapolated)
+NAIVE_RUNS = 8
+
+
+def main(
+    n_symbols=1700,
+    n_days=2520,
+    strategy_name="rsi_reversion",
+    n_windows=20,
+    workers=None,
+):
+    market = make_market(n_symbols, n_days)
+    strategy_class = strategy_registry[strategy_name]
+    param_sets = parameter_grid(strategy_class.grid)
+    in_sample = min(IN_SAMPLE_BARS, n_days // 2)
+    out_of_sample = math.ceil((n_days - in_sample) / n_windows)
+    windows = walk_forward_windows(n_days, in_sample, out_of_sample)
+    print(
+        f"{strategy_name}: {len(param_sets)} parameter sets × {len(windows)} "
+        f"windows ({in_sample}/{out_of_sample} bars) on "
+        f"{n_days} days × {n_symbols} symbols"
+    )
+
+    started = time.perf_counter()
+    for params, window in list(zip(param_sets, windows))[:NAIVE_RUNS]:
+        # Signals recomputed on the window's bars for every combination
+        for start, end in (
+            (window.in_start, window.in_end),
+            (window.in_end, window.out_end),
+        ):
+            view = _market_slice(market, start, end)
+            entries, exits = strategy_class(**params).signals(view)
+            run_backtest(view, entries, exits, fee=0.001)
+    naive_time = (
+        (time.perf_counter() - started)
+        / min(NAIVE_RUNS, len(param_sets), len(windows))
+        * len(param_sets)
+        * len(windows)
+    )
+    print(f"  naive loop        {naive_time:8.1f}s (extrapolated)")
+
+    started = time.perf_counter()
+    result = run_walk_forward(
+        market,
+        strategy_name,
+        in_sample=in_sample,
+        out_of_sample=out_of_sample,
+        workers=workers,
+        fee=0.001,
+    )
+    elapsed = time.perf_counter() - started
+    print(
+        f"  run_walk_forward  {elapsed:8.1f}s ({workers or os.cpu_count()} workers, "
+        f"{naive_time / elapsed:.1f}x), out-of-sample Sharpe "
+        f"{result.summary()['sharpe']:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(
+        *[int(arg) for arg in args[:2]],
+        *args[2:3],
+        *[int(arg) for arg in args[3:5]],
+    )
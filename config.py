@@ -1,6 +1,6 @@
 import os
-import json
-import requests
+
+from src.data.universe import SymbolUniverse
 
 # Database
 DB_USER = "shaun"
@@ -11,12 +11,17 @@ DB_NAME = "pytrade"
 
 # SQLAlchemy Database URL
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Single-file alternative (see `python src/database/init_db.py`):
+# DATABASE_URL = "sqlite:///data/stocks.db"
 
 
 # Data
 def load_tsx_symbols():
+    import requests
+
     url = "https://www.tsx.com/json/company-directory/search/tsx/%5E*"
-    response = requests.get(url)
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
     data = response.json()
 
     symbols = []
@@ -30,9 +35,35 @@ def load_tsx_symbols():
     return symbols
 
 
-TSX_SYMBOLS = load_tsx_symbols()
-# TSX_SYMBOLS = load_tsx_symbols()[0:10]
-# TSX_SYMBOLS = ["SU.TO", "ABX.TO"]
+# The TSX directory is cached on disk and only loaded when first used
+TSX_SYMBOLS_CACHE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "tsx_symbols.json"
+)
+TSX_SYMBOLS_TTL = 24 * 60 * 60  # seconds
+TSX_UNIVERSE = SymbolUniverse(load_tsx_symbols, TSX_SYMBOLS_CACHE, ttl=TSX_SYMBOLS_TTL)
+
+
+def __getattr__(name):
+    # `config.TSX_SYMBOLS` resolves lazily so importing config never blocks on HTTP
+    if name == "TSX_SYMBOLS":
+        return TSX_UNIVERSE.symbols
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 START_DATE = "2025-01-10"
 END_DATE = "2025-12-31"
+
+# Downloads: symbols per request, concurrent requests, retries per failed chunk
+DOWNLOAD_CHUNK_SIZE = 100
+DOWNLOAD_WORKERS = 4
+DOWNLOAD_MAX_RETRIES = 3
+
+# Indicator recalculation: worker processes (1 = serial, None = one per CPU core)
+INDICATOR_WORKERS = 1
+
+# Indicator result cache: symbols kept in memory, and the on-disk tier (None = off)
+INDICATOR_CACHE_ENTRIES = 4096
+INDICATOR_CACHE_DIR = os.path.join("data", "indicator_cache")
+
+# Parquet snapshot of bars + indicators written after each update (None = off)
+SNAPSHOT_DIR = os.path.join("data", "snapshot")
@@ -1,7 +1,38 @@
-from src.data.fetcher import DataService
-from config import TSX_SYMBOLS, START_DATE, END_DATE, DATABASE_URL
+from src.data.fetcher import (
+    DEFAULT_OVERLAP_DAYS,
+    SCREENING_BARS,
+    DataService,
+    ChunkedDownloader,
+)
+from src.data.sources import ReplaySource
+from src.data.snapshot import AnalyticsSnapshot
+from config import (
+    TSX_UNIVERSE,
+    START_DATE,
+    END_DATE,
+    DATABASE_URL,
+    DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_WORKERS,
+    DOWNLOAD_MAX_RETRIES,
+    INDICATOR_WORKERS,
+    INDICATOR_CACHE_ENTRIES,
+    INDICATOR_CACHE_DIR,
+    SNAPSHOT_DIR,
+)
+from src.analysis.batch import indicator_registry
 from src.analysis.screeners import CompositeScreener, screener_registry
 from src.analysis.report import generate_html_report
+from src.analysis.cache import IndicatorCache
+from src.backtesting.events import BAR_COLUMNS, EventBacktester, bar_batches
+from src.backtesting.strategies import strategy_registry
+from src.backtesting.sweep import parameter_grid, run_sweep
+from src.backtesting.vectorized import market_data, run_backtest
+from src.backtesting.walkforward import (
+    IN_SAMPLE_BARS,
+    OUT_OF_SAMPLE_BARS,
+    run_walk_forward,
+)
+from src.database.init_db import migrate_indicator_storage
 import argparse
 import logging
 
@@ -9,58 +40,160 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Indicator columns shown for every stock in the screener report
+REPORT_INDICATORS = ["RSI", "MACD", "SMA50", "SMA200"]
+# Report field -> column of the stock's latest matching bar
+REPORT_STATS = {
+    "latest_price": "close",
+    "rsi": "RSI",
+    "macd": "MACD",
+    "sma50": "SMA50",
+    "sma200": "SMA200",
+}
 
-def update_data(symbols: list = None, start_date=START_DATE, end_date=END_DATE):
+
+def indicator_cache() -> IndicatorCache:
+    return IndicatorCache(INDICATOR_CACHE_ENTRIES, INDICATOR_CACHE_DIR)
+
+
+def export_snapshot(data_service: DataService = None):
+    """
+    Rewrites the Parquet snapshot of daily and weekly bars + indicators.
+    """
+    data_service = data_service or DataService(DATABASE_URL)
+    AnalyticsSnapshot(SNAPSHOT_DIR).export(data_service, START_DATE, END_DATE)
+
+
+def update_data(
+    symbols: list = None,
+    start_date=START_DATE,
+    end_date=END_DATE,
+    incremental: bool = False,
+    replay_path: str = None,
+    workers: int = INDICATOR_WORKERS,
+    indicators: list = None,
+):
     """
     Updates stock data and recalculates technical indicators for both daily and weekly time frames.
+    With incremental=True only the bars missing since each symbol's last stored date are fetched.
+    With replay_path, bars are read from a recorded Parquet/CSV file instead of yfinance.
+    With workers != 1, daily and weekly indicators are recalculated together on a process pool.
+    indicators limits a full recalculation to those indicator columns.
+    Afterwards the screening bars and the Parquet snapshot (unless SNAPSHOT_DIR is
+    None) are rewritten.
     """
-    data_service = DataService(DATABASE_URL)
-    target_symbols = symbols if symbols else TSX_SYMBOLS
+    if replay_path:
+        source = ReplaySource(replay_path)
+    else:
+        source = ChunkedDownloader(
+            chunk_size=DOWNLOAD_CHUNK_SIZE,
+            max_workers=DOWNLOAD_WORKERS,
+            max_retries=DOWNLOAD_MAX_RETRIES,
+        )
+    data_service = DataService(
+        DATABASE_URL, source=source, indicator_cache=indicator_cache()
+    )
+    target_symbols = symbols if symbols else TSX_UNIVERSE.symbols
 
     try:
         logger.info(f"Updating data for symbols: {target_symbols}")
-        data_service.update_all_stocks(target_symbols, start_date, end_date)
-
-        # Update Daily Indicators
-        logger.info("Recalculating daily technical indicators.")
-        data_service.update_indicators(
-            target_symbols, start_date, end_date, time_frame="daily"
+        data_service.update_all_stocks(
+            target_symbols,
+            start_date,
+            end_date,
+            incremental=incremental,
+            overlap_days=DEFAULT_OVERLAP_DAYS,
         )
 
-        # Update Weekly Indicators
-        logger.info("Recalculating weekly technical indicators.")
-        data_service.update_indicators(
-            target_symbols, start_date, end_date, time_frame="weekly"
-        )
+        # Update Daily and Weekly Indicators
+        if incremental:
+            for time_frame in ("daily", "weekly"):
+                logger.info(
+                    f"Updating {time_frame} technical indicators incrementally."
+                )
+                data_service.update_indicators_incremental(
+                    target_symbols, time_frame=time_frame
+                )
+        elif workers != 1:
+            logger.info(
+                f"Recalculating daily and weekly technical indicators with "
+                f"{workers or 'all'} workers."
+            )
+            data_service.update_indicators_parallel(
+                target_symbols,
+                start_date,
+                end_date,
+                workers=workers,
+                outputs=indicators,
+            )
+        else:
+            for time_frame in ("daily", "weekly"):
+                logger.info(f"Recalculating {time_frame} technical indicators.")
+                data_service.update_indicators(
+                    target_symbols,
+                    start_date,
+                    end_date,
+                    time_frame=time_frame,
+                    outputs=indicators,
+                )
 
+        data_service.refresh_screening_bars(target_symbols)
         logger.info("Data update and indicator recalculation completed successfully.")
+
+        if SNAPSHOT_DIR:
+            export_snapshot(data_service)
     except Exception as e:
         logger.error(f"Error updating stocks: {str(e)}")
 
 
 def recalculate_indicators(
-    symbols: list = None, start_date=START_DATE, end_date=END_DATE, time_frame="daily"
+    symbols: list = None,
+    start_date=START_DATE,
+    end_date=END_DATE,
+    time_frame="daily",
+    incremental: bool = False,
+    rebuild: bool = False,
+    workers: int = INDICATOR_WORKERS,
+    indicators: list = None,
 ):
     """
     Recalculates technical indicators for specified symbols (or all TSX if none given).
+    With incremental=True each symbol's saved indicator state is advanced through its
+    new bars only; rebuild=True replays every state from the full history instead.
+    With workers != 1 the symbols are sharded across a process pool.
+    indicators limits a full recalculation to those indicator columns.
     """
-    data_service = DataService(DATABASE_URL)
+    data_service = DataService(DATABASE_URL, indicator_cache=indicator_cache())
     try:
         if symbols:
             logger.info(
                 f"Recalculating indicators for symbols: {symbols} with time_frame: {time_frame}"
             )
-            data_service.update_indicators(
-                symbols, start_date, end_date, time_frame=time_frame
-            )
         else:
             logger.info(
                 f"Recalculating indicators for all TSX symbols with time_frame: {time_frame}"
             )
+            symbols = TSX_UNIVERSE.symbols
+
+        if incremental or rebuild:
+            data_service.update_indicators_incremental(
+                symbols, time_frame=time_frame, rebuild=rebuild
+            )
+        elif workers != 1:
+            data_service.update_indicators_parallel(
+                symbols,
+                start_date,
+                end_date,
+                time_frames=(time_frame,),
+                workers=workers,
+                outputs=indicators,
+            )
+        else:
             data_service.update_indicators(
-                TSX_SYMBOLS, start_date, end_date, time_frame=time_frame
+                symbols, start_date, end_date, time_frame=time_frame, outputs=indicators
             )
 
+        data_service.refresh_screening_bars(symbols, time_frames=(time_frame,))
         logger.info("Indicator recalculation completed successfully.")
     except Exception as e:
         logger.error(f"Error recalculating indicators: {str(e)}")
@@ -72,21 +205,21 @@ def preview(symbol: str = "SU.TO"):
     print(data)
 
 
-def run_screener(selected_screeners: list, mode: str = "AND"):
+def run_screener(
+    selected_screeners: list,
+    mode: str = "AND",
+    from_snapshot: bool = False,
+    latest: bool = False,
+):
     """
     Applies one or more screeners to the stock data and generates an HTML report.
 
     :param selected_screeners: List of screener names, or ["all"] to use all registered screeners.
     :param mode: "AND" or "OR" logic to combine multiple screeners if needed.
+    :param from_snapshot: Read bars and indicators from the Parquet snapshot instead of the database.
+    :param latest: Screen only the latest bars per symbol, read from the screening_bars table.
     """
     data_service = DataService(DATABASE_URL)
-    # Fetch full DataFrame (with indicators) for your TSX symbols:
-    data = data_service.get_stock_data_with_indicators(
-        TSX_SYMBOLS, START_DATE, END_DATE
-    )
-    if data.empty:
-        logger.warning("No data returned from the database. Exiting.")
-        return
 
     # Determine which screeners to run:
     if len(selected_screeners) == 1 and selected_screeners[0].lower() == "all":
@@ -109,56 +242,261 @@ def run_screener(selected_screeners: list, mode: str = "AND"):
     # Combine them with CompositeScreener if you want an overall mask,
     # but also keep individual screener results for the report.
     combined_screener = CompositeScreener(active_screeners, mode=mode.upper())
-    combined_mask = combined_screener.apply(data)
-    logger.info(f"Combined screener mask shape: {combined_mask.shape}")
-
-    # Prepare a dictionary: screener_name -> list of stock dictionaries
-    screener_results = {}
-    for screener in active_screeners:
-        screener_name = screener.__class__.__name__  # e.g. "RSIOversoldScreener"
-        mask = screener.apply(data)  # boolean series for this screener only
-        df_screened = data[mask]
-
-        stock_list = []
-        if not df_screened.empty:
-            # Group by symbol to gather timeseries + latest stats
-            for symbol, df_symbol in df_screened.groupby("symbol"):
-                if df_symbol.empty:
-                    continue
-                last_row = df_symbol.iloc[-1]
-
-                stock_list.append(
-                    {
-                        "symbol": symbol,
-                        "latest_price": last_row.get("close", None),
-                        "rsi": last_row.get("RSI", None),
-                        "macd": last_row.get("MACD", None),
-                        "sma50": last_row.get("SMA50", None),
-                        "sma200": last_row.get("SMA200", None),
-                        # Entire time-series for plotting
-                        "data": df_symbol[
-                            ["date", "open", "high", "low", "close", "volume"]
-                        ]
-                        .sort_values("date")
-                        .reset_index(drop=True),
-                    }
-                )
 
-        screener_results[screener_name] = stock_list
+    # Fetch the bars of your TSX symbols with only the indicators the screeners
+    # and the report use (all of them if a screener does not declare its own):
+    requires = combined_screener.requires
+    indicators = list(indicator_registry if requires is None else requires)
+    indicators += [name for name in REPORT_INDICATORS if name not in indicators]
+    lookback = combined_screener.lookback
+    if latest and (lookback is None or lookback > SCREENING_BARS):
+        # screening_bars would be too short for lag()/cross_*() to ever match
+        logger.warning(
+            f"The screeners need {lookback or 'an unknown number of'} bars per "
+            f"symbol but screening_bars keeps {SCREENING_BARS}; reading the "
+            f"full history instead of --latest."
+        )
+        latest = False
+    if latest:
+        data = data_service.get_screening_bars(
+            TSX_UNIVERSE.symbols, indicators=indicators
+        )
+    elif from_snapshot:
+        data = AnalyticsSnapshot(SNAPSHOT_DIR).read(
+            columns=["open", "high", "low", "close", "volume"] + indicators,
+            symbols=TSX_UNIVERSE.symbols,
+            start_date=START_DATE,
+            end_date=END_DATE,
+        )
+    else:
+        data = data_service.get_stock_data_with_indicators(
+            TSX_UNIVERSE.symbols, START_DATE, END_DATE, indicators=indicators
+        )
+    if data.empty:
+        logger.warning("No data returned from the database. Exiting.")
+        return
+
+    # Evaluate every screener once; the report reads each screener's matches,
+    # their latest stats and price history from the result
+    result = combined_screener.run(data)
+    logger.info(f"Matching symbols per screener: {result.counts()}")
+    screener_results = result.detailed_results(REPORT_STATS)
 
     # Generate an HTML report that displays each screener's results + a plot
     generate_html_report(screener_results)
 
 
-run_screener(["all"], mode="OR")
+def load_market(
+    indicators: list, time_frame: str = "daily", from_snapshot: bool = False
+):
+    """
+    Opens, closes and the given indicators of the universe as date-aligned
+    matrices for the vectorized backtester, or None without data.
+    """
+    if from_snapshot:
+        data = AnalyticsSnapshot(SNAPSHOT_DIR).read(
+            time_frame=time_frame,
+            columns=["open", "close"] + indicators,
+            symbols=TSX_UNIVERSE.symbols,
+            start_date=START_DATE,
+            end_date=END_DATE,
+        )
+    else:
+        data = DataService(DATABASE_URL).get_stock_data_with_indicators(
+            TSX_UNIVERSE.symbols,
+            START_DATE,
+            END_DATE,
+            time_frame=time_frame,
+            indicators=indicators,
+        )
+    if data.empty:
+        logger.warning("No data returned from the database. Exiting.")
+        return None
+    return market_data(data, ["open", "close"] + indicators)
+
+
+def backtest(
+    strategy_name: str,
+    fill: str = "next_open",
+    fee: float = 0.0,
+    time_frame: str = "daily",
+    from_snapshot: bool = False,
+    engine: str = "vectorized",
+):
+    """
+    Runs a registered strategy over the whole universe and logs its summary
+    metrics.
+
+    :param fill: "next_open" or "close", see run_backtest (vectorized engine).
+    :param fee: Fraction of the traded value paid on every fill.
+    :param from_snapshot: Read bars and indicators from the Parquet snapshot instead of the database.
+    :param engine: "vectorized", or "event" to stream bars per date through the
+        event-driven engine (stops, position limits, cash).
+    """
+    strategy_class = strategy_registry.get(strategy_name.lower())
+    if strategy_class is None:
+        logger.error(f"Strategy '{strategy_name}' not found.")
+        return None
+    strategy = strategy_class()
+    periods_per_year = 252 if time_frame == "daily" else 52
+
+    if engine == "event":
+        indicators = list(strategy.event_requires)
+        universe = sorted(TSX_UNIVERSE.symbols)
+        if from_snapshot:
+            frames = AnalyticsSnapshot(SNAPSHOT_DIR).iter_bars_by_date(
+                time_frame, BAR_COLUMNS + indicators, universe, START_DATE, END_DATE
+            )
+        else:
+            frames = DataService(DATABASE_URL).iter_bars_by_date(
+                universe, START_DATE, END_DATE, time_frame, indicators
+            )
+        result = EventBacktester(
+            strategy, fee=fee, periods_per_year=periods_per_year
+        ).run(bar_batches(frames, universe, BAR_COLUMNS + indicators), universe)
+        logger.info(f"Backtest of {strategy_name}: {result.summary()}")
+        return result
+
+    market = load_market(list(strategy.requires), time_frame, from_snapshot)
+    if market is None:
+        return None
+    entries, exits = strategy.signals(market)
+    result = run_backtest(
+        market,
+        entries,
+        exits,
+        fill=fill,
+        fee=fee,
+        periods_per_year=periods_per_year,
+    )
+    logger.info(f"Backtest of {strategy_name}: {result.summary()}")
+    return result
+
+
+def grid_indicators(strategy_class) -> list:
+    # Stored indicators read by any parameter set of the strategy's grid
+    indicators = []
+    for params in parameter_grid(strategy_class.grid):
+        indicators.extend(
+            n for n in strategy_class(**params).requires if n not in indicators
+        )
+    return indicators
+
+
+def sweep(
+    strategy_name: str,
+    fill: str = "next_open",
+    fee: float = 0.0,
+    time_frame: str = "daily",
+    from_snapshot: bool = False,
+    workers: int = None,
+    results_path: str = None,
+):
+    """
+    Backtests every parameter set of a strategy's grid on a process pool and
+    logs the best ones by Sharpe ratio.
+
+    :param results_path: CSV checkpoint to resume from and append results to.
+    """
+    strategy_class = strategy_registry.get(strategy_name.lower())
+    if strategy_class is None:
+        logger.error(f"Strategy '{strategy_name}' not found.")
+        return None
+
+    market = load_market(grid_indicators(strategy_class), time_frame, from_snapshot)
+    if market is None:
+        return None
+    results = run_sweep(
+        market,
+        strategy_name,
+        workers=workers,
+        results_path=results_path,
+        fill=fill,
+        fee=fee,
+        periods_per_year=252 if time_frame == "daily" else 52,
+    )
+    if not results.empty:
+        best = results.sort_values("sharpe", ascending=False).head(10)
+        logger.info(f"Best parameter sets of {strategy_name}:\n{best.to_string()}")
+    return results
+
+
+def walk_forward(
+    strategy_name: str,
+    in_sample: int = IN_SAMPLE_BARS,
+    out_of_sample: int = OUT_OF_SAMPLE_BARS,
+    fill: str = "next_open",
+    fee: float = 0.0,
+    time_frame: str = "daily",
+    from_snapshot: bool = False,
+    workers: int = None,
+):
+    """
+    Walk-forward optimization of a strategy's grid: parameters chosen on each
+    in-sample window are traded on the next out-of-sample window. Logs the
+    chosen parameters per window and the stitched out-of-sample summary.
+
+    :param in_sample: In-sample bars per window.
+    :param out_of_sample: Out-of-sample bars per window (and the step between windows).
+    """
+    strategy_class = strategy_registry.get(strategy_name.lower())
+    if strategy_class is None:
+        logger.error(f"Strategy '{strategy_name}' not found.")
+        return None
+
+    market = load_market(grid_indicators(strategy_class), time_frame, from_snapshot)
+    if market is None:
+        return None
+    result = run_walk_forward(
+        market,
+        strategy_name,
+        in_sample=in_sample,
+        out_of_sample=out_of_sample,
+        workers=workers,
+        fill=fill,
+        fee=fee,
+        periods_per_year=252 if time_frame == "daily" else 52,
+    )
+    logger.info(
+        f"Walk-forward windows of {strategy_name}:\n{result.windows.to_string()}"
+    )
+    logger.info(f"Out-of-sample summary of {strategy_name}: {result.summary()}")
+    return result
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="TSX Stock Analysis Tool")
     parser.add_argument("--update", action="store_true", help="Update stock data")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="With --update, only fetch bars missing since each symbol's last stored date; "
+        "with --update or --recalculate, advance saved indicator state through new bars only",
+    )
+    parser.add_argument(
+        "--replay",
+        type=str,
+        help="With --update, read bars from a recorded Parquet/CSV file instead of yfinance",
+    )
     parser.add_argument(
         "--recalculate", action="store_true", help="Recalculate indicators"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=INDICATOR_WORKERS,
+        help="Worker processes for indicator recalculation, --sweep and --walk_forward (0 = one per CPU core)",
+    )
+    parser.add_argument(
+        "--indicators",
+        nargs="+",
+        help="With --update/--recalculate, only recalculate these indicators (e.g. RSI SMA50)",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="With --recalculate, rebuild indicators and their saved state from full history",
+    )
     parser.add_argument(
         "--time_frame",
         type=str,
@@ -171,6 +509,21 @@ if __name__ == "__main__":
         nargs="+",
         help="List of screeners to run (e.g., rsi_oversold macd_bullish)",
     )
+    parser.add_argument(
+        "--from_snapshot",
+        action="store_true",
+        help="With --screener, read bars and indicators from the Parquet snapshot",
+    )
+    parser.add_argument(
+        "--latest",
+        action="store_true",
+        help="With --screener, screen only the latest bars per symbol (screening_bars table)",
+    )
+    parser.add_argument(
+        "--export_snapshot",
+        action="store_true",
+        help="Rewrite the Parquet snapshot of bars and indicators from the database",
+    )
     parser.add_argument(
         "--mode",
         type=str,
@@ -178,21 +531,161 @@ if __name__ == "__main__":
         default="AND",
         help="Combine screeners with AND/OR logic",
     )
+    parser.add_argument(
+        "--backtest",
+        type=str,
+        help=f"Backtest a strategy over the universe ({', '.join(strategy_registry)})",
+    )
+    parser.add_argument(
+        "--fill",
+        type=str,
+        choices=["next_open", "close"],
+        default="next_open",
+        help="With --backtest, fill signals at the next bar's open or at the signal bar's close",
+    )
+    parser.add_argument(
+        "--sweep",
+        type=str,
+        help="Backtest every parameter set of a strategy's grid in parallel (uses --workers, --fill, --fee)",
+    )
+    parser.add_argument(
+        "--sweep_results",
+        type=str,
+        help="With --sweep, CSV file the results are appended to and resumed from",
+    )
+    parser.add_argument(
+        "--walk_forward",
+        type=str,
+        help="Walk-forward optimization of a strategy's grid (uses --workers, --fill, --fee)",
+    )
+    parser.add_argument(
+        "--in_sample",
+        type=int,
+        default=IN_SAMPLE_BARS,
+        help="With --walk_forward, in-sample bars per window",
+    )
+    parser.add_argument(
+        "--out_of_sample",
+        type=int,
+        default=OUT_OF_SAMPLE_BARS,
+        help="With --walk_forward, out-of-sample bars per window",
+    )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        choices=["vectorized", "event"],
+        default="vectorized",
+        help="With --backtest, the vectorized engine or the event-driven one (stops, position limits)",
+    )
+    parser.add_argument(
+        "--fee",
+        type=float,
+        default=0.0,
+        help="With --backtest, fraction of the traded value paid per fill",
+    )
     parser.add_argument(
         "--preview",
         type=str,
     )
+    parser.add_argument(
+        "--rebuild_weekly",
+        action="store_true",
+        help="Recompute all weekly bars from the stored daily bars",
+    )
+    parser.add_argument(
+        "--migrate_indicators",
+        action="store_true",
+        help="Create/extend the wide indicators table and move legacy indicator rows into it",
+    )
+    parser.add_argument(
+        "--refresh_symbols",
+        action="store_true",
+        help="Re-download the TSX symbol directory into the local cache",
+    )
     args = parser.parse_args()
 
+    if args.refresh_symbols:
+        symbols = TSX_UNIVERSE.refresh()
+        logger.info(f"Symbol cache holds {len(symbols)} symbols.")
+
+    if args.migrate_indicators:
+        copied = migrate_indicator_storage(
+            DataService(DATABASE_URL).db_manager.engine, drop_legacy=True
+        )
+        for legacy_table, rows in copied.items():
+            logger.info(f"Copied {rows} indicator rows from {legacy_table}.")
+
+    if args.rebuild_weekly:
+        DataService(DATABASE_URL).rebuild_weekly_data()
     if args.update:
-        update_data()
+        update_data(
+            incremental=args.incremental,
+            replay_path=args.replay,
+            workers=args.workers or None,
+            indicators=args.indicators,
+        )
     if args.recalculate:
-        recalculate_indicators(time_frame=args.time_frame)
+        recalculate_indicators(
+            time_frame=args.time_frame,
+            incremental=args.incremental,
+            rebuild=args.rebuild,
+            workers=args.workers or None,
+            indicators=args.indicators,
+        )
+    if args.export_snapshot:
+        export_snapshot()
     if args.screener:
-        run_screener(selected_screeners=args.screener, mode=args.mode)
+        run_screener(
+            selected_screeners=args.screener,
+            mode=args.mode,
+            from_snapshot=args.from_snapshot,
+            latest=args.latest,
+        )
+    if args.backtest:
+        backtest(
+            args.backtest,
+            fill=args.fill,
+            fee=args.fee,
+            time_frame=args.time_frame,
+            from_snapshot=args.from_snapshot,
+            engine=args.engine,
+        )
+    if args.sweep:
+        sweep(
+            args.sweep,
+            fill=args.fill,
+            fee=args.fee,
+            time_frame=args.time_frame,
+            from_snapshot=args.from_snapshot,
+            workers=args.workers or None,
+            results_path=args.sweep_results,
+        )
+    if args.walk_forward:
+        walk_forward(
+            args.walk_forward,
+            in_sample=args.in_sample,
+            out_of_sample=args.out_of_sample,
+            fill=args.fill,
+            fee=args.fee,
+            time_frame=args.time_frame,
+            from_snapshot=args.from_snapshot,
+            workers=args.workers or None,
+        )
     if args.preview:
         preview(args.preview)
-    if not (args.update or args.recalculate or args.screener or args.preview):
+    if not (
+        args.update
+        or args.migrate_indicators
+        or args.rebuild_weekly
+        or args.recalculate
+        or args.export_snapshot
+        or args.screener
+        or args.backtest
+        or args.sweep
+        or args.walk_forward
+        or args.preview
+        or args.refresh_symbols
+    ):
 
         print(
             "No action specified. Use --update, --recalculate, preview, or --screener."
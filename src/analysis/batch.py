@@ -0,0 +1,323 @@
+"""
+Universe-wide indicator calculation on a (bar × symbol) matrix.
+
+Each symbol's closes are right-aligned in one column of a 2-D float array, padded
+with leading NaNs, so every indicator is computed for all symbols at once with
+vectorized NumPy passes along axis 0. Columns follow the pandas functions in
+indicators.py, including their weekly period scaling.
+
+Indicators are registered in indicator_registry as builders of a computation
+graph (see Node); calculate_indicator_matrix evaluates only the requested
+outputs, and steps shared between them (e.g. EMA12/EMA26 inside MACD, the window
+sums behind BB_Middle and the Bollinger std) are computed once.
+"""
+
+from typing import Callable, Dict, Iterable, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class PriceMatrix(NamedTuple):
+    values: np.ndarray  # (bars, symbols) float64, NaN-padded at the top
+    dates: np.ndarray  # (bars, symbols) datetime64[ns], NaT where values is padding
+    keys: np.ndarray  # (symbols,) the symbol/stock_id of each column
+
+
+def build_price_matrix(
+    df: pd.DataFrame,
+    key_column: str = "stock_id",
+    date_column: str = "date",
+    value_column: str = "close",
+) -> PriceMatrix:
+    """
+    Pivots a long (key, date, value) frame into a right-aligned PriceMatrix, i.e.
+    the last row holds every symbol's latest bar.
+    """
+    df = df.sort_values([key_column, date_column])
+    codes, keys = pd.factorize(df[key_column], sort=False)
+    lengths = np.bincount(codes, minlength=len(keys))
+    n_bars = int(lengths.max()) if len(keys) else 0
+
+    position = df.groupby(codes).cumcount().to_numpy()
+    rows = n_bars - lengths[codes] + position
+
+    values = np.full((n_bars, len(keys)), np.nan)
+    values[rows, codes] = df[value_column].to_numpy(dtype=np.float64)
+    dates = np.full((n_bars, len(keys)), np.datetime64("NaT"), dtype="datetime64[ns]")
+    dates[rows, codes] = pd.to_datetime(df[date_column]).to_numpy()
+    return PriceMatrix(values, dates, np.asarray(keys))
+
+
+def _scaled(period: int, time_frame: str) -> int:
+    # Same adjustment as sma()/ema() in indicators.py
+    if time_frame == "weekly":
+        return max(1, period // 5)
+    return period
+
+
+def _window_sums(x: np.ndarray, period: int, power: int = 1):
+    # Rolling sums of x**power and of valid-value counts along axis 0. Each column is
+    # shifted by its first valid value first, which keeps the cumulative sums small.
+    valid = ~np.isnan(x)
+    first = x[np.argmax(valid, axis=0), np.arange(x.shape[1])]
+    first = np.where(valid.any(axis=0), first, 0.0)
+    shifted = np.where(valid, x - first, 0.0)
+
+    zeros = np.zeros((1, x.shape[1]))
+    csum = np.concatenate([zeros, np.cumsum(shifted**power, axis=0)])
+    ccount = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+
+    sums = np.full(x.shape, np.nan)
+    counts = np.zeros(x.shape)
+    if period <= x.shape[0]:
+        sums[period - 1 :] = csum[period:] - csum[:-period]
+        counts[period - 1 :] = ccount[period:] - ccount[:-period]
+    return sums, counts, first
+
+
+def _mean_from_sums(window_sums, period: int) -> np.ndarray:
+    sums, counts, first = window_sums
+    return np.where(counts == period, sums / period + first, np.nan)
+
+
+def _std_from_sums(window_sums, window_sq_sums, period: int) -> np.ndarray:
+    sums, counts, _ = window_sums
+    sq_sums, _, _ = window_sq_sums
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = (sq_sums - sums**2 / period) / (period - 1)
+    return np.where(counts == period, np.sqrt(np.clip(var, 0.0, None)), np.nan)
+
+
+def rolling_mean(x: np.ndarray, period: int) -> np.ndarray:
+    """
+    Column-wise rolling mean; NaN until a full window of values is available.
+    """
+    return _mean_from_sums(_window_sums(x, period), period)
+
+
+def rolling_std(x: np.ndarray, period: int) -> np.ndarray:
+    """
+    Column-wise rolling sample standard deviation (ddof=1, like pandas).
+    """
+    return _std_from_sums(
+        _window_sums(x, period), _window_sums(x, period, power=2), period
+    )
+
+
+def ema(x: np.ndarray, span: int) -> np.ndarray:
+    """
+    Column-wise EMA matching pandas ewm(span=span, adjust=False), seeded with each
+    column's first value. Loops over bars, vectorized across symbols.
+    """
+    alpha = 2.0 / (span + 1.0)
+    out = np.full(x.shape, np.nan)
+    prev = np.full(x.shape[1], np.nan)
+    for i in range(x.shape[0]):
+        row = x[i]
+        smoothed = np.where(np.isnan(row), prev, alpha * row + (1 - alpha) * prev)
+        prev = np.where(np.isnan(prev), row, smoothed)
+        out[i] = prev
+    return out
+
+
+def rsi(x: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    Column-wise RSI with simple-average gains/losses, as indicators.rsi.
+    """
+    delta = np.full(x.shape, np.nan)
+    delta[1:] = x[1:] - x[:-1]
+    valid = ~np.isnan(x)
+    # indicators.rsi turns the first bar's NaN delta into a zero gain/loss
+    gains = np.where(valid, np.where(delta > 0, delta, 0.0), np.nan)
+    losses = np.where(valid, np.where(delta < 0, -delta, 0.0), np.nan)
+    avg_gain = rolling_mean(gains, period)
+    avg_loss = rolling_mean(losses, period)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+#
+# Indicator graph
+#
+class Node(NamedTuple):
+    """
+    One step of the indicator graph: op(*input values, **params). Nodes compare
+    by value, so a step requested by several indicators is evaluated once.
+    """
+
+    op: Callable
+    inputs: Tuple = ()
+    params: Tuple = ()
+
+
+def node(op: Callable, *inputs: Node, **params) -> Node:
+    return Node(op, inputs, tuple(sorted(params.items())))
+
+
+# Graph inputs: op None, params name the source array
+CLOSE = Node(None, (), (("source", "close"),))
+
+
+def window_mean(x: Node, period: int) -> Node:
+    return node(_mean_from_sums, node(_window_sums, x, period=period), period=period)
+
+
+def window_std(x: Node, period: int) -> Node:
+    return node(
+        _std_from_sums,
+        node(_window_sums, x, period=period),
+        node(_window_sums, x, period=period, power=2),
+        period=period,
+    )
+
+
+def _band(middle: np.ndarray, std: np.ndarray, num_std: float) -> np.ndarray:
+    return middle + std * num_std
+
+
+# Indicator name -> builder(time_frame) returning the indicator's output Node
+indicator_registry: Dict[str, Callable[[str], Node]] = {}
+
+
+def register_indicator(name: str):
+    def decorator(builder):
+        indicator_registry[name] = builder
+        return builder
+
+    return decorator
+
+
+def indicator_node(name: str, time_frame: str = "daily") -> Node:
+    """
+    Output node of a registered indicator, for use as another indicator's input.
+    """
+    return indicator_registry[name](time_frame)
+
+
+def _sma_builder(period: int):
+    return lambda time_frame: window_mean(CLOSE, _scaled(period, time_frame))
+
+
+def _ema_builder(period: int):
+    return lambda time_frame: node(ema, CLOSE, span=_scaled(period, time_frame))
+
+
+for _period in (12, 26, 50, 200):
+    register_indicator(f"SMA{_period}")(_sma_builder(_period))
+for _period in (12, 26, 50, 200):
+    register_indicator(f"EMA{_period}")(_ema_builder(_period))
+
+
+@register_indicator("RSI")
+def _rsi_node(time_frame):
+    return node(rsi, CLOSE, period=14)
+
+
+@register_indicator("MACD")
+def _macd_node(time_frame):
+    return node(
+        np.subtract,
+        indicator_node("EMA12", time_frame),
+        indicator_node("EMA26", time_frame),
+    )
+
+
+@register_indicator("MACD_Signal")
+def _macd_signal_node(time_frame):
+    return node(ema, indicator_node("MACD", time_frame), span=_scaled(9, time_frame))
+
+
+@register_indicator("MACD_Histogram")
+def _macd_histogram_node(time_frame):
+    return node(
+        np.subtract,
+        indicator_node("MACD", time_frame),
+        indicator_node("MACD_Signal", time_frame),
+    )
+
+
+@register_indicator("BB_Middle")
+def _bb_middle_node(time_frame):
+    # indicators.bollinger_bands scales its period, then sma() scales it again
+    return window_mean(CLOSE, _scaled(_scaled(20, time_frame), time_frame))
+
+
+def _bb_band_node(time_frame, num_std):
+    std = window_std(CLOSE, _scaled(20, time_frame))
+    return node(_band, indicator_node("BB_Middle", time_frame), std, num_std=num_std)
+
+
+register_indicator("BB_Upper")(lambda time_frame: _bb_band_node(time_frame, 2))
+register_indicator("BB_Lower")(lambda time_frame: _bb_band_node(time_frame, -2))
+
+
+def node_signature(n: Node) -> str:
+    """
+    Stable text form of a node and everything it depends on (ops by qualified
+    name, parameters), e.g. for cache keys that change when a definition does.
+    """
+    if n.op is None:
+        return f"source{n.params}"
+    op = f"{getattr(n.op, '__module__', None)}.{getattr(n.op, '__qualname__', n.op.__name__)}"
+    inputs = ", ".join(node_signature(i) for i in n.inputs)
+    return f"{op}({inputs}; {n.params})"
+
+
+def evaluate(
+    outputs: Dict[str, Node], sources: Dict[str, np.ndarray]
+) -> Dict[str, np.ndarray]:
+    """
+    Evaluates the output nodes on the source arrays, each distinct node once.
+    """
+    values = {}
+
+    def value(n: Node):
+        if n not in values:
+            if n.op is None:
+                values[n] = sources[dict(n.params)["source"]]
+            else:
+                inputs = [value(i) for i in n.inputs]
+                values[n] = n.op(*inputs, **dict(n.params))
+        return values[n]
+
+    return {name: value(n) for name, n in outputs.items()}
+
+
+def calculate_indicator_matrix(
+    closes: np.ndarray, time_frame: str = "daily", outputs: Iterable[str] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Indicator columns for a (bars × symbols) close matrix: the requested outputs,
+    or every registered indicator.
+    """
+    names = list(indicator_registry) if outputs is None else list(outputs)
+    unknown = [name for name in names if name not in indicator_registry]
+    if unknown:
+        raise ValueError(f"Unknown indicator(s): {unknown}")
+    graph = {name: indicator_node(name, time_frame) for name in names}
+    return evaluate(graph, {"close": closes})
+
+
+def to_wide_frame(
+    matrix: PriceMatrix,
+    results: Dict[str, np.ndarray],
+    key_column: str = "stock_id",
+    start_date=None,
+) -> pd.DataFrame:
+    """
+    Flattens indicator matrices into one (key, date, <indicator>...) row per bar,
+    dropping bars without any indicator value and, optionally, bars before
+    start_date.
+    """
+    keep = ~np.isnat(matrix.dates)
+    if start_date is not None:
+        keep &= matrix.dates >= np.datetime64(pd.Timestamp(start_date))
+    if results:
+        keep &= np.any([~np.isnan(values) for values in results.values()], axis=0)
+
+    rows, cols = np.nonzero(keep)
+    frame = {key_column: matrix.keys[cols], "date": matrix.dates[rows, cols]}
+    for name, values in results.items():
+        frame[name] = values[rows, cols]
+    return pd.DataFrame(frame)
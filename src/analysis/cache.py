@@ -0,0 +1,172 @@
+"""
+Content-addressed cache of indicator results.
+
+An entry is keyed by a hash of one symbol's close series (without the matrix
+padding) plus the signature of the requested indicator graph, so any change to
+the prices or to an indicator's definition misses and is recomputed. Entries
+live in a bounded in-process LRU and, optionally, in one .npz file per
+(symbol, time frame, indicator set) on disk, which is overwritten whenever that
+symbol's entry changes.
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from src.analysis.batch import (
+    calculate_indicator_matrix,
+    indicator_node,
+    indicator_registry,
+    node_signature,
+)
+
+# Bump when an indicator op changes numerically without changing its signature
+CACHE_VERSION = 1
+
+
+class IndicatorCache:
+    def __init__(self, max_entries: int = 4096, cache_dir: str = None):
+        """
+        :param max_entries: Symbol results kept in memory (least recently used
+            ones are evicted first).
+        :param cache_dir: Directory of the on-disk tier; None keeps the cache in
+            memory only.
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._memory = OrderedDict()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def graph_signature(time_frame: str, outputs: List[str]) -> str:
+        h = hashlib.blake2b(digest_size=8)
+        h.update(f"{CACHE_VERSION}|{time_frame}".encode())
+        for name in outputs:
+            h.update(
+                f"|{name}={node_signature(indicator_node(name, time_frame))}".encode()
+            )
+        return h.hexdigest()
+
+    @staticmethod
+    def content_key(closes: np.ndarray, signature: str) -> str:
+        h = hashlib.blake2b(
+            np.ascontiguousarray(closes, dtype=np.float64), digest_size=16
+        )
+        h.update(signature.encode())
+        return h.hexdigest()
+
+    def _path(self, name, signature: str) -> str:
+        return os.path.join(self.cache_dir, f"{name}_{signature}.npz")
+
+    def get(self, key: str, name=None, signature: str = None):
+        """
+        (n_outputs, n_bars) values stored under key, or None. With a cache_dir,
+        name/signature locate the symbol's file on disk.
+        """
+        values = self._memory.get(key)
+        if values is not None:
+            self._memory.move_to_end(key)
+            self.hits["memory"] += 1
+            return values
+
+        if self.cache_dir and name is not None:
+            path = self._path(name, signature)
+            try:
+                with np.load(path) as entry:
+                    if str(entry["key"]) == key:
+                        values = entry["values"]
+            except (OSError, KeyError, ValueError):
+                values = None
+            if values is not None:
+                self.hits["disk"] += 1
+                self._remember(key, values)
+                return values
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, values: np.ndarray, name=None, signature: str = None):
+        self._remember(key, values)
+        if self.cache_dir and name is not None:
+            path = self._path(name, signature)
+            # Write then rename, so concurrent workers never read a partial file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, key=np.array(key), values=values)
+            os.replace(tmp_path, path)
+
+    def _remember(self, key: str, values: np.ndarray):
+        self._memory[key] = values
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.hits["memory"],
+            "disk_hits": self.hits["disk"],
+            "misses": self.misses,
+            "entries": len(self._memory),
+        }
+
+    def clear(self):
+        self._memory.clear()
+        if self.cache_dir:
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith(".npz"):
+                    os.remove(os.path.join(self.cache_dir, filename))
+
+
+def cached_indicator_matrix(
+    closes: np.ndarray,
+    time_frame: str = "daily",
+    outputs: Iterable[str] = None,
+    cache: IndicatorCache = None,
+    keys=None,
+) -> Dict[str, np.ndarray]:
+    """
+    calculate_indicator_matrix with per-column caching: columns whose closes and
+    indicator definitions were seen before are looked up, the rest are computed
+    together in one smaller matrix. keys (e.g. PriceMatrix.keys) name each
+    column's file in the on-disk tier. Results are identical to the uncached
+    call, since every indicator is computed independently per column.
+    """
+    outputs = list(indicator_registry) if outputs is None else list(outputs)
+    if cache is None:
+        return calculate_indicator_matrix(closes, time_frame, outputs)
+
+    signature = cache.graph_signature(time_frame, outputs)
+    n_columns = closes.shape[1]
+    # Columns are right-aligned: the closes start after the leading NaN padding
+    starts = np.argmax(~np.isnan(closes), axis=0)
+
+    results = {name: np.full(closes.shape, np.nan) for name in outputs}
+    missing, column_keys = [], []
+    for col in range(n_columns):
+        start = starts[col]
+        key = cache.content_key(closes[start:, col], signature)
+        column_keys.append(key)
+        name = None if keys is None else f"{time_frame}_{keys[col]}"
+        values = cache.get(key, name, signature)
+        if values is None:
+            missing.append(col)
+            continue
+        for i, output in enumerate(outputs):
+            results[output][start:, col] = values[i]
+
+    if missing:
+        computed = calculate_indicator_matrix(closes[:, missing], time_frame, outputs)
+        for j, col in enumerate(missing):
+            start = starts[col]
+            for output in outputs:
+                results[output][:, col] = computed[output][:, j]
+            values = np.vstack([computed[output][start:, j] for output in outputs])
+            name = None if keys is None else f"{time_frame}_{keys[col]}"
+            cache.put(column_keys[col], values, name, signature)
+    return results
@@ -0,0 +1,347 @@
+"""
+Compiled screener expressions over a symbol-aligned array layout.
+
+A screener condition such as "RSI < 30 and cross_above(MACD, MACD_Signal)" is
+parsed (with Python's ast module, accepting only the operators and functions
+below) into a graph of batch.Node steps. Columns are evaluated as flat arrays
+grouped by symbol and sorted by date, with each bar's position within its
+symbol, so lag() and the cross functions look back through each symbol's own
+history and never compare one symbol's first bar with the previous symbol's
+last. Evaluating several screeners together evaluates every shared
+subexpression once.
+"""
+
+import ast
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.batch import Node, evaluate, node
+
+
+class SymbolLayout(NamedTuple):
+    order: Union[np.ndarray, None]  # frame row of each sorted row; None if sorted
+    starts: np.ndarray  # sorted row of each symbol's first bar
+
+    def to_sorted(self, values: np.ndarray) -> np.ndarray:
+        return values if self.order is None else values[self.order]
+
+    def to_rows(self, values: np.ndarray) -> np.ndarray:
+        if self.order is None:
+            return values
+        out = np.empty_like(values)
+        out[self.order] = values
+        return out
+
+
+def symbol_layout(
+    data: pd.DataFrame, key_column: str = "symbol", date_column: str = None
+) -> SymbolLayout:
+    """
+    Orders a long frame's rows by symbol, then date_column (by default date or
+    week_start_date, whichever exists; the frame order if neither does), and
+    finds where each symbol's bars start. Frames that are already grouped and
+    sorted, like the ones DataService returns, are used in place.
+    """
+    keys = data[key_column]
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        codes = keys.cat.codes.to_numpy()
+    else:
+        codes, _ = pd.factorize(keys, sort=False)
+    if date_column is None:
+        date_column = next(
+            (c for c in ("date", "week_start_date") if c in data.columns), None
+        )
+    dates = None if date_column is None else data[date_column].to_numpy()
+
+    # In place if each symbol's rows are contiguous and in date order
+    same_symbol = codes[1:] == codes[:-1]
+    n_symbols = np.count_nonzero(np.bincount(codes[codes >= 0]))
+    in_order = len(codes) - np.count_nonzero(same_symbol) == n_symbols
+    if in_order and dates is not None:
+        in_order = np.all(~same_symbol | (dates[1:] >= dates[:-1]))
+    order = None
+    if not in_order:
+        if dates is None:
+            order = np.argsort(codes, kind="stable")
+        else:
+            order = np.lexsort((dates, codes))
+        codes = codes[order]
+
+    starts = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    return SymbolLayout(order, np.concatenate([[0], starts]) if len(codes) else starts)
+
+
+#
+# Operations
+#
+def _constant(value):
+    return value
+
+
+def _lag(x: np.ndarray, starts: np.ndarray, periods: int) -> np.ndarray:
+    # Value periods bars earlier in the same symbol; NaN/False for its first bars
+    if np.ndim(x) == 0:
+        return x
+    out = np.empty_like(x)
+    out[periods:] = x[:-periods]
+    first_bars = (starts[:, None] + np.arange(periods)).ravel()
+    ends = np.repeat(np.append(starts[1:], len(x)), periods)
+    out[first_bars[first_bars < ends]] = False if x.dtype == bool else np.nan
+    return out
+
+
+# Graph input holding SymbolLayout.starts (not a valid column name)
+STARTS = Node(None, (), (("source", "@starts"),))
+
+
+def lag(x: Node, periods: int = 1) -> Node:
+    return node(_lag, x, STARTS, periods=periods)
+
+
+def cross_above(a: Node, b: Node) -> Node:
+    return node(
+        np.logical_and,
+        node(np.greater, a, b),
+        node(np.less_equal, lag(a), lag(b)),
+    )
+
+
+def cross_below(a: Node, b: Node) -> Node:
+    return node(
+        np.logical_and,
+        node(np.less, a, b),
+        node(np.greater_equal, lag(a), lag(b)),
+    )
+
+
+def column(name: str) -> Node:
+    return Node(None, (), (("source", name),))
+
+
+def constant(value) -> Node:
+    return node(_constant, value=value)
+
+
+# Function name -> builder(*argument nodes) usable in expressions
+expression_functions: Dict[str, Callable[..., Node]] = {}
+
+
+def register_function(name: str):
+    def decorator(builder):
+        expression_functions[name] = builder
+        return builder
+
+    return decorator
+
+
+@register_function("lag")
+def _lag_function(x: Node, periods: Node = None) -> Node:
+    if periods is None:
+        return lag(x)
+    value = dict(periods.params).get("value") if periods.op is _constant else None
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise ValueError("lag() periods must be a positive integer literal")
+    return lag(x, value)
+
+
+register_function("cross_above")(cross_above)
+register_function("cross_below")(cross_below)
+register_function("abs")(lambda x: node(np.abs, x))
+
+
+#
+# Compilation
+#
+_BINARY_OPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.BitAnd: np.logical_and,
+    ast.BitOr: np.logical_or,
+}
+_COMPARE_OPS = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+_UNARY_OPS = {
+    ast.Not: np.logical_not,
+    ast.Invert: np.logical_not,
+    ast.USub: np.negative,
+}
+_BOOL_OPS = {ast.And: np.logical_and, ast.Or: np.logical_or}
+
+
+def _compile(tree: ast.AST, text: str) -> Node:
+    if isinstance(tree, ast.Name):
+        return column(tree.id)
+    if isinstance(tree, ast.Constant) and isinstance(tree.value, (int, float)):
+        return constant(tree.value)
+    if isinstance(tree, ast.BinOp) and type(tree.op) in _BINARY_OPS:
+        return node(
+            _BINARY_OPS[type(tree.op)],
+            _compile(tree.left, text),
+            _compile(tree.right, text),
+        )
+    if isinstance(tree, ast.UnaryOp) and type(tree.op) in _UNARY_OPS:
+        return node(_UNARY_OPS[type(tree.op)], _compile(tree.operand, text))
+    if isinstance(tree, ast.BoolOp):
+        values = [_compile(value, text) for value in tree.values]
+        result = values[0]
+        for value in values[1:]:
+            result = node(_BOOL_OPS[type(tree.op)], result, value)
+        return result
+    if isinstance(tree, ast.Compare) and all(
+        type(op) in _COMPARE_OPS for op in tree.ops
+    ):
+        # a < b < c is (a < b) and (b < c)
+        operands = [_compile(tree.left, text)] + [
+            _compile(comparator, text) for comparator in tree.comparators
+        ]
+        result = None
+        for op, left, right in zip(tree.ops, operands, operands[1:]):
+            comparison = node(_COMPARE_OPS[type(op)], left, right)
+            result = (
+                comparison
+                if result is None
+                else node(np.logical_and, result, comparison)
+            )
+        return result
+    if (
+        isinstance(tree, ast.Call)
+        and isinstance(tree.func, ast.Name)
+        and tree.func.id in expression_functions
+        and not tree.keywords
+    ):
+        args = [_compile(arg, text) for arg in tree.args]
+        return expression_functions[tree.func.id](*args)
+    raise ValueError(
+        f"Unsupported syntax in screener expression {text!r}: {ast.dump(tree)}"
+    )
+
+
+@lru_cache(maxsize=None)
+def compile_expression(text: str) -> Node:
+    """
+    Compiles a screener expression into its graph node. Columns are referenced by
+    name; supported are + - * /, comparisons, and/or/not (or & | ~), numbers and
+    the functions in expression_functions (lag, cross_above, cross_below, abs).
+    """
+    try:
+        tree = ast.parse(text.strip(), mode="eval").body
+    except SyntaxError as e:
+        raise ValueError(f"Invalid screener expression {text!r}: {e}") from None
+    return _compile(tree, text)
+
+
+def required_columns(n: Node) -> List[str]:
+    """
+    Names of the frame columns an expression reads, in first-use order.
+    """
+    names = []
+
+    def visit(n: Node):
+        if n.op is None and n != STARTS:
+            name = dict(n.params)["source"]
+            if name not in names:
+                names.append(name)
+        for i in n.inputs:
+            visit(i)
+
+    visit(n)
+    return names
+
+
+def max_lag(n: Node) -> int:
+    """
+    Most bars an expression looks back, e.g. 5 for "SMA200 > lag(SMA200, 5)" and
+    1 for cross_above(), so the previous max_lag(n) bars of each symbol suffice
+    to evaluate its latest bar.
+    """
+    if n.op is _lag:
+        return dict(n.params)["periods"] + max_lag(n.inputs[0])
+    return max((max_lag(i) for i in n.inputs), default=0)
+
+
+def evaluate_masks(
+    data: pd.DataFrame,
+    expressions: Dict[str, Node],
+    key_column: str = "symbol",
+    date_column: str = None,
+    layout: SymbolLayout = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Evaluates compiled boolean expressions on a long multi-symbol frame and
+    returns one boolean array per expression, aligned with data's rows. All
+    expressions share one layout (computed unless given), one array per
+    referenced column and every common subexpression.
+    """
+    if layout is None:
+        layout = symbol_layout(data, key_column, date_column)
+    names = []
+    for expression in expressions.values():
+        names.extend(n for n in required_columns(expression) if n not in names)
+    missing = [name for name in names if name not in data.columns]
+    if missing:
+        raise KeyError(f"Screener expressions need missing column(s): {missing}")
+
+    sources = {}
+    for name in names:
+        values = data[name].to_numpy()
+        if values.dtype.kind not in "fb":
+            values = data[name].to_numpy(dtype=np.float64, na_value=np.nan)
+        sources[name] = layout.to_sorted(values)
+    masks = _evaluate_conditions(expressions, sources, layout.starts, len(data))
+    return {name: layout.to_rows(mask) for name, mask in masks.items()}
+
+
+def _evaluate_conditions(
+    expressions: Dict[str, Node],
+    sources: Dict[str, np.ndarray],
+    starts: np.ndarray,
+    n_rows: int,
+) -> Dict[str, np.ndarray]:
+    # Boolean arrays of the expressions on grouped, date-sorted column arrays
+    with np.errstate(invalid="ignore", divide="ignore"):
+        results = evaluate(expressions, {"@starts": starts, **sources})
+
+    masks = {}
+    for name, result in results.items():
+        if np.asarray(result).dtype != bool:
+            raise ValueError(f"Screener expression {name!r} is not a condition")
+        if np.ndim(result) == 0:
+            masks[name] = np.full(n_rows, bool(result))
+        else:
+            masks[name] = result
+    return masks
+
+
+def evaluate_matrix_masks(
+    matrices: Dict[str, np.ndarray], expressions: Dict[str, Node]
+) -> Dict[str, np.ndarray]:
+    """
+    evaluate_masks for date-aligned (dates × symbols) matrices of the referenced
+    columns: returns one boolean matrix per expression. lag() steps back one
+    row, so a missing bar (NaN) is a bar too.
+    """
+    names = []
+    for expression in expressions.values():
+        names.extend(n for n in required_columns(expression) if n not in names)
+    missing = [name for name in names if name not in matrices]
+    if missing:
+        raise KeyError(f"Screener expressions need missing column(s): {missing}")
+
+    n_dates, n_symbols = next(iter(matrices.values())).shape
+    # Column-major order is grouped by symbol and sorted by date
+    sources = {name: matrices[name].ravel(order="F") for name in names}
+    masks = _evaluate_conditions(
+        expressions, sources, np.arange(n_symbols) * n_dates, n_dates * n_symbols
+    )
+    return {name: mask.reshape((n_symbols, n_dates)).T for name, mask in masks.items()}
@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 
+from src.analysis.batch import _scaled
+
 
 def sma(data, period=14, time_frame="daily"):
     """
@@ -63,3 +65,218 @@ def bollinger_bands(data, period=20, num_std=2, time_frame="daily"):
     lower_band = sma_line - (std * num_std)
 
     return pd.DataFrame({"SMA": sma_line, "Upper": upper_band, "Lower": lower_band})
+
+
+#
+# Incremental kernels: the same columns as IndicatorCalculator.calculate_indicators,
+# advanced one bar at a time from an explicit state instead of recomputed from the
+# full history. Every kernel is vectorized across symbols: a step takes one close per
+# symbol (NaN = no bar for that symbol) and costs O(1) per symbol per indicator.
+#
+
+
+class RollingWindowKernel:
+    """
+    Ring buffer with running sum and sum of squares for rolling mean/std.
+    The running sums are re-summed from the buffer every time it wraps, so
+    rounding error cannot accumulate across long histories.
+    """
+
+    def __init__(self, n_symbols, period):
+        self.period = period
+        self.buffer = np.zeros((n_symbols, period))
+        self.position = np.zeros(n_symbols)
+        self.count = np.zeros(n_symbols)
+        self.total = np.zeros(n_symbols)
+        self.total_sq = np.zeros(n_symbols)
+
+    def state_arrays(self):
+        return [self.buffer, self.position, self.count, self.total, self.total_sq]
+
+    def push(self, values, mask):
+        idx = np.nonzero(mask)[0]
+        position = self.position[idx].astype(int)
+        old = self.buffer[idx, position]
+        new = values[idx]
+        self.total[idx] += new - old
+        self.total_sq[idx] += new * new - old * old
+        self.buffer[idx, position] = new
+
+        position = (position + 1) % self.period
+        self.position[idx] = position
+        self.count[idx] = np.minimum(self.count[idx] + 1, self.period)
+
+        wrapped = idx[position == 0]
+        self.total[wrapped] = self.buffer[wrapped].sum(axis=1)
+        self.total_sq[wrapped] = (self.buffer[wrapped] ** 2).sum(axis=1)
+
+    def mean(self):
+        return np.where(self.count == self.period, self.total / self.period, np.nan)
+
+    def std(self):
+        # Sample standard deviation (ddof=1), like pandas rolling().std()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = (self.total_sq - self.total**2 / self.period) / (self.period - 1)
+        return np.where(
+            self.count == self.period, np.sqrt(np.clip(var, 0.0, None)), np.nan
+        )
+
+
+class EMAKernel:
+    """
+    Exponential moving average like ewm(span=span, adjust=False), seeded with the
+    first value.
+    """
+
+    def __init__(self, n_symbols, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = np.full(n_symbols, np.nan)
+
+    def state_arrays(self):
+        return [self.value]
+
+    def push(self, values, mask):
+        previous = self.value[mask]
+        new = values[mask]
+        self.value[mask] = np.where(
+            np.isnan(previous), new, self.alpha * new + (1 - self.alpha) * previous
+        )
+
+
+class IncrementalIndicators:
+    """
+    Persistable running state of every IndicatorCalculator column for a batch of
+    symbols: SMA/Bollinger ring buffers, EMA last values, RSI gain/loss windows
+    and the MACD signal EMA.
+
+    Replaying a symbol's whole history from a fresh state (the full rebuild) and
+    advancing a saved state by the new bars perform exactly the same floating point
+    operations, so both produce identical values. The running sums round differently
+    from the batch engine's (batch.py), so the two agree to within INDICATOR_RTOL
+    (src/data/fetcher.py), not bit for bit. to_rows()/from_rows() flatten the state
+    into one float64 row per symbol for storage.
+    """
+
+    def __init__(self, n_symbols, time_frame="daily"):
+        self.n_symbols = n_symbols
+        self.time_frame = time_frame
+
+        self.sma_periods = {
+            f"SMA{period}": _scaled(period, time_frame) for period in (12, 26, 50, 200)
+        }
+        # bollinger_bands() scales its period, then sma() scales it again
+        self.bb_std_period = _scaled(20, time_frame)
+        self.bb_mid_period = _scaled(self.bb_std_period, time_frame)
+        window_periods = sorted(
+            set(self.sma_periods.values()) | {self.bb_std_period, self.bb_mid_period}
+        )
+        self.windows = {
+            period: RollingWindowKernel(n_symbols, period) for period in window_periods
+        }
+        self.emas = {
+            f"EMA{period}": EMAKernel(n_symbols, _scaled(period, time_frame))
+            for period in (12, 26, 50, 200)
+        }
+        self.macd_signal = EMAKernel(n_symbols, _scaled(9, time_frame))
+        self.rsi_gains = RollingWindowKernel(n_symbols, 14)
+        self.rsi_losses = RollingWindowKernel(n_symbols, 14)
+        self.previous_close = np.full(n_symbols, np.nan)
+
+    def _kernels(self):
+        return (
+            [self.windows[period] for period in sorted(self.windows)]
+            + [self.emas[name] for name in sorted(self.emas)]
+            + [self.macd_signal, self.rsi_gains, self.rsi_losses]
+        )
+
+    def _state_arrays(self):
+        arrays = [a for kernel in self._kernels() for a in kernel.state_arrays()]
+        return arrays + [self.previous_close]
+
+    def to_rows(self) -> np.ndarray:
+        """
+        (n_symbols, width) float64 array holding the complete state.
+        """
+        return np.hstack([a.reshape(self.n_symbols, -1) for a in self._state_arrays()])
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray, time_frame="daily"):
+        state = cls(len(rows), time_frame)
+        offset = 0
+        for array in state._state_arrays():
+            width = array.size // max(state.n_symbols, 1)
+            array[...] = rows[:, offset : offset + width].reshape(array.shape)
+            offset += width
+        return state
+
+    def load_rows(self, rows: np.ndarray, mask: np.ndarray):
+        """
+        Overwrites the state of the symbols selected by `mask` with saved rows.
+        """
+        offset = 0
+        for array in self._state_arrays():
+            width = array.size // max(self.n_symbols, 1)
+            array[mask] = rows[:, offset : offset + width].reshape(
+                (-1,) + array.shape[1:]
+            )
+            offset += width
+
+    def step(self, closes: np.ndarray):
+        """
+        Advances every symbol with a non-NaN close by one bar and returns
+        {indicator_name: values}, NaN for symbols without a bar.
+        """
+        mask = ~np.isnan(closes)
+
+        for window in self.windows.values():
+            window.push(closes, mask)
+        for kernel in self.emas.values():
+            kernel.push(closes, mask)
+        macd_line = self.emas["EMA12"].value - self.emas["EMA26"].value
+        self.macd_signal.push(macd_line, mask)
+
+        # rsi() turns the first bar's NaN delta into a zero gain/loss
+        delta = np.where(
+            np.isnan(self.previous_close), 0.0, closes - self.previous_close
+        )
+        self.rsi_gains.push(np.where(delta > 0, delta, 0.0), mask)
+        self.rsi_losses.push(np.where(delta < 0, -delta, 0.0), mask)
+        self.previous_close[mask] = closes[mask]
+
+        results = {
+            name: self.windows[period].mean()
+            for name, period in self.sma_periods.items()
+        }
+        for name, kernel in self.emas.items():
+            results[name] = kernel.value.copy()
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rs = self.rsi_gains.mean() / self.rsi_losses.mean()
+        results["RSI"] = 100 - (100 / (1 + rs))
+
+        results["MACD"] = macd_line
+        results["MACD_Signal"] = self.macd_signal.value.copy()
+        results["MACD_Histogram"] = macd_line - self.macd_signal.value
+
+        middle = self.windows[self.bb_mid_period].mean()
+        std = self.windows[self.bb_std_period].std()
+        results["BB_Middle"] = middle
+        results["BB_Upper"] = middle + std * 2
+        results["BB_Lower"] = middle - std * 2
+
+        for values in results.values():
+            values[~mask] = np.nan
+        return results
+
+    def run(self, closes: np.ndarray):
+        """
+        Steps through a (bars × symbols) close matrix, returning
+        {indicator_name: (bars × symbols) values}.
+        """
+        results = {}
+        for i, row in enumerate(closes):
+            for name, values in self.step(row).items():
+                if name not in results:
+                    results[name] = np.full(closes.shape, np.nan)
+                results[name][i] = values
+        return results
@@ -1,8 +1,25 @@
+import os
+import re
+
+import numpy as np
 import pandas as pd
+import yaml
 from abc import ABC, abstractmethod
 
+from src.analysis.batch import indicator_registry
+from src.analysis.expressions import (
+    compile_expression,
+    evaluate_masks,
+    max_lag,
+    required_columns,
+    symbol_layout,
+)
+
 screener_registry = {}
 
+# Screeners defined in YAML, registered at import
+SCREENER_FILE = os.path.join(os.path.dirname(__file__), "screeners.yaml")
+
 
 def register_screener(name):
     def decorator(cls):
@@ -13,40 +30,68 @@ def register_screener(name):
 
 
 class BaseScreener(ABC):
+    # Indicator columns apply() reads, so callers load/compute only those
+    # (None: all indicators)
+    requires = None
+    # Bars per symbol apply() needs to see to decide the last one (None: unknown)
+    lookback = None
+
     @abstractmethod
     def apply(self, data: pd.DataFrame) -> pd.Series:
         pass
 
 
+class ExpressionScreener(BaseScreener):
+    """
+    Screener defined by a condition expression (see src/analysis/expressions.py),
+    evaluated per symbol on the long multi-symbol frame, e.g.
+    "cross_above(SMA50, SMA200)".
+    """
+
+    expression = None
+
+    @property
+    def node(self):
+        return compile_expression(self.expression)
+
+    @property
+    def requires(self):
+        return tuple(
+            name for name in required_columns(self.node) if name in indicator_registry
+        )
+
+    @property
+    def lookback(self):
+        return max_lag(self.node) + 1
+
+    def apply(self, data: pd.DataFrame) -> pd.Series:
+        mask = evaluate_masks(data, {"mask": self.node})["mask"]
+        return pd.Series(mask, index=data.index)
+
+
 @register_screener("rsi_oversold")
-class RSIOversoldScreener(BaseScreener):
+class RSIOversoldScreener(ExpressionScreener):
     def __init__(self, threshold: float = 30):
         self.threshold = threshold
 
-    def apply(self, data: pd.DataFrame) -> pd.Series:
-        return data["RSI"] < self.threshold
+    @property
+    def expression(self):
+        return f"RSI < {self.threshold}"
 
 
 @register_screener("macd_bullish_cross")
-class MACDBullishCrossScreener(BaseScreener):
-    def apply(self, data: pd.DataFrame) -> pd.Series:
-        return (data["MACD"] > data["MACD_Signal"]) & (
-            data["MACD"].shift(1) <= data["MACD_Signal"].shift(1)
-        )
+class MACDBullishCrossScreener(ExpressionScreener):
+    expression = "cross_above(MACD, MACD_Signal)"
 
 
 @register_screener("bollinger_breakout")
-class BollingerBreakoutScreener(BaseScreener):
-    def apply(self, data: pd.DataFrame) -> pd.Series:
-        return data["close"] > data["BB_Upper"]
+class BollingerBreakoutScreener(ExpressionScreener):
+    expression = "close > BB_Upper"
 
 
 @register_screener("golden_cross")
-class GoldenCrossScreener(BaseScreener):
-    def apply(self, data: pd.DataFrame) -> pd.Series:
-        return (data["SMA50"] > data["SMA200"]) & (
-            data["SMA50"].shift(1) <= data["SMA200"].shift(1)
-        )
+class GoldenCrossScreener(ExpressionScreener):
+    expression = "cross_above(SMA50, SMA200)"
 
 
 class CompositeScreener(BaseScreener):
@@ -58,17 +103,204 @@ class CompositeScreener(BaseScreener):
         self.mode = mode.upper()
         self.screeners = screeners  # We already have *objects*, not strings.
 
-    def apply(self, data: pd.DataFrame) -> pd.Series:
-        if not self.screeners:
-            # If no screeners, return a Series of all False
-            return pd.Series([False] * len(data), index=data.index)
+    @property
+    def requires(self):
+        names = []
+        for screener in self.screeners:
+            if screener.requires is None:
+                return None
+            names.extend(n for n in screener.requires if n not in names)
+        return tuple(names)
 
-        results = [screener.apply(data) for screener in self.screeners]
-        combined_result = pd.concat(results, axis=1)
+    @property
+    def lookback(self):
+        lookbacks = [screener.lookback for screener in self.screeners]
+        if None in lookbacks:
+            return None
+        return max(lookbacks, default=1)
+
+    def masks(self, data: pd.DataFrame, layout=None) -> np.ndarray:
+        """
+        (screeners × rows) boolean matrix, each screener evaluated once.
+        Expression screeners are evaluated together, sharing their common
+        subexpressions.
+        """
+        expressions = {
+            i: screener.node
+            for i, screener in enumerate(self.screeners)
+            if isinstance(screener, ExpressionScreener)
+        }
+        masks = np.zeros((len(self.screeners), len(data)), dtype=bool)
+        if expressions:
+            for i, mask in evaluate_masks(data, expressions, layout=layout).items():
+                masks[i] = mask
+        for i, screener in enumerate(self.screeners):
+            if i not in expressions:
+                masks[i] = screener.apply(data).to_numpy(dtype=bool)
+        return masks
 
+    def combine(self, masks: np.ndarray) -> np.ndarray:
         if self.mode == "AND":
-            return combined_result.all(axis=1)
+            return np.logical_and.reduce(masks, axis=0)
         elif self.mode == "OR":
-            return combined_result.any(axis=1)
+            return np.logical_or.reduce(masks, axis=0)
         else:
             raise ValueError("Mode must be 'AND' or 'OR'")
+
+    def apply(self, data: pd.DataFrame) -> pd.Series:
+        if not self.screeners:
+            # If no screeners, return a Series of all False
+            return pd.Series([False] * len(data), index=data.index)
+        return pd.Series(self.combine(self.masks(data)), index=data.index)
+
+    def run(self, data: pd.DataFrame) -> "ScreeningResult":
+        """
+        Evaluates every screener once on data and returns the masks with their
+        combination; see ScreeningResult.
+        """
+        layout = symbol_layout(data)
+        if layout.order is not None:
+            data = data.iloc[layout.order].reset_index(drop=True)
+            layout = layout._replace(order=None)
+        masks = self.masks(data, layout)
+        return ScreeningResult(
+            data,
+            [screener.__class__.__name__ for screener in self.screeners],
+            masks,
+            self.combine(masks) if self.screeners else np.zeros(len(data), bool),
+            layout.starts,
+        )
+
+
+class ScreeningResult:
+    """
+    Outcome of CompositeScreener.run: masks[i, row] is True where screener
+    names[i] matched row of data, combined is their AND/OR. data is grouped by
+    symbol and sorted by date, and starts holds the row of each symbol's first
+    bar, so per-symbol results are array slices rather than groupbys.
+    """
+
+    def __init__(
+        self,
+        data: pd.DataFrame,
+        names: list,
+        masks: np.ndarray,
+        combined: np.ndarray,
+        starts: np.ndarray,
+    ):
+        self.data = data
+        self.names = names
+        self.masks = masks
+        self.combined = combined
+        self.starts = starts
+        self.ends = np.append(starts[1:], len(data))
+
+    def mask(self, name: str = None) -> np.ndarray:
+        """
+        Rows matched by the named screener, or by the combination if None.
+        """
+        return self.combined if name is None else self.masks[self.names.index(name)]
+
+    def latest_rows(self, name: str = None) -> np.ndarray:
+        """
+        Row of each symbol's last matching bar, in symbol order.
+        """
+        rows = np.flatnonzero(self.mask(name))
+        group = np.searchsorted(self.starts, rows, side="right") - 1
+        is_last = np.ones(len(rows), dtype=bool)
+        is_last[:-1] = group[1:] != group[:-1]
+        return rows[is_last]
+
+    def latest(self, name: str = None) -> pd.DataFrame:
+        """
+        Each matching symbol's last matching bar, with all of data's columns.
+        """
+        return self.data.iloc[self.latest_rows(name)].reset_index(drop=True)
+
+    def symbols(self, name: str = None) -> list:
+        return [str(symbol) for symbol in self.latest(name)["symbol"]]
+
+    def counts(self) -> dict:
+        """
+        {screener name: matching symbols}, plus "combined".
+        """
+        counts = {name: len(self.latest_rows(name)) for name in self.names}
+        counts["combined"] = len(self.latest_rows())
+        return counts
+
+    def group_slice(self, row: int) -> slice:
+        """
+        Rows of all bars of the symbol that row belongs to.
+        """
+        group = np.searchsorted(self.starts, row, side="right") - 1
+        return slice(self.starts[group], self.ends[group])
+
+    def history(self, row: int) -> pd.DataFrame:
+        return self.data.iloc[self.group_slice(row)]
+
+    def detailed_results(self, stats: dict) -> dict:
+        """
+        {screener name: [stock dict]} for generate_html_report: per matching
+        symbol its latest matching values of the stats columns ({key: column})
+        and its price history.
+        """
+        date_column = "date" if "date" in self.data.columns else "week_start_date"
+        price_columns = [
+            column
+            for column in (date_column, "open", "high", "low", "close", "volume")
+            if column in self.data.columns
+        ]
+        prices = self.data[price_columns].rename(columns={date_column: "date"})
+        results = {}
+        for name in self.names:
+            rows = self.latest_rows(name)
+            latest = self.data.iloc[rows]
+            stat_values = {
+                key: latest[column].tolist() if column in latest else [None] * len(rows)
+                for key, column in stats.items()
+            }
+            results[name] = [
+                {
+                    "symbol": str(symbol),
+                    **{key: values[i] for key, values in stat_values.items()},
+                    "data": prices.iloc[self.group_slice(row)].reset_index(drop=True),
+                }
+                for i, (symbol, row) in enumerate(zip(latest["symbol"], rows))
+            ]
+        return results
+
+
+def load_screener_file(path: str) -> list:
+    """
+    Registers the screeners of a YAML file, each an ExpressionScreener subclass:
+
+        screeners:
+          death_cross:
+            description: SMA50 crosses below SMA200
+            condition: cross_below(SMA50, SMA200)
+
+    Conditions are compiled on load, so invalid ones fail early. Returns the
+    registered names.
+    """
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+
+    names = []
+    for name, definition in (config.get("screeners") or {}).items():
+        compile_expression(definition["condition"])
+        class_name = "".join(part.title() for part in re.split(r"[^0-9a-zA-Z]+", name))
+        cls = type(
+            f"{class_name}Screener",
+            (ExpressionScreener,),
+            {
+                "expression": definition["condition"],
+                "__doc__": definition.get("description"),
+            },
+        )
+        register_screener(name)(cls)
+        names.append(name.lower())
+    return names
+
+
+if os.path.exists(SCREENER_FILE):
+    load_screener_file(SCREENER_FILE)
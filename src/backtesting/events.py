@@ -0,0 +1,552 @@
+"""
+Event-driven backtests for path-dependent strategies: stops, trailing stops,
+position sizing and cash limits.
+
+Bars are streamed one date at a time (DataService.iter_bars_by_date or
+AnalyticsSnapshot.iter_bars_by_date through bar_batches), so memory stays flat
+however long the history is. A date's bars stay column arrays (BarBatch); Bar,
+Order, Fill and Position are __slots__ objects. Orders submitted at a bar's
+close fill at their symbol's next bar: market orders at the open, stop and
+limit orders at the open or their price once a bar trades through it.
+"""
+
+import logging
+from array import array
+from math import floor, isnan
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.batch import Node
+from src.analysis.expressions import evaluate_matrix_masks, max_lag, required_columns
+from src.backtesting.metrics import RunningMetrics
+
+logger = logging.getLogger(__name__)
+
+BAR_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+ORDER_KINDS = ("market", "stop", "limit")
+
+
+class Bar:
+    __slots__ = ("symbol", "date", "open", "high", "low", "close", "volume")
+
+    def __init__(self, symbol, date, open, high, low, close, volume):
+        self.symbol = symbol
+        self.date = date
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __repr__(self):
+        return f"Bar({self.symbol}, {self.date:%Y-%m-%d}, close={self.close})"
+
+
+class BarBatch:
+    """
+    Bars of one date as column arrays: symbols[i] has columns[name][i], and
+    codes[i] is its position in the backtest universe.
+    """
+
+    __slots__ = ("date", "symbols", "codes", "columns", "_rows")
+
+    def __init__(
+        self,
+        date: pd.Timestamp,
+        symbols: np.ndarray,
+        codes: np.ndarray,
+        columns: Dict[str, np.ndarray],
+    ):
+        self.date = date
+        self.symbols = symbols
+        self.codes = codes
+        self.columns = columns
+        self._rows = None
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def row(self, symbol: str):
+        """
+        Row of symbol's bar, or None if it has no bar on this date.
+        """
+        if self._rows is None:
+            self._rows = dict(zip(self.symbols.tolist(), range(len(self.symbols))))
+        return self._rows.get(symbol)
+
+    def bar(self, row: int) -> Bar:
+        columns = self.columns
+        return Bar(
+            self.symbols[row],
+            self.date,
+            columns["open"][row],
+            columns["high"][row],
+            columns["low"][row],
+            columns["close"][row],
+            columns["volume"][row],
+        )
+
+    def __iter__(self) -> Iterator[Bar]:
+        for row in range(len(self)):
+            yield self.bar(row)
+
+
+def bar_batches(
+    frames: Iterable[Tuple[pd.Timestamp, pd.DataFrame]],
+    universe: Sequence[str],
+    columns: List[str] = None,
+) -> Iterator[BarBatch]:
+    """
+    BarBatches of the given columns (default: OHLCV and every other numeric
+    column) from a (date, frame) stream; bars of symbols outside universe are
+    dropped.
+    """
+    universe_index = pd.Index(universe)
+    symbols = np.asarray(universe, dtype=object)
+    categories, category_codes = None, None
+    for date, frame in frames:
+        keys = frame["symbol"]
+        if isinstance(keys.dtype, pd.CategoricalDtype):
+            # Categories are mapped to the universe once while they stay the same
+            if categories is None or not keys.cat.categories.equals(categories):
+                categories = keys.cat.categories
+                category_codes = np.append(universe_index.get_indexer(categories), -1)
+            codes = category_codes[keys.cat.codes.to_numpy()]
+        else:
+            codes = universe_index.get_indexer(keys)
+        keep = codes >= 0
+        names = columns
+        if names is None:
+            names = [
+                c for c in frame.columns[2:] if pd.api.types.is_numeric_dtype(frame[c])
+            ]
+        yield BarBatch(
+            pd.Timestamp(date),
+            symbols[codes[keep]],
+            codes[keep],
+            {
+                name: frame[name].to_numpy(dtype=np.float64, na_value=np.nan)[keep]
+                for name in names
+            },
+        )
+
+
+class StreamingSignals:
+    """
+    Evaluates compiled conditions on each date's bars as they stream. Only the
+    last max_lag + 1 bars of each referenced column are kept per symbol, and
+    lag() steps back through a symbol's own bars, as in evaluate_masks.
+    """
+
+    def __init__(self, expressions: Dict[str, Node], n_symbols: int):
+        self.expressions = expressions
+        self.names = []
+        for expression in expressions.values():
+            self.names.extend(
+                n for n in required_columns(expression) if n not in self.names
+            )
+        depth = max(max_lag(expression) for expression in expressions.values()) + 1
+        self.history = {
+            name: np.full((depth, n_symbols), np.nan) for name in self.names
+        }
+
+    def update(self, batch: BarBatch) -> Dict[str, np.ndarray]:
+        """
+        {expression name: boolean array aligned with batch's rows}.
+        """
+        missing = [name for name in self.names if name not in batch.columns]
+        if missing:
+            raise KeyError(f"Strategy signals need missing column(s): {missing}")
+        windows = {}
+        for name in self.names:
+            history = self.history[name]
+            window = history[:, batch.codes]
+            window[:-1] = window[1:]
+            window[-1] = batch.columns[name]
+            history[:, batch.codes] = window
+            windows[name] = window
+        masks = evaluate_matrix_masks(windows, self.expressions)
+        return {name: mask[-1] for name, mask in masks.items()}
+
+
+class Order:
+    """
+    quantity > 0 buys, < 0 sells. A stop order triggers once a bar trades at or
+    through price (above for buys, below for sells), a limit order fills at price
+    or better. stop_loss and trailing_stop (fractions) are set on the position a
+    buy opens.
+    """
+
+    __slots__ = (
+        "symbol",
+        "quantity",
+        "kind",
+        "price",
+        "date",
+        "tag",
+        "stop_loss",
+        "trailing_stop",
+    )
+
+    def __init__(
+        self,
+        symbol: str,
+        quantity: float,
+        kind: str = "market",
+        price: float = None,
+        date=None,
+        tag: str = None,
+        stop_loss: float = None,
+        trailing_stop: float = None,
+    ):
+        if kind not in ORDER_KINDS:
+            raise ValueError(f"Order kind must be one of {ORDER_KINDS}")
+        if kind != "market" and price is None:
+            raise ValueError(f"A {kind} order needs a price")
+        self.symbol = symbol
+        self.quantity = quantity
+        self.kind = kind
+        self.price = price
+        self.date = date
+        self.tag = tag
+        self.stop_loss = stop_loss
+        self.trailing_stop = trailing_stop
+
+
+class Fill:
+    __slots__ = ("symbol", "date", "quantity", "price", "fee", "tag")
+
+    def __init__(self, symbol, date, quantity, price, fee, tag):
+        self.symbol = symbol
+        self.date = date
+        self.quantity = quantity
+        self.price = price
+        self.fee = fee
+        self.tag = tag
+
+
+class Position:
+    __slots__ = (
+        "symbol",
+        "quantity",
+        "entry_date",
+        "entry_bar",
+        "entry_price",
+        "cost",
+        "stop",
+        "trailing_stop",
+        "high_water",
+        "last_price",
+    )
+
+    def __init__(self, symbol, quantity, date, bar, price, cost):
+        self.symbol = symbol
+        self.quantity = quantity
+        self.entry_date = date
+        self.entry_bar = bar
+        self.entry_price = price
+        self.cost = cost  # cash paid, fees included
+        self.stop = None  # absolute stop price
+        self.trailing_stop = None  # fraction below high_water
+        self.high_water = price  # highest close since entry
+        self.last_price = price
+
+    @property
+    def market_value(self) -> float:
+        return self.quantity * self.last_price
+
+    def stop_price(self):
+        stop = self.stop
+        if self.trailing_stop is not None:
+            trail = self.high_water * (1 - self.trailing_stop)
+            stop = trail if stop is None else max(stop, trail)
+        return stop
+
+
+class Broker:
+    """
+    Cash, positions and pending orders of a long-only event-driven backtest.
+    Buys are cut to the shares the cash pays for (fees included); sells are cut
+    to the position held.
+    """
+
+    def __init__(self, capital: float, fee: float = 0.0):
+        self.cash = capital
+        self.fee = fee
+        self.positions: Dict[str, Position] = {}
+        self.orders: List[Order] = []
+        self.trades = []
+        self.fills: List[Fill] = []  # fills of the current date
+        self.date = None
+        self.bar_index = -1
+
+    @property
+    def equity(self) -> float:
+        return self.cash + sum(p.market_value for p in self.positions.values())
+
+    def submit(self, order: Order) -> Order:
+        order.date = self.date
+        self.orders.append(order)
+        return order
+
+    def buy(self, symbol: str, quantity: float, kind="market", price=None, **kw):
+        return self.submit(Order(symbol, quantity, kind, price, **kw))
+
+    def sell(self, symbol: str, quantity: float, kind="market", price=None, **kw):
+        return self.submit(Order(symbol, -quantity, kind, price, **kw))
+
+    def close(self, symbol: str, tag: str = None):
+        """
+        Market order selling all of symbol, unless a sell is already pending.
+        """
+        position = self.positions.get(symbol)
+        if position is None or any(
+            o.symbol == symbol and o.quantity < 0 for o in self.orders
+        ):
+            return None
+        return self.sell(symbol, position.quantity, tag=tag)
+
+    def cancel(self, symbol: str = None):
+        """
+        Cancels the pending orders of symbol, or all of them if None.
+        """
+        if symbol is None:
+            self.orders = []
+        else:
+            self.orders = [o for o in self.orders if o.symbol != symbol]
+
+    def pending_symbols(self) -> set:
+        return {o.symbol for o in self.orders}
+
+    def _fill_price(self, order: Order, open_, high, low):
+        if order.kind == "market":
+            return open_
+        buy = order.quantity > 0
+        if order.kind == "stop":
+            if buy and high >= order.price:
+                return max(open_, order.price)
+            if not buy and low <= order.price:
+                return min(open_, order.price)
+        else:
+            if buy and low <= order.price:
+                return min(open_, order.price)
+            if not buy and high >= order.price:
+                return max(open_, order.price)
+        return None
+
+    def _execute(self, symbol, quantity, price, tag, order: Order = None):
+        fee_rate = self.fee
+        position = self.positions.get(symbol)
+        if quantity > 0:
+            quantity = min(quantity, floor(self.cash / (price * (1 + fee_rate))))
+            if quantity <= 0:
+                logger.debug(f"{self.date:%Y-%m-%d}: not enough cash to buy {symbol}")
+                return None
+            cost = quantity * price * (1 + fee_rate)
+            self.cash -= cost
+            if position is None:
+                position = Position(
+                    symbol, quantity, self.date, self.bar_index, price, cost
+                )
+                self.positions[symbol] = position
+                if order is not None and order.stop_loss is not None:
+                    position.stop = price * (1 - order.stop_loss)
+                if order is not None:
+                    position.trailing_stop = order.trailing_stop
+            else:
+                position.quantity += quantity
+                position.cost += cost
+                position.entry_price = position.cost / position.quantity
+        else:
+            if position is None:
+                return None
+            quantity = -min(-quantity, position.quantity)
+            proceeds = -quantity * price * (1 - fee_rate)
+            self.cash += proceeds
+            cost = position.cost * -quantity / position.quantity
+            position.cost -= cost
+            position.quantity += quantity
+            self.trades.append(
+                (
+                    symbol,
+                    position.entry_date,
+                    self.date,
+                    position.entry_price,
+                    price,
+                    -quantity,
+                    self.bar_index - position.entry_bar,
+                    proceeds - cost,
+                    proceeds / cost - 1,
+                    tag,
+                )
+            )
+            if position.quantity <= 0:
+                del self.positions[symbol]
+        fill = Fill(
+            symbol, self.date, quantity, price, abs(quantity) * price * fee_rate, tag
+        )
+        self.fills.append(fill)
+        return fill
+
+    def process(self, batch: BarBatch):
+        """
+        Moves to batch's date: fills the pending orders of symbols with a bar,
+        triggers position stops, then marks positions to the closes.
+        """
+        self.date = batch.date
+        self.bar_index += 1
+        self.fills = []
+        columns = batch.columns
+        open_, high, low, close = (
+            columns["open"],
+            columns["high"],
+            columns["low"],
+            columns["close"],
+        )
+
+        pending = []
+        for order in self.orders:
+            row = batch.row(order.symbol)
+            price = None
+            if row is not None and not isnan(open_[row]):
+                price = self._fill_price(order, open_[row], high[row], low[row])
+            if price is None:
+                pending.append(order)
+            else:
+                self._execute(order.symbol, order.quantity, price, order.tag, order)
+        self.orders = pending
+
+        for position in list(self.positions.values()):
+            row = batch.row(position.symbol)
+            if row is None or isnan(close[row]):
+                continue
+            stop = position.stop_price()
+            if stop is not None and low[row] <= stop:
+                # Gaps through the stop fill at the open; without one, at the stop
+                self._execute(
+                    position.symbol,
+                    -position.quantity,
+                    stop if isnan(open_[row]) else min(open_[row], stop),
+                    "stop",
+                )
+                continue
+            position.last_price = close[row]
+            position.high_water = max(position.high_water, close[row])
+
+
+class EventBacktestResult(NamedTuple):
+    dates: np.ndarray  # (dates,)
+    equity: np.ndarray  # (dates,) portfolio value after each date's close
+    exposure: np.ndarray  # (dates,) fraction of equity in positions
+    trades: pd.DataFrame
+    capital: float
+    bars: int
+    periods_per_year: int
+    metrics: Dict[str, float]  # RunningMetrics summary, updated per date
+
+    @property
+    def portfolio_returns(self) -> np.ndarray:
+        return np.diff(self.equity, prepend=self.capital) / np.concatenate(
+            [[self.capital], self.equity[:-1]]
+        )
+
+    def equity_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {"equity": self.equity, "returns": self.portfolio_returns},
+            index=pd.DatetimeIndex(self.dates, name="date"),
+        )
+
+    def summary(self) -> Dict[str, float]:
+        return dict(self.metrics)
+
+
+TRADE_COLUMNS = [
+    "symbol",
+    "entry_date",
+    "exit_date",
+    "entry_price",
+    "exit_price",
+    "quantity",
+    "bars",
+    "pnl",
+    "return",
+    "exit_reason",
+]
+
+
+class EventBacktester:
+    """
+    Runs a strategy over a BarBatch stream. Per date the broker fills pending
+    orders and stops, then strategy.on_bars(batch, broker) submits new orders;
+    only the equity and exposure of each date are kept, and the summary
+    metrics are accumulated as the dates and trades come in.
+    """
+
+    def __init__(
+        self,
+        strategy,
+        capital: float = 100_000.0,
+        fee: float = 0.0,
+        periods_per_year: int = 252,
+    ):
+        self.strategy = strategy
+        self.capital = capital
+        self.fee = fee
+        self.periods_per_year = periods_per_year
+
+    def run(
+        self, batches: Iterable[BarBatch], universe: Sequence[str]
+    ) -> EventBacktestResult:
+        broker = Broker(self.capital, self.fee)
+        self.strategy.start(universe)
+        dates, equity, exposure = [], array("d"), array("d")
+        metrics = RunningMetrics(self.periods_per_year)
+        bars = 0
+        previous, closed = self.capital, 0
+        return_field = TRADE_COLUMNS.index("return")
+        for batch in batches:
+            broker.process(batch)
+            self.strategy.on_bars(batch, broker)
+            value = broker.equity
+            dates.append(batch.date)
+            equity.append(value)
+            exposure.append(1 - broker.cash / value if value > 0 else 0.0)
+            bars += len(batch)
+            metrics.update(value / previous - 1 if previous else 0.0, exposure[-1])
+            previous = value
+            for trade in broker.trades[closed:]:
+                metrics.add_trade(trade[return_field])
+            closed = len(broker.trades)
+
+        # Positions still held are marked at their last close
+        trades = list(broker.trades)
+        for position in broker.positions.values():
+            value = position.market_value
+            trades.append(
+                (
+                    position.symbol,
+                    position.entry_date,
+                    broker.date,
+                    position.entry_price,
+                    np.nan,
+                    position.quantity,
+                    broker.bar_index - position.entry_bar,
+                    value - position.cost,
+                    value / position.cost - 1,
+                    "open",
+                )
+            )
+            metrics.add_trade(value / position.cost - 1)
+        return EventBacktestResult(
+            np.asarray(dates, dtype="datetime64[ns]"),
+            np.frombuffer(equity, dtype=np.float64),
+            np.frombuffer(exposure, dtype=np.float64),
+            pd.DataFrame(trades, columns=TRADE_COLUMNS),
+            self.capital,
+            bars,
+            self.periods_per_year,
+            metrics.summary(),
+        )
@@ -0,0 +1,280 @@
+"""
+Performance metrics of backtests, for many runs at once.
+
+Per-bar returns are (runs × bars) arrays, one row per equity curve (e.g. one
+per parameter set of a sweep), and every metric is a NumPy reduction along the
+bar axis. Trade metrics take the trades' returns of all runs flat, with the run
+each trade belongs to. RunningMetrics computes the same metrics bar by bar for
+the event-driven engine, without keeping the curve.
+"""
+
+from math import nan, sqrt
+from typing import Dict, Tuple
+
+import numpy as np
+
+# Order of the metrics in summaries
+METRICS = (
+    "total_return",
+    "cagr",
+    "max_drawdown",
+    "max_drawdown_duration",
+    "sharpe",
+    "sortino",
+    "trades",
+    "win_rate",
+    "avg_win",
+    "avg_loss",
+    "exposure",
+)
+
+# Runs reduced per block, so the block's temporaries stay in cache
+METRICS_BLOCK_ROWS = 64
+
+# Deviations below this fraction of the mean return are rounding noise (e.g. of
+# a constant curve), leaving Sharpe and Sortino undefined rather than huge
+RATIO_TOLERANCE = 1e-12
+
+
+def _curve_metrics(
+    returns: np.ndarray,
+    out: Dict[str, np.ndarray],
+    rows: slice,
+    scratch: Tuple[np.ndarray, np.ndarray, np.ndarray],
+):
+    n_runs, n_bars = returns.shape
+    curve, peak, at_peak = (buffer[:n_runs] for buffer in scratch)
+    np.add(returns, 1, out=curve)
+    np.cumprod(curve, axis=1, out=curve)
+    # Peaks include the starting capital (1.0)
+    np.maximum.accumulate(curve, axis=1, out=peak)
+    np.maximum(peak, 1.0, out=peak)
+    out["total_return"][rows] = curve[:, -1] - 1
+
+    # Longest run of bars below the previous peak: the longest gap between
+    # bars at a peak, with the start (column 0) and end (column n_bars + 1)
+    # counting as peaks
+    np.greater_equal(curve, peak, out=at_peak[:, 1:-1])
+    index = np.flatnonzero(at_peak)
+    gaps = np.diff(index) - 1
+    row_starts = np.arange(n_runs) * (n_bars + 2)
+    out["max_drawdown_duration"][rows] = np.maximum.reduceat(
+        gaps, np.searchsorted(index, row_starts)
+    )
+
+    np.divide(curve, peak, out=curve)
+    out["max_drawdown"][rows] = np.minimum(curve.min(axis=1) - 1, 0.0)
+
+    mean = returns.mean(axis=1)
+    if n_bars > 1:
+        np.subtract(returns, mean[:, None], out=curve)
+        std = np.sqrt(np.einsum("ij,ij->i", curve, curve) / (n_bars - 1))
+    else:
+        std = np.zeros(n_runs)
+    np.minimum(returns, 0.0, out=curve)
+    downside = np.sqrt(np.einsum("ij,ij->i", curve, curve) / n_bars)
+    noise = RATIO_TOLERANCE * np.abs(mean)
+    out["sharpe"][rows] = np.where(std > noise, mean / std, np.nan)
+    out["sortino"][rows] = np.where(downside > noise, mean / downside, np.nan)
+
+
+def return_metrics(
+    returns: np.ndarray, exposure: np.ndarray = None, periods_per_year: int = 252
+) -> Dict[str, np.ndarray]:
+    """
+    Total return, CAGR, max drawdown, max drawdown duration (bars), Sharpe and
+    Sortino ratios (annualized, zero risk-free rate and target) and mean
+    exposure of each row of returns (runs × bars, a 1-D array is one run).
+    """
+    returns = np.atleast_2d(np.asarray(returns, dtype=np.float64))
+    n_runs, n_bars = returns.shape
+    out = {
+        name: np.full(n_runs, np.nan)
+        for name in (
+            "total_return",
+            "max_drawdown",
+            "max_drawdown_duration",
+            "sharpe",
+            "sortino",
+        )
+    }
+    if n_bars == 0:
+        out["total_return"][:] = 0.0
+        out["max_drawdown"][:] = 0.0
+        out["max_drawdown_duration"][:] = 0
+    else:
+        # Block-sized buffers reused by every block: curve, peak, at-peak mask
+        block = min(n_runs, METRICS_BLOCK_ROWS)
+        scratch = (
+            np.empty((block, n_bars)),
+            np.empty((block, n_bars)),
+            np.ones((block, n_bars + 2), dtype=bool),
+        )
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for start in range(0, n_runs, METRICS_BLOCK_ROWS):
+                rows = slice(start, start + METRICS_BLOCK_ROWS)
+                _curve_metrics(returns[rows], out, rows, scratch)
+    out["max_drawdown_duration"] = out["max_drawdown_duration"].astype(np.int64)
+    if n_bars < 2:
+        out["sharpe"][:] = np.nan
+        out["sortino"][:] = np.nan
+    out["sharpe"] *= np.sqrt(periods_per_year)
+    out["sortino"] *= np.sqrt(periods_per_year)
+
+    years = n_bars / periods_per_year
+    with np.errstate(invalid="ignore"):
+        out["cagr"] = (
+            (1 + out["total_return"]) ** (1 / years) - 1
+            if years > 0
+            else np.full(n_runs, np.nan)
+        )
+    if exposure is None:
+        out["exposure"] = np.full(n_runs, np.nan)
+    else:
+        exposure = np.atleast_2d(exposure)
+        out["exposure"] = (
+            exposure.mean(axis=1) if exposure.shape[1] else np.zeros(n_runs)
+        )
+    return out
+
+
+def trade_metrics(
+    trade_returns: np.ndarray, runs: np.ndarray = None, n_runs: int = 1
+) -> Dict[str, np.ndarray]:
+    """
+    Trade count, win rate and average winning/losing (<= 0) trade return per
+    run, from the trades of all runs and the run index of each (default: all
+    in run 0).
+    """
+    trade_returns = np.asarray(trade_returns, dtype=np.float64)
+    if runs is None:
+        runs = np.zeros(len(trade_returns), dtype=np.intp)
+    won = trade_returns > 0
+    trades = np.bincount(runs, minlength=n_runs)
+    wins = np.bincount(runs, weights=won, minlength=n_runs)
+    win_sum = np.bincount(
+        runs, weights=np.where(won, trade_returns, 0), minlength=n_runs
+    )
+    loss_sum = np.bincount(
+        runs, weights=np.where(won, 0, trade_returns), minlength=n_runs
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "trades": trades,
+            "win_rate": np.where(trades > 0, wins / trades, np.nan),
+            "avg_win": np.where(wins > 0, win_sum / wins, np.nan),
+            "avg_loss": np.where(trades > wins, loss_sum / (trades - wins), np.nan),
+        }
+
+
+def run_metrics(
+    returns: np.ndarray,
+    trade_returns: np.ndarray,
+    runs: np.ndarray,
+    exposure: np.ndarray,
+    periods_per_year: int = 252,
+) -> Dict[str, np.ndarray]:
+    """
+    All METRICS of each run: return_metrics of returns/exposure (runs × bars)
+    and trade_metrics of the trades (trade_returns, runs).
+    """
+    metrics = return_metrics(returns, exposure, periods_per_year)
+    metrics.update(trade_metrics(trade_returns, runs, len(metrics["sharpe"])))
+    return {name: metrics[name] for name in METRICS}
+
+
+def _scalar(name: str, value):
+    return int(value) if name in ("trades", "max_drawdown_duration") else float(value)
+
+
+def summary_metrics(
+    returns: np.ndarray,
+    trade_returns: np.ndarray,
+    exposure: np.ndarray,
+    periods_per_year: int = 252,
+) -> Dict[str, float]:
+    """
+    METRICS of a single run's per-bar returns and trade returns.
+    """
+    metrics = run_metrics(returns, trade_returns, None, exposure, periods_per_year)
+    return {name: _scalar(name, values[0]) for name, values in metrics.items()}
+
+
+class RunningMetrics:
+    """
+    Online METRICS of one run, updated with each bar's return and exposure and
+    each closed trade's return. Keeps O(1) state and matches summary_metrics
+    over the same bars and trades.
+    """
+
+    def __init__(self, periods_per_year: int = 252):
+        self.periods_per_year = periods_per_year
+        self.bars = 0
+        self.growth = 1.0
+        self.peak = 1.0
+        self.max_drawdown = 0.0
+        self.underwater = 0
+        self.max_drawdown_duration = 0
+        # Welford mean / sum of squared deviations, and sum of squared losses
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.downside = 0.0
+        self.exposure = 0.0
+        self.trades = 0
+        self.wins = 0
+        self.win_sum = 0.0
+        self.loss_sum = 0.0
+
+    def update(self, ret: float, exposure: float = nan):
+        self.bars += 1
+        self.growth *= 1 + ret
+        if self.growth >= self.peak:
+            self.peak = self.growth
+            self.underwater = 0
+        else:
+            self.underwater += 1
+            self.max_drawdown = min(self.max_drawdown, self.growth / self.peak - 1)
+            self.max_drawdown_duration = max(
+                self.max_drawdown_duration, self.underwater
+            )
+        delta = ret - self.mean
+        self.mean += delta / self.bars
+        self.m2 += delta * (ret - self.mean)
+        if ret < 0:
+            self.downside += ret * ret
+        self.exposure += exposure
+
+    def add_trade(self, trade_return: float):
+        self.trades += 1
+        if trade_return > 0:
+            self.wins += 1
+            self.win_sum += trade_return
+        else:
+            self.loss_sum += trade_return
+
+    def summary(self) -> Dict[str, float]:
+        annualize = sqrt(self.periods_per_year)
+        std = sqrt(self.m2 / (self.bars - 1)) if self.bars > 1 else 0.0
+        # Sortino is undefined on a single bar, like Sharpe
+        downside = sqrt(self.downside / self.bars) if self.bars > 1 else 0.0
+        noise = RATIO_TOLERANCE * abs(self.mean)
+        years = self.bars / self.periods_per_year
+        losses = self.trades - self.wins
+        summary = {
+            "total_return": self.growth - 1,
+            "cagr": (
+                self.growth ** (1 / years) - 1
+                if years > 0 and self.growth >= 0
+                else nan
+            ),
+            "max_drawdown": self.max_drawdown,
+            "max_drawdown_duration": self.max_drawdown_duration,
+            "sharpe": self.mean / std * annualize if std > noise else nan,
+            "sortino": self.mean / downside * annualize if downside > noise else nan,
+            "trades": self.trades,
+            "win_rate": self.wins / self.trades if self.trades else nan,
+            "avg_win": self.win_sum / self.wins if self.wins else nan,
+            "avg_loss": self.loss_sum / losses if losses else nan,
+            "exposure": self.exposure / self.bars if self.bars else 0.0,
+        }
+        return {name: _scalar(name, summary[name]) for name in METRICS}
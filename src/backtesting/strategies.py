@@ -0,0 +1,284 @@
+from math import floor
+from typing import Dict, MutableMapping, Sequence, Tuple
+
+import numpy as np
+
+from src.analysis.batch import (
+    CLOSE,
+    Node,
+    ema,
+    evaluate,
+    indicator_node,
+    indicator_registry,
+    node,
+    rsi,
+    window_mean,
+    window_std,
+)
+from src.analysis.expressions import (
+    compile_expression,
+    evaluate_matrix_masks,
+    required_columns,
+)
+from src.analysis.screeners import ExpressionScreener, screener_registry
+from src.backtesting.events import BarBatch, Broker, StreamingSignals
+from src.backtesting.vectorized import MarketData
+
+strategy_registry = {}
+
+
+def register_strategy(name):
+    def decorator(cls):
+        strategy_registry[name.lower()] = cls
+        return cls
+
+    return decorator
+
+
+def signal_node(signal: str):
+    """
+    Compiled condition of a registered expression screener name, or of a
+    condition expression over the bar and indicator columns.
+    """
+    screener_class = screener_registry.get(signal.lower())
+    if screener_class is not None and issubclass(screener_class, ExpressionScreener):
+        return screener_class().node
+    return compile_expression(signal)
+
+
+class SignalStrategy:
+    """
+    Long-only strategy entering where the entry signal fires and exiting where
+    the exit signal fires. Each signal is a screener name or a condition
+    expression, e.g. entry="golden_cross", exit="cross_below(SMA50, SMA200)".
+    """
+
+    entry = None
+    exit = None
+
+    # Parameter grid swept by default ({__init__ argument: values}), see
+    # src/backtesting/sweep.py
+    grid = {}
+
+    # Event-driven engine only: stop at entry × (1 - stop_loss), trailing stop at
+    # the highest close × (1 - trailing_stop), and at most max_positions
+    # positions, each sized to 1 / max_positions of the equity
+    stop_loss = None
+    trailing_stop = None
+    max_positions = 20
+
+    def __init__(self, entry: str = None, exit: str = None):
+        self.entry = entry or self.entry
+        self.exit = exit or self.exit
+
+    def columns(self) -> Dict[str, Node]:
+        """
+        Columns the signals read that are computed from the market's closes for
+        this strategy's parameters (e.g. an RSI of another period), by name.
+        They take the place of stored columns of the same name, also for the
+        default parameters, so every parameter set sees the same NaN handling.
+        """
+        return {}
+
+    @property
+    def stored_columns(self):
+        # Computed columns defined like the stored indicator of the same name,
+        # which the event-driven engine reads from the bars instead
+        return tuple(
+            name
+            for name, n in self.columns().items()
+            if name in indicator_registry and indicator_node(name) == n
+        )
+
+    @property
+    def event_requires(self):
+        # Stored columns read by the event-driven engine
+        names = list(self.requires)
+        names.extend(name for name in self.stored_columns if name not in names)
+        return tuple(names)
+
+    @property
+    def requires(self):
+        computed = self.columns()
+        names = []
+        for signal in (self.entry, self.exit):
+            names.extend(
+                name
+                for name in required_columns(signal_node(signal))
+                if name in indicator_registry
+                and name not in computed
+                and name not in names
+            )
+        return tuple(names)
+
+    def signals(
+        self, market: MarketData, cache: MutableMapping = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (entries, exits) boolean (dates × symbols) matrices on market. Computed
+        columns are looked up in and added to cache ({Node: matrix}) if given,
+        so strategies sharing a column's parameters compute it once.
+        """
+        expressions = {"entry": signal_node(self.entry), "exit": signal_node(self.exit)}
+        computed = self.columns()
+        names = []
+        for expression in expressions.values():
+            names.extend(n for n in required_columns(expression) if n not in names)
+        missing = [
+            name
+            for name in names
+            if name not in market.columns and name not in computed
+        ]
+        if missing:
+            raise KeyError(f"Strategy signals need missing column(s): {missing}")
+
+        matrices = {}
+        for name in names:
+            if name not in computed:
+                matrices[name] = market.columns[name]
+                continue
+            n = computed[name]
+            values = cache.get(n) if cache is not None else None
+            if values is None:
+                values = evaluate({name: n}, market.columns)[name]
+                if cache is not None:
+                    cache[n] = values
+            matrices[name] = values
+        masks = evaluate_matrix_masks(matrices, expressions)
+        return masks["entry"], masks["exit"]
+
+    #
+    # Event-driven engine hooks (see src/backtesting/events.py)
+    #
+    def start(self, universe: Sequence[str]):
+        if set(self.columns()) - set(self.stored_columns):
+            raise ValueError(
+                f"{self.__class__.__name__} computes columns from the full close "
+                "history, which the event-driven engine does not keep"
+            )
+        self.stream = StreamingSignals(
+            {"entry": signal_node(self.entry), "exit": signal_node(self.exit)},
+            len(universe),
+        )
+
+    def on_bars(self, batch: BarBatch, broker: Broker):
+        """
+        Sells held symbols whose exit signal fires and buys, in universe order,
+        symbols whose entry signal fires while positions are free.
+        """
+        masks = self.stream.update(batch)
+        entries, exits = masks["entry"], masks["exit"]
+        for symbol in list(broker.positions):
+            row = batch.row(symbol)
+            if row is not None and exits[row]:
+                broker.close(symbol, tag="exit")
+
+        pending = broker.pending_symbols()
+        free = self.max_positions - len(broker.positions.keys() | pending)
+        if free <= 0:
+            return
+        size = broker.equity / self.max_positions
+        close = batch.columns["close"]
+        for row in np.flatnonzero(entries & ~exits):
+            symbol = batch.symbols[row]
+            if symbol in broker.positions or symbol in pending:
+                continue
+            quantity = floor(size / close[row])
+            if quantity > 0:
+                broker.buy(
+                    symbol,
+                    quantity,
+                    tag="entry",
+                    stop_loss=self.stop_loss,
+                    trailing_stop=self.trailing_stop,
+                )
+                free -= 1
+                if free == 0:
+                    break
+
+
+@register_strategy("rsi_reversion")
+class RSIReversionStrategy(SignalStrategy):
+    # Buy when RSI < 30, sell when RSI > 50
+    grid = {
+        "entry_threshold": [20, 25, 30, 35],
+        "exit_threshold": [50, 55, 60, 65, 70],
+        "period": [7, 10, 14, 21],
+    }
+
+    def __init__(
+        self,
+        entry_threshold: float = 30,
+        exit_threshold: float = 50,
+        period: int = 14,
+    ):
+        self.entry_threshold = entry_threshold
+        self.exit_threshold = exit_threshold
+        self.period = period
+
+    @property
+    def entry(self):
+        return f"RSI < {self.entry_threshold}"
+
+    @property
+    def exit(self):
+        return f"RSI > {self.exit_threshold}"
+
+    def columns(self):
+        return {"RSI": node(rsi, CLOSE, period=self.period)}
+
+
+@register_strategy("golden_cross")
+class GoldenCrossStrategy(SignalStrategy):
+    entry = "golden_cross"
+    exit = "death_cross"
+
+
+@register_strategy("macd_cross")
+class MACDCrossStrategy(SignalStrategy):
+    entry = "macd_bullish_cross"
+    exit = "macd_bearish_cross"
+    grid = {"fast": [8, 12, 16], "slow": [21, 26, 34], "signal": [5, 9, 13]}
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+
+    def columns(self):
+        macd = node(
+            np.subtract,
+            node(ema, CLOSE, span=self.fast),
+            node(ema, CLOSE, span=self.slow),
+        )
+        return {"MACD": macd, "MACD_Signal": node(ema, macd, span=self.signal)}
+
+
+@register_strategy("bollinger_breakout")
+class BollingerBreakoutStrategy(SignalStrategy):
+    # Buy a close above the upper band, sell a close below the middle band
+    exit = "close < BB_Mean"
+    grid = {"period": [10, 20, 30, 50], "num_std": [1.5, 2, 2.5, 3]}
+
+    def __init__(self, period: int = 20, num_std: float = 2):
+        self.period = period
+        self.num_std = num_std
+
+    @property
+    def entry(self):
+        return f"close > BB_Mean + {self.num_std} * BB_Std"
+
+    def columns(self):
+        return {
+            "BB_Mean": window_mean(CLOSE, self.period),
+            "BB_Std": window_std(CLOSE, self.period),
+        }
+
+
+@register_strategy("trend_pullback")
+class TrendPullbackStrategy(SignalStrategy):
+    # Pullbacks in an uptrend, cut by an 8% stop or a 15% trailing stop
+    entry = "uptrend_pullback"
+    exit = "RSI > 70"
+    stop_loss = 0.08
+    trailing_stop = 0.15
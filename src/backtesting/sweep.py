@@ -0,0 +1,316 @@
+"""
+Parallel parameter sweeps of a strategy with the vectorized backtester.
+
+The market matrices are copied once into multiprocessing.shared_memory blocks,
+and pool workers map them as read-only arrays instead of receiving a copy per
+task. Parameter sets are grouped by the computed columns they need (e.g. every
+RSI threshold with the same RSI period) and sent in chunks, and each worker
+keeps an LRU of computed columns by graph node, so a column is computed once
+per worker rather than once per combination.
+
+Finished results can be appended to a CSV checkpoint: a sweep started with an
+existing checkpoint skips the parameter sets it holds, and a cancelled
+(cancel event or Ctrl-C) sweep returns what finished.
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.batch import node_signature
+from src.backtesting.metrics import run_metrics
+from src.backtesting.strategies import strategy_registry
+from src.backtesting.vectorized import MarketData, run_backtest
+
+logger = logging.getLogger(__name__)
+
+# Parameter sets per pool task
+SWEEP_CHUNK_SIZE = 8
+
+# Computed column matrices each worker keeps
+SWEEP_COLUMN_CACHE_ENTRIES = 16
+
+
+class ColumnCache(OrderedDict):
+    """
+    {Node: matrix} keeping the max_entries most recently used columns.
+    """
+
+    def __init__(self, max_entries: int = SWEEP_COLUMN_CACHE_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        if key in self:
+            self.move_to_end(key)
+            self.hits += 1
+            return self[key]
+        self.misses += 1
+        return default
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.max_entries:
+            self.popitem(last=False)
+
+
+class SharedMarketSpec(NamedTuple):
+    dates: np.ndarray
+    symbols: np.ndarray
+    columns: Dict[str, Tuple[str, Tuple[int, int]]]  # name -> (block, shape)
+
+
+class SharedMarket:
+    """
+    Float64 copies of a MarketData's matrices in shared memory blocks, owned
+    (and unlinked on close) by the creating process; workers attach by spec.
+    """
+
+    def __init__(self, market: MarketData):
+        self.blocks = []
+        columns = {}
+        try:
+            for name, matrix in market.columns.items():
+                matrix = np.asarray(matrix, dtype=np.float64)
+                block = shared_memory.SharedMemory(
+                    create=True, size=max(matrix.nbytes, 1)
+                )
+                self.blocks.append(block)
+                np.ndarray(matrix.shape, np.float64, buffer=block.buf)[:] = matrix
+                columns[name] = (block.name, matrix.shape)
+        except Exception:
+            self.close()
+            raise
+        self.spec = SharedMarketSpec(market.dates, market.symbols, columns)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_market(spec: SharedMarketSpec) -> Tuple[MarketData, list]:
+    """
+    Read-only MarketData over the blocks of spec, and the blocks to keep open
+    while it is used.
+    """
+    blocks, columns = [], {}
+    for name, (block_name, shape) in spec.columns.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        matrix = np.ndarray(shape, np.float64, buffer=block.buf)
+        matrix.flags.writeable = False
+        columns[name] = matrix
+    return MarketData(spec.dates, spec.symbols, columns), blocks
+
+
+def parameter_grid(grid: Dict[str, Sequence]) -> List[Dict]:
+    """
+    Every combination of the grid's values, e.g. {"a": [1, 2], "b": [3]} ->
+    [{"a": 1, "b": 3}, {"a": 2, "b": 3}].
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+# Attached markets and column caches of worker processes, one per spec
+_worker_markets = {}
+
+
+def worker_market(
+    spec: SharedMarketSpec, cache_entries: int = SWEEP_COLUMN_CACHE_ENTRIES
+) -> Tuple[MarketData, ColumnCache]:
+    """
+    The shared market of spec in a pool worker, attached on first use, and the
+    worker's column cache for it.
+    """
+    key = tuple(block for block, _ in spec.columns.values())
+    if key not in _worker_markets:
+        # One attached market per worker; an earlier sweep's is released
+        for _, blocks, _ in _worker_markets.values():
+            for block in blocks:
+                block.close()
+        _worker_markets.clear()
+        market, blocks = attach_market(spec)
+        _worker_markets[key] = (market, blocks, ColumnCache(cache_entries))
+    market, _, cache = _worker_markets[key]
+    return market, cache
+
+
+def run_sweep_chunk(
+    spec: SharedMarketSpec,
+    strategy_name: str,
+    param_sets: List[Dict],
+    backtest_kwargs: Dict,
+    cache_entries: int = SWEEP_COLUMN_CACHE_ENTRIES,
+) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    Process-pool task: backtests strategy_name with each parameter set on the
+    shared market and returns a row of parameters + summary metrics per set,
+    and the column cache counters of this task.
+    """
+    market, cache = worker_market(spec, cache_entries)
+    hits, misses = cache.hits, cache.misses
+
+    strategy_class = strategy_registry[strategy_name]
+    returns, exposure, trade_returns, runs = [], [], [], []
+    for run, params in enumerate(param_sets):
+        strategy = strategy_class(**params)
+        entries, exits = strategy.signals(market, cache)
+        result = run_backtest(market, entries, exits, **backtest_kwargs)
+        returns.append(result.portfolio_returns)
+        exposure.append(result.exposure)
+        trade_returns.append(result.trades["return"].to_numpy())
+        runs.append(np.full(len(result.trades), run, dtype=np.intp))
+
+    # The chunk's summary metrics in one pass over its (runs × dates) curves
+    metrics = run_metrics(
+        np.vstack(returns),
+        np.concatenate(trade_returns),
+        np.concatenate(runs),
+        np.vstack(exposure),
+        backtest_kwargs.get("periods_per_year", 252),
+    )
+    rows = [
+        {**params, **{name: values[run].item() for name, values in metrics.items()}}
+        for run, params in enumerate(param_sets)
+    ]
+    return rows, {"hits": cache.hits - hits, "misses": cache.misses - misses}
+
+
+def parameter_chunks(strategy_name: str, param_sets: List[Dict], chunk_size: int):
+    """
+    Splits param_sets into chunks of at most chunk_size, keeping parameter sets
+    that need the same computed columns together.
+    """
+    strategy_class = strategy_registry[strategy_name]
+    groups = OrderedDict()
+    for params in param_sets:
+        columns = strategy_class(**params).columns()
+        signature = "|".join(
+            f"{name}={node_signature(n)}" for name, n in sorted(columns.items())
+        )
+        groups.setdefault(signature, []).append(params)
+    for group in groups.values():
+        for i in range(0, len(group), chunk_size):
+            yield group[i : i + chunk_size]
+
+
+def _param_key(params: Dict, names: List[str]) -> tuple:
+    return tuple(params[name] for name in names)
+
+
+def run_sweep(
+    market: MarketData,
+    strategy_name: str,
+    grid: Dict[str, Sequence] = None,
+    workers: int = None,
+    results_path: str = None,
+    cancel: threading.Event = None,
+    chunk_size: int = SWEEP_CHUNK_SIZE,
+    cache_entries: int = SWEEP_COLUMN_CACHE_ENTRIES,
+    **backtest_kwargs,
+) -> pd.DataFrame:
+    """
+    Backtests every combination of grid (default: the strategy's grid) on
+    market with a process pool and returns one row per parameter set: its
+    parameters and summary metrics.
+
+    :param results_path: CSV checkpoint; finished rows are appended as they
+        arrive, and parameter sets already in it are not run again.
+    :param cancel: Stops the sweep once set: no further chunks are started and
+        the rows finished so far are returned. Ctrl-C does the same.
+    :param backtest_kwargs: Passed to run_backtest (fill, fee, ...).
+    """
+    strategy_name = strategy_name.lower()
+    strategy_class = strategy_registry[strategy_name]
+    grid = grid or strategy_class.grid
+    if not grid:
+        raise ValueError(f"No parameter grid for strategy {strategy_name!r}")
+    names = list(grid)
+    param_sets = parameter_grid(grid)
+
+    done = pd.DataFrame()
+    if results_path and os.path.exists(results_path):
+        done = pd.read_csv(results_path)
+        finished = {_param_key(row, names) for row in done[names].to_dict("records")}
+        param_sets = [p for p in param_sets if _param_key(p, names) not in finished]
+        logger.info(
+            f"Resuming sweep: {len(done)} parameter sets already in {results_path}."
+        )
+
+    rows = []
+    counts = {"hits": 0, "misses": 0}
+    started = time.perf_counter()
+    chunks = iter(parameter_chunks(strategy_name, param_sets, chunk_size))
+    workers = workers or os.cpu_count()
+    # A few chunks per worker in flight, so cancelling doesn't wait for a queue
+    # of the whole grid
+    max_pending = 2 * workers
+    with SharedMarket(market) as shared, ProcessPoolExecutor(workers) as executor:
+        pending = set()
+        try:
+            while True:
+                while len(pending) < max_pending and not (cancel and cancel.is_set()):
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    pending.add(
+                        executor.submit(
+                            run_sweep_chunk,
+                            shared.spec,
+                            strategy_name,
+                            chunk,
+                            backtest_kwargs,
+                            cache_entries,
+                        )
+                    )
+                if not pending:
+                    break
+                completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    chunk_rows, chunk_counts = future.result()
+                    rows.extend(chunk_rows)
+                    for key, count in chunk_counts.items():
+                        counts[key] += count
+                    if results_path:
+                        pd.DataFrame(chunk_rows).to_csv(
+                            results_path,
+                            mode="a",
+                            header=not os.path.exists(results_path),
+                            index=False,
+                        )
+        except KeyboardInterrupt:
+            logger.warning("Sweep interrupted; returning the finished results.")
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True, cancel_futures=True)
+    if cancel and cancel.is_set():
+        logger.info("Sweep cancelled; returning the finished results.")
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Swept {len(rows)} parameter sets of {strategy_name} in {elapsed:.2f}s "
+        f"(computed columns: {counts['hits']} cache hits, {counts['misses']} misses)."
+    )
+    frames = [frame for frame in (done, pd.DataFrame(rows)) if not frame.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
@@ -0,0 +1,253 @@
+"""
+Vectorized backtests over the whole universe at once.
+
+Prices, indicators and signals are date-aligned (dates × symbols) matrices,
+NaN where a symbol has no bar. Entry/exit signals are evaluated at a bar's
+close and filled at that close or at the next bar's open. Positions, per-symbol
+returns, trades and the portfolio equity curve are all computed with NumPy
+array operations along the date axis, without a loop per bar or per symbol.
+"""
+
+from typing import Dict, Iterable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from src.backtesting.metrics import summary_metrics
+
+FILLS = ("next_open", "close")
+
+
+class MarketData(NamedTuple):
+    dates: np.ndarray  # (dates,) datetime64[ns]
+    symbols: np.ndarray  # (symbols,)
+    columns: Dict[str, np.ndarray]  # name -> (dates, symbols) float64, NaN = no bar
+
+
+def market_data(
+    data: pd.DataFrame,
+    columns: Iterable[str] = None,
+    key_column: str = "symbol",
+    date_column: str = None,
+) -> MarketData:
+    """
+    Pivots a long (symbol, date, ...) frame, e.g. from
+    DataService.get_stock_data_with_indicators or AnalyticsSnapshot.read, into
+    date-aligned matrices of the given columns (default: all numeric ones).
+    """
+    if date_column is None:
+        date_column = "date" if "date" in data.columns else "week_start_date"
+    if columns is None:
+        columns = [
+            c
+            for c in data.columns
+            if c not in (key_column, date_column)
+            and pd.api.types.is_numeric_dtype(data[c])
+        ]
+    date_codes, dates = pd.factorize(pd.to_datetime(data[date_column]), sort=True)
+    symbol_codes, symbols = pd.factorize(data[key_column], sort=True)
+
+    matrices = {}
+    for name in columns:
+        matrix = np.full((len(dates), len(symbols)), np.nan)
+        matrix[date_codes, symbol_codes] = data[name].to_numpy(
+            dtype=np.float64, na_value=np.nan
+        )
+        matrices[name] = matrix
+    return MarketData(
+        np.asarray(dates, dtype="datetime64[ns]"), np.asarray(symbols), matrices
+    )
+
+
+def _shift(x: np.ndarray, periods: int, fill) -> np.ndarray:
+    # Rows moved down by periods along the date axis
+    out = np.full_like(x, fill)
+    if periods < x.shape[0]:
+        out[periods:] = x[: x.shape[0] - periods]
+    return out
+
+
+def _ffill(x: np.ndarray) -> np.ndarray:
+    # Last non-NaN value of each column up to each row
+    index = np.where(np.isnan(x), 0, np.arange(x.shape[0])[:, None])
+    np.maximum.accumulate(index, axis=0, out=index)
+    return x[index, np.arange(x.shape[1])]
+
+
+def positions_from_signals(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+    """
+    Position held after each bar's close: entered on an entry signal while flat,
+    left on an exit signal while long (an exit wins if both fire), i.e. each
+    column carries its latest non-zero signal forward.
+    """
+    signal = np.where(exits, -1, np.where(entries, 1, 0)).astype(np.int8)
+    index = np.where(signal != 0, np.arange(signal.shape[0])[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    return signal[index, np.arange(signal.shape[1])] == 1
+
+
+class BacktestResult(NamedTuple):
+    dates: np.ndarray  # (dates,)
+    symbols: np.ndarray  # (symbols,)
+    positions: np.ndarray  # (dates, symbols) bool, position after each close
+    returns: np.ndarray  # (dates, symbols) per-symbol strategy returns, net of fees
+    portfolio_returns: np.ndarray  # (dates,)
+    equity: np.ndarray  # (dates,) portfolio value, starting at capital
+    exposure: np.ndarray  # (dates,) fraction of the universe held during each bar
+    trades: pd.DataFrame
+    periods_per_year: int
+
+    def equity_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {"equity": self.equity, "returns": self.portfolio_returns},
+            index=pd.DatetimeIndex(self.dates, name="date"),
+        )
+
+    def summary(self) -> Dict[str, float]:
+        return summary_metrics(
+            self.portfolio_returns,
+            self.trades["return"].to_numpy(),
+            self.exposure,
+            self.periods_per_year,
+        )
+
+
+def _trades(
+    positions: np.ndarray,
+    returns: np.ndarray,
+    fill_prices: np.ndarray,
+    lag: int,
+    dates: np.ndarray,
+    symbols: np.ndarray,
+) -> pd.DataFrame:
+    """
+    One row per trade. A trade entered by the decision at bar t is filled at
+    bar t + lag, and its return is the compounded per-symbol return from that
+    fill bar through the exit's fill bar (or the last bar, if still open).
+    """
+    n_dates = positions.shape[0]
+    changes = np.diff(positions.astype(np.int8), axis=0, prepend=0)
+    # Symbol-major order, so each symbol's entries and exits alternate
+    entry_symbol, entry_bar = np.nonzero(changes.T == 1)
+    exit_symbol, exit_bar = np.nonzero(changes.T == -1)
+
+    entry_fill = entry_bar + lag
+    filled = entry_fill < n_dates
+    entry_symbol, entry_fill = entry_symbol[filled], entry_fill[filled]
+    exit_fill = exit_bar + lag
+
+    # Trades without an exit fill by the last bar are marked to it
+    exits_per_symbol = np.bincount(
+        exit_symbol[exit_fill < n_dates], minlength=len(symbols)
+    )
+    entries_per_symbol = np.bincount(entry_symbol, minlength=len(symbols))
+    open_symbols = np.flatnonzero(entries_per_symbol > exits_per_symbol)
+    closed = exit_fill < n_dates
+    exit_symbol = np.concatenate([exit_symbol[closed], open_symbols])
+    exit_fill = np.concatenate(
+        [exit_fill[closed], np.full(len(open_symbols), n_dates - 1)]
+    )
+    is_open = np.concatenate(
+        [np.zeros(closed.sum(), bool), np.ones(len(open_symbols), bool)]
+    )
+    order = np.lexsort((exit_fill, exit_symbol))
+    exit_symbol, exit_fill, is_open = (
+        exit_symbol[order],
+        exit_fill[order],
+        is_open[order],
+    )
+
+    log_growth = np.cumsum(np.log1p(returns), axis=0)
+    start = np.where(
+        entry_fill > 0,
+        log_growth[np.maximum(entry_fill - 1, 0), entry_symbol],
+        0.0,
+    )
+    trade_returns = np.expm1(log_growth[exit_fill, exit_symbol] - start)
+    return pd.DataFrame(
+        {
+            "symbol": symbols[entry_symbol],
+            "entry_date": dates[entry_fill],
+            "exit_date": dates[exit_fill],
+            "entry_price": fill_prices[entry_fill, entry_symbol],
+            "exit_price": np.where(
+                is_open, np.nan, fill_prices[exit_fill, exit_symbol]
+            ),
+            "bars": exit_fill - entry_fill,
+            "return": trade_returns,
+            "open": is_open,
+        }
+    )
+
+
+def run_backtest(
+    market: MarketData,
+    entries: np.ndarray,
+    exits: np.ndarray,
+    fill: str = "next_open",
+    fee: float = 0.0,
+    capital: float = 1.0,
+    weighting: str = "positions",
+    periods_per_year: int = 252,
+) -> BacktestResult:
+    """
+    Backtests long-only entry/exit signal matrices (dates × symbols, decided at
+    each bar's close) on market's open/close matrices.
+
+    :param fill: "next_open" fills at the next bar's open, "close" at the
+        signal bar's close.
+    :param fee: Fraction of the traded value paid on every fill.
+    :param weighting: "positions" splits the portfolio equally across the
+        positions held during a bar; "universe" gives every symbol 1/N of it,
+        leaving the rest in cash.
+    """
+    if fill not in FILLS:
+        raise ValueError(f"fill must be one of {FILLS}")
+    close = market.columns["close"]
+    open_ = market.columns.get("open", close)
+    tradable = ~np.isnan(close)
+    positions = positions_from_signals(entries & tradable, exits & tradable)
+
+    prev_close = _shift(_ffill(close), 1, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        overnight = np.nan_to_num(open_ / prev_close - 1)
+        intraday = np.nan_to_num(close / open_ - 1)
+    held = _shift(positions, 1, False)
+    if fill == "close":
+        # Decided and filled at the close: held through the whole next bar
+        held_overnight = held
+        traded = positions != held
+        lag, fill_prices = 0, close
+    else:
+        # Decided at the close, filled at the next open
+        held_overnight = _shift(positions, 2, False)
+        traded = held != held_overnight
+        lag, fill_prices = 1, open_
+
+    returns = (1 + overnight * held_overnight) * (1 + intraday * held) - 1
+    returns = (1 + returns) * (1 - fee * traded) - 1
+
+    in_market = held | held_overnight
+    if weighting == "positions":
+        weights = np.maximum(in_market.sum(axis=1), 1)
+        exposure = (in_market.sum(axis=1) > 0).astype(np.float64)
+    elif weighting == "universe":
+        weights = np.full(len(close), max(close.shape[1], 1))
+        exposure = in_market.mean(axis=1) if close.shape[1] else np.zeros(len(close))
+    else:
+        raise ValueError("weighting must be 'positions' or 'universe'")
+    portfolio_returns = returns.sum(axis=1) / weights
+    equity = capital * np.cumprod(1 + portfolio_returns)
+
+    trades = _trades(positions, returns, fill_prices, lag, market.dates, market.symbols)
+    return BacktestResult(
+        market.dates,
+        market.symbols,
+        positions,
+        returns,
+        portfolio_returns,
+        equity,
+        exposure,
+        trades,
+        periods_per_year,
+    )
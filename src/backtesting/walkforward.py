@@ -0,0 +1,251 @@
+"""
+Walk-forward optimization: per rolling window, the strategy's parameters are
+chosen on the in-sample bars and evaluated on the following out-of-sample
+bars, and the out-of-sample returns of all windows are stitched into one
+curve.
+
+Indicators only look back, so each parameter set's computed columns and
+entry/exit matrices are built once over the whole history and every window
+backtests slices of them (starting flat). Pool tasks take a chunk of
+parameter sets and evaluate all windows for it on the shared-memory market
+(see sweep.py); the windows' choices are made once all chunks are in.
+"""
+
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, NamedTuple, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.backtesting.metrics import summary_metrics
+from src.backtesting.strategies import strategy_registry
+from src.backtesting.sweep import (
+    SWEEP_CHUNK_SIZE,
+    SWEEP_COLUMN_CACHE_ENTRIES,
+    SharedMarket,
+    SharedMarketSpec,
+    parameter_chunks,
+    parameter_grid,
+    worker_market,
+)
+from src.backtesting.vectorized import MarketData, run_backtest
+
+logger = logging.getLogger(__name__)
+
+# Default window lengths in bars (3 years in sample, 6 months out of sample)
+IN_SAMPLE_BARS = 756
+OUT_OF_SAMPLE_BARS = 126
+
+
+class Window(NamedTuple):
+    # Bar ranges: in sample [in_start, in_end), out of sample [in_end, out_end)
+    in_start: int
+    in_end: int
+    out_end: int
+
+
+def walk_forward_windows(
+    n_bars: int,
+    in_sample: int = IN_SAMPLE_BARS,
+    out_of_sample: int = OUT_OF_SAMPLE_BARS,
+    step: int = None,
+    anchored: bool = False,
+) -> List[Window]:
+    """
+    Windows advancing by step bars (default out_of_sample, so the out-of-sample
+    periods tile the history after the first in-sample period). Anchored
+    windows keep their in-sample start at the first bar.
+    """
+    step = step or out_of_sample
+    windows = []
+    in_end = in_sample
+    while in_end < n_bars:
+        windows.append(
+            Window(
+                0 if anchored else in_end - in_sample,
+                in_end,
+                min(in_end + out_of_sample, n_bars),
+            )
+        )
+        in_end += step
+    return windows
+
+
+def _market_slice(market: MarketData, start: int, end: int) -> MarketData:
+    return MarketData(
+        market.dates[start:end],
+        market.symbols,
+        {name: matrix[start:end] for name, matrix in market.columns.items()},
+    )
+
+
+def run_walk_forward_chunk(
+    spec: SharedMarketSpec,
+    strategy_name: str,
+    param_sets: List[Dict],
+    windows: List[Window],
+    objective: str,
+    backtest_kwargs: Dict,
+    cache_entries: int = SWEEP_COLUMN_CACHE_ENTRIES,
+) -> List[Dict]:
+    """
+    Process-pool task: for each parameter set, its in-sample objective in every
+    window and its out-of-sample portfolio returns, exposure and trade returns.
+    """
+    market, cache = worker_market(spec, cache_entries)
+    strategy_class = strategy_registry[strategy_name]
+    rows = []
+    for params in param_sets:
+        entries, exits = strategy_class(**params).signals(market, cache)
+        for i, (in_start, in_end, out_end) in enumerate(windows):
+            in_sample = run_backtest(
+                _market_slice(market, in_start, in_end),
+                entries[in_start:in_end],
+                exits[in_start:in_end],
+                **backtest_kwargs,
+            )
+            out_of_sample = run_backtest(
+                _market_slice(market, in_end, out_end),
+                entries[in_end:out_end],
+                exits[in_end:out_end],
+                **backtest_kwargs,
+            )
+            rows.append(
+                {
+                    "params": params,
+                    "window": i,
+                    "objective": in_sample.summary()[objective],
+                    "returns": out_of_sample.portfolio_returns,
+                    "exposure": out_of_sample.exposure,
+                    "trade_returns": out_of_sample.trades["return"].to_numpy(),
+                }
+            )
+    return rows
+
+
+class WalkForwardResult(NamedTuple):
+    windows: pd.DataFrame  # per window: dates, chosen parameters, metrics
+    dates: np.ndarray  # stitched out-of-sample bars
+    returns: np.ndarray  # stitched out-of-sample portfolio returns
+    exposure: np.ndarray
+    trade_returns: np.ndarray  # out-of-sample trades of the chosen parameters
+    periods_per_year: int
+
+    @property
+    def equity(self) -> np.ndarray:
+        return np.cumprod(1 + self.returns)
+
+    def equity_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {"equity": self.equity, "returns": self.returns},
+            index=pd.DatetimeIndex(self.dates, name="date"),
+        )
+
+    def summary(self) -> Dict[str, float]:
+        return summary_metrics(
+            self.returns, self.trade_returns, self.exposure, self.periods_per_year
+        )
+
+
+def run_walk_forward(
+    market: MarketData,
+    strategy_name: str,
+    grid: Dict[str, Sequence] = None,
+    in_sample: int = IN_SAMPLE_BARS,
+    out_of_sample: int = OUT_OF_SAMPLE_BARS,
+    step: int = None,
+    anchored: bool = False,
+    objective: str = "sharpe",
+    workers: int = None,
+    chunk_size: int = SWEEP_CHUNK_SIZE,
+    cache_entries: int = SWEEP_COLUMN_CACHE_ENTRIES,
+    **backtest_kwargs,
+) -> WalkForwardResult:
+    """
+    Walk-forward analysis of a strategy over grid (default: the strategy's
+    grid): each window keeps the parameter set with the highest in-sample
+    objective (a summary metric, NaN counting as worst), and is backtested out
+    of sample up to the next window's start; those returns are stitched
+    together.
+
+    :param backtest_kwargs: Passed to run_backtest (fill, fee, ...).
+    """
+    strategy_name = strategy_name.lower()
+    grid = grid or strategy_registry[strategy_name].grid
+    param_sets = parameter_grid(grid)
+    windows = walk_forward_windows(
+        len(market.dates), in_sample, out_of_sample, step, anchored
+    )
+    if not windows:
+        raise ValueError(
+            f"{len(market.dates)} bars leave no out-of-sample period after "
+            f"{in_sample} in-sample bars"
+        )
+    # Out of sample until the next window takes over (step < out_of_sample),
+    # so the stitched curve, its trades and the window's metrics cover the
+    # same bars
+    windows = [
+        window._replace(out_end=min(window.out_end, next_window.in_end))
+        for window, next_window in zip(windows[:-1], windows[1:])
+    ] + windows[-1:]
+
+    # Best (objective, row) per window
+    best = [(-np.inf, None)] * len(windows)
+    started = time.perf_counter()
+    with SharedMarket(market) as shared, ProcessPoolExecutor(workers) as executor:
+        futures = [
+            executor.submit(
+                run_walk_forward_chunk,
+                shared.spec,
+                strategy_name,
+                chunk,
+                windows,
+                objective,
+                backtest_kwargs,
+                cache_entries,
+            )
+            for chunk in parameter_chunks(strategy_name, param_sets, chunk_size)
+        ]
+        for future in as_completed(futures):
+            for row in future.result():
+                value = row["objective"]
+                value = -np.inf if np.isnan(value) else value
+                if best[row["window"]][1] is None or value > best[row["window"]][0]:
+                    best[row["window"]] = (value, row)
+    logger.info(
+        f"Walk-forward of {strategy_name}: {len(param_sets)} parameter sets × "
+        f"{len(windows)} windows in {time.perf_counter() - started:.2f}s."
+    )
+
+    summaries, returns, exposure, trade_returns, dates = [], [], [], [], []
+    for window, (_, row) in zip(windows, best):
+        returns.append(row["returns"])
+        exposure.append(row["exposure"])
+        trade_returns.append(row["trade_returns"])
+        dates.append(market.dates[window.in_end : window.out_end])
+        out_of_sample = summary_metrics(
+            row["returns"],
+            row["trade_returns"],
+            row["exposure"],
+            backtest_kwargs.get("periods_per_year", 252),
+        )
+        summaries.append(
+            {
+                "in_sample_start": market.dates[window.in_start],
+                "out_of_sample_start": market.dates[window.in_end],
+                "out_of_sample_end": market.dates[window.out_end - 1],
+                **row["params"],
+                f"in_sample_{objective}": row["objective"],
+                **{f"out_of_sample_{k}": v for k, v in out_of_sample.items()},
+            }
+        )
+    return WalkForwardResult(
+        pd.DataFrame(summaries),
+        np.concatenate(dates),
+        np.concatenate(returns),
+        np.concatenate(exposure),
+        np.concatenate(trade_returns),
+        backtest_kwargs.get("periods_per_year", 252),
+    )
@@ -1,37 +1,206 @@
 import logging
+import os
+import time
 import traceback
+from collections import defaultdict
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 from contextlib import contextmanager
-from datetime import datetime, timedelta
-from typing import List, Dict, Union
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterator, List, Dict, Tuple, Union
 
+import numpy as np
 import pandas as pd
 import yfinance as yf
-from sqlalchemy import create_engine, select, text
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import (
+    Date,
+    and_,
+    bindparam,
+    create_engine,
+    func,
+    insert,
+    literal,
+    select,
+    text,
+)
 from sqlalchemy.orm import sessionmaker, Session
 
-from src.analysis.indicators import (
-    sma,
-    ema,
-    rsi,
-    macd,
-    bollinger_bands,
+from src.analysis.batch import (
+    PriceMatrix,
+    build_price_matrix,
+    to_wide_frame,
 )
+from src.analysis.cache import IndicatorCache, cached_indicator_matrix
+from src.analysis.indicators import IncrementalIndicators
+from src.data.sources import MarketDataSource
+from src.database.upsert import bulk_upsert, configure_sqlite, dialect_insert
 from src.database.init_db import (
     Stock,
     DailyData,
     WeeklyData,
-    TechnicalIndicator,
-    WeeklyTechnicalIndicator,
+    IndicatorValues,
+    IndicatorState,
+    ScreeningBar,
+    INDICATOR_COLUMNS,
 )
 
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
+# Days re-fetched before a symbol's latest stored bar in incremental mode, so
+# that late revisions from the data provider overwrite the stored values.
+DEFAULT_OVERLAP_DAYS = 5
+
+# Closes saved with an indicator state (its last bars) and compared with the
+# stored bars before the state is reused; covers the bars the overlap window can
+# revise
+STATE_CHECK_BARS = DEFAULT_OVERLAP_DAYS + 1
+
+DAILY_COLUMNS = ["stock_id", "date", "open", "high", "low", "close", "volume"]
+
+# Relative difference up to which a recomputed indicator value counts as
+# unchanged, so rounding differences between the indicator engines do not
+# rewrite rows
+INDICATOR_RTOL = 1e-9
+
+# Symbols per indicator batch: one close query, matrix and upsert per batch
+INDICATOR_BATCH_SIZE = 200
+
+# Rows per chunk fetched from the server-side cursor of the indicator read path
+READ_CHUNK_ROWS = 50_000
+
+# Latest bars per stock and time frame kept in the screening_bars table
+SCREENING_BARS = 5
+
+# Expression for the Monday starting the week of daily_data.date, per dialect
+WEEK_START_SQL = {
+    "postgresql": "CAST(date_trunc('week', date) AS DATE)",
+    "sqlite": "date(date, '-' || ((CAST(strftime('%w', date) AS INTEGER) + 6) % 7) || ' days')",
+}
+
+# Rebuilds weekly bars from the stored daily bars of the given stocks, for every week
+# from :from_date on. Window functions pick the first open and last close per week;
+# the outer WHERE true keeps SQLite's INSERT ... SELECT ... ON CONFLICT unambiguous.
+WEEKLY_REFRESH_SQL = """
+INSERT INTO weekly_data (stock_id, week_start_date, open, high, low, close, volume)
+SELECT * FROM (
+    SELECT DISTINCT
+        stock_id,
+        week_start_date,
+        FIRST_VALUE(open) OVER w,
+        MAX(high) OVER w,
+        MIN(low) OVER w,
+        LAST_VALUE(close) OVER w,
+        SUM(volume) OVER w
+    FROM (
+        SELECT stock_id, date, open, high, low, close, volume,
+               {week_start} AS week_start_date
+        FROM daily_data
+        WHERE stock_id IN :stock_ids AND date >= :from_date
+    ) AS daily
+    WINDOW w AS (
+        PARTITION BY stock_id, week_start_date ORDER BY date
+        ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+    )
+) AS weekly
+WHERE true
+ON CONFLICT (stock_id, week_start_date) DO UPDATE SET
+    open = excluded.open,
+    high = excluded.high,
+    low = excluded.low,
+    close = excluded.close,
+    volume = excluded.volume
+"""
+
+# Process-level symbol -> stock id cache, one map per database URL. Stock ids never
+# change once assigned, so lookups only hit the database for unseen symbols.
+_stock_id_cache: Dict[str, Dict[str, int]] = {}
+
+
+# Engines and indicator caches of worker processes, one per URL/directory
+_worker_engines = {}
+_worker_caches = {}
+
+
+def load_close_matrix(
+    connection, stock_ids: List[int], start_date, end_date, time_frame: str = "daily"
+) -> Union[PriceMatrix, None]:
+    """
+    Reads the closes of the given stocks in [start_date, end_date] into a
+    PriceMatrix (weekly bars by week_start_date). None if there are none.
+    """
+    if time_frame == "weekly":
+        price_model = WeeklyData
+        date_column = WeeklyData.week_start_date
+    else:
+        price_model = DailyData
+        date_column = DailyData.date
+    closes_query = select(
+        price_model.stock_id, date_column.label("date"), price_model.close
+    ).where(
+        price_model.stock_id.in_(stock_ids),
+        date_column >= start_date,
+        date_column <= end_date,
+    )
+    closes_df = pd.read_sql(closes_query, connection)
+    if closes_df.empty:
+        return None
+    return build_price_matrix(closes_df)
+
+
+def compute_indicator_shard(
+    db_url: str,
+    stock_ids: List[int],
+    start_date,
+    end_date,
+    time_frame: str,
+    outputs: List[str] = None,
+    cache_dir: str = None,
+    cache_entries: int = 0,
+) -> Tuple[str, Union[PriceMatrix, None], Dict[str, np.ndarray], Dict[str, int]]:
+    """
+    Process-pool task: loads one shard's closes over the worker's own engine and
+    computes its indicator matrices, through the worker's IndicatorCache if
+    cache_dir is given. Returns plain arrays, no ORM objects, and the cache
+    counters of this task.
+    """
+    engine = _worker_engines.get(db_url)
+    if engine is None:
+        engine = _worker_engines[db_url] = create_engine(db_url)
+        configure_sqlite(engine)
+    cache = None
+    if cache_dir:
+        cache = _worker_caches.get(cache_dir)
+        if cache is None:
+            cache = _worker_caches[cache_dir] = IndicatorCache(cache_entries, cache_dir)
+    before = cache.stats() if cache else {}
+
+    with engine.connect() as connection:
+        matrix = load_close_matrix(
+            connection, stock_ids, start_date, end_date, time_frame
+        )
+    if matrix is None:
+        return time_frame, None, {}, {}
+    results = cached_indicator_matrix(
+        matrix.values, time_frame, outputs, cache, keys=matrix.keys
+    )
+    cache_counts = {
+        key: count - before[key]
+        for key, count in (cache.stats() if cache else {}).items()
+        if key != "entries"
+    }
+    return time_frame, matrix, results, cache_counts
+
 
 class DatabaseManager:
     def __init__(self, db_path: str):
         self.engine = create_engine(db_path)
+        configure_sqlite(self.engine)
         self.Session = sessionmaker(bind=self.engine)
 
     @contextmanager
@@ -42,6 +211,8 @@ class DatabaseManager:
             session.commit()
         except Exception as e:
             session.rollback()
+            # Ids handed out inside the rolled back transaction no longer exist
+            StockRepository.clear_stock_id_cache(self.engine.url)
             logger.error(f"Session rollback because of exception: {str(e)}")
             logger.error(traceback.format_exc())
             raise
@@ -49,6 +220,64 @@ class DatabaseManager:
             session.close()
 
 
+def bars_with_indicators_query(time_frame: str, indicators: List[str]):
+    """
+    SELECT of the time frame's bars LEFT JOINed with their row of the indicators
+    table: stock_id, date (week_start_date for weekly bars), OHLCV and the given
+    indicator columns labelled by indicator name. Returns (query, price model,
+    date column) so callers can add their filters and ordering.
+    """
+    if time_frame == "weekly":
+        price_model, date_column = WeeklyData, WeeklyData.week_start_date
+    else:
+        price_model, date_column = DailyData, DailyData.date
+
+    query = select(
+        price_model.stock_id,
+        date_column,
+        price_model.open,
+        price_model.high,
+        price_model.low,
+        price_model.close,
+        price_model.volume,
+        *[
+            getattr(IndicatorValues, INDICATOR_COLUMNS[name]).label(name)
+            for name in indicators
+        ],
+    ).outerjoin(
+        IndicatorValues,
+        and_(
+            IndicatorValues.stock_id == price_model.stock_id,
+            IndicatorValues.time_frame == time_frame,
+            IndicatorValues.date == date_column,
+        ),
+    )
+    return query, price_model, date_column
+
+
+def bars_frame(
+    df: pd.DataFrame,
+    stock_id_to_symbol: Dict[int, str],
+    symbol_dtype: pd.CategoricalDtype,
+    indicators: List[str],
+    float_dtype=np.float32,
+) -> pd.DataFrame:
+    """
+    Turns fetched (stock_id, date, OHLCV, <indicator>...) rows into the frame
+    shape of the read path: categorical symbol first, datetime date,
+    float_dtype prices/indicators and int64 volume.
+    """
+    float_columns = ["open", "high", "low", "close"] + indicators
+    df.insert(
+        0, "symbol", df.pop("stock_id").map(stock_id_to_symbol).astype(symbol_dtype)
+    )
+    date_field = df.columns[1]
+    df[date_field] = pd.to_datetime(df[date_field])
+    df[float_columns] = df[float_columns].astype(float_dtype)
+    df["volume"] = df["volume"].astype(np.int64)
+    return df
+
+
 class StockRepository:
     def __init__(self, session: Session):
         self.session = session
@@ -60,9 +289,58 @@ class StockRepository:
         self.session.add(stock)
         self.session.flush()
 
+    @staticmethod
+    def clear_stock_id_cache(url=None):
+        if url is None:
+            _stock_id_cache.clear()
+        else:
+            _stock_id_cache.pop(str(url), None)
+
+    def resolve_stock_ids(
+        self, symbols: List[str], create_missing: bool = False
+    ) -> Dict[str, int]:
+        """
+        Maps symbols to stock ids with one IN query for the symbols not already in
+        the process-level cache. With create_missing=True, unknown symbols are
+        inserted with a single multi-row INSERT ... RETURNING.
+        Symbols that don't exist (and weren't created) are left out of the result.
+        """
+        cache = _stock_id_cache.setdefault(str(self.session.get_bind().url), {})
+        unknown = [symbol for symbol in dict.fromkeys(symbols) if symbol not in cache]
+
+        if unknown:
+            rows = (
+                self.session.query(Stock.symbol, Stock.id)
+                .filter(Stock.symbol.in_(unknown))
+                .all()
+            )
+            cache.update(rows)
+            missing = [symbol for symbol in unknown if symbol not in cache]
+
+            if missing and create_missing:
+                stmt = (
+                    dialect_insert(self.session, Stock.__table__)
+                    .values([{"symbol": symbol, "name": symbol} for symbol in missing])
+                    .on_conflict_do_nothing(index_elements=["symbol"])
+                    .returning(Stock.__table__.c.symbol, Stock.__table__.c.id)
+                )
+                cache.update(self.session.execute(stmt).all())
+
+                # Rows inserted concurrently by another process aren't returned
+                raced = [symbol for symbol in missing if symbol not in cache]
+                if raced:
+                    cache.update(
+                        self.session.query(Stock.symbol, Stock.id)
+                        .filter(Stock.symbol.in_(raced))
+                        .all()
+                    )
+                logger.info(f"Created {len(missing)} new stock record(s).")
+
+        return {symbol: cache[symbol] for symbol in symbols if symbol in cache}
+
     #
-    # 1) Updated daily data upsert: chunked approach using PostgreSQL's
-    #    ON CONFLICT DO UPDATE. Make sure you have a unique constraint on (stock_id, date).
+    # 1) Updated daily data upsert: chunked approach using ON CONFLICT DO UPDATE.
+    #    Make sure you have a unique constraint on (stock_id, date).
     #
     def bulk_upsert_daily_data(
         self, daily_data_records: List[Dict], batch_size: int = 500
@@ -73,7 +351,7 @@ class StockRepository:
             daily_data_table = DailyData.__table__
             for i in range(0, len(daily_data_records), batch_size):
                 batch = daily_data_records[i : i + batch_size]
-                stmt = insert(daily_data_table).values(batch)
+                stmt = dialect_insert(self.session, daily_data_table).values(batch)
                 # Exclude ID from the update dict
                 update_dict = {c.name: c for c in stmt.excluded if c.name not in ["id"]}
                 upsert_stmt = stmt.on_conflict_do_update(
@@ -107,7 +385,7 @@ class StockRepository:
             weekly_data_table = WeeklyData.__table__
             for i in range(0, len(weekly_data_records), batch_size):
                 batch = weekly_data_records[i : i + batch_size]
-                stmt = insert(weekly_data_table).values(batch)
+                stmt = dialect_insert(self.session, weekly_data_table).values(batch)
                 update_dict = {c.name: c for c in stmt.excluded if c.name not in ["id"]}
                 upsert_stmt = stmt.on_conflict_do_update(
                     index_elements=["stock_id", "week_start_date"], set_=update_dict
@@ -124,78 +402,466 @@ class StockRepository:
             logger.error(traceback.format_exc())
             raise
 
+    #
+    # 3) Columnar DataFrame upserts using the best strategy for the dialect:
+    #    COPY + merge or multi-row VALUES on PostgreSQL, executemany on SQLite
+    #    (see src/database/upsert.py).
+    #
+    def upsert_daily_data(self, daily_df: pd.DataFrame) -> int:
+        return bulk_upsert(
+            self.session, DailyData.__table__, daily_df, ["stock_id", "date"]
+        )
+
+    def upsert_weekly_data(self, weekly_df: pd.DataFrame) -> int:
+        return bulk_upsert(
+            self.session,
+            WeeklyData.__table__,
+            weekly_df,
+            ["stock_id", "week_start_date"],
+        )
+
+    def upsert_indicators(self, indicator_df: pd.DataFrame) -> int:
+        """
+        Upserts a (stock_id, date, time_frame, <indicator>...) frame, with
+        indicator names as columns, into the wide indicators table.
+        """
+        return bulk_upsert(
+            self.session,
+            IndicatorValues.__table__,
+            indicator_df.rename(columns=INDICATOR_COLUMNS),
+            ["stock_id", "time_frame", "date"],
+        )
+
+    def sync_indicators(
+        self, indicator_df: pd.DataFrame, time_frame: str, start_date, end_date
+    ) -> Dict[str, int]:
+        """
+        Makes the stored indicator rows of indicator_df's stocks in [start_date,
+        end_date] equal to indicator_df: upserts only rows that are new or whose
+        values changed by more than INDICATOR_RTOL, and deletes stored rows
+        indicator_df no longer has. If indicator_df holds only some indicators,
+        such rows get NULLs in those columns instead. Returns
+        {"written": n, "skipped": n, "deleted": n}.
+        """
+        keys = ["stock_id", "date"]
+        names = [name for name in INDICATOR_COLUMNS if name in indicator_df.columns]
+        stock_ids = [int(stock_id) for stock_id in indicator_df["stock_id"].unique()]
+        stored_query = select(
+            IndicatorValues.stock_id,
+            IndicatorValues.date,
+            *[
+                getattr(IndicatorValues, INDICATOR_COLUMNS[name]).label(name)
+                for name in names
+            ],
+        ).where(
+            IndicatorValues.stock_id.in_(stock_ids),
+            IndicatorValues.time_frame == time_frame,
+            IndicatorValues.date >= start_date,
+            IndicatorValues.date <= end_date,
+        )
+        stored = pd.read_sql(stored_query, self.session.connection())
+
+        new = indicator_df.assign(date=pd.to_datetime(indicator_df["date"]))
+        new = new.set_index(keys)[names]
+        stored["date"] = pd.to_datetime(stored["date"])
+        stored = stored.set_index(keys)[names].astype(np.float64)
+
+        new_values = new.to_numpy(dtype=np.float64)
+        old_values = stored.reindex(new.index).to_numpy()
+        same = np.isclose(
+            new_values, old_values, rtol=INDICATOR_RTOL, atol=0, equal_nan=True
+        )
+        changed = ~same.all(axis=1)
+
+        rows = indicator_df[changed]
+        stale = stored.index.difference(new.index).to_frame(index=False)
+        partial = len(names) < len(INDICATOR_COLUMNS)
+        if partial:
+            # Other indicators may still have values on these rows
+            stale = stale[
+                stored.loc[stale.set_index(keys).index].notna().any(axis=1).values
+            ]
+            nulls = stale.assign(
+                date=stale["date"].dt.date, **{name: np.nan for name in names}
+            )
+            rows = pd.concat([rows, nulls], ignore_index=True)
+
+        written = self.upsert_indicators(rows.assign(time_frame=time_frame))
+        if not partial:
+            for stock_id, dates in stale.groupby("stock_id")["date"]:
+                self.session.query(IndicatorValues).filter(
+                    IndicatorValues.stock_id == int(stock_id),
+                    IndicatorValues.time_frame == time_frame,
+                    IndicatorValues.date.in_(list(dates.dt.date)),
+                ).delete(synchronize_session=False)
+        return {
+            "written": written,
+            "skipped": int(len(changed) - changed.sum()),
+            "deleted": 0 if partial else len(stale),
+        }
+
+    #
+    # 4) Weekly bars are maintained server-side from the stored daily bars, so a
+    #    week is always aggregated from all of its days, not just the fetched ones.
+    #
+    def refresh_weekly_data(self, first_touched: Dict[int, date]) -> int:
+        """
+        Recomputes the weekly bars of each stock from the week containing
+        first_touched[stock_id] onward. Stocks sharing that week are refreshed
+        with one INSERT ... SELECT ... GROUP-BY-week statement.
+        Returns the number of weekly rows written.
+        """
+        dialect = self.session.get_bind().dialect.name
+        stmt = text(WEEKLY_REFRESH_SQL.format(week_start=WEEK_START_SQL[dialect]))
+        stmt = stmt.bindparams(
+            bindparam("stock_ids", expanding=True),
+            bindparam("from_date", type_=Date),
+        )
+
+        by_week = defaultdict(list)
+        for stock_id, first_date in first_touched.items():
+            week_start = first_date - timedelta(days=first_date.weekday())
+            by_week[week_start].append(int(stock_id))
+
+        written = 0
+        for week_start, stock_ids in by_week.items():
+            result = self.session.execute(
+                stmt, {"stock_ids": stock_ids, "from_date": week_start}
+            )
+            written += result.rowcount
+        logger.info(f"Refreshed {written} weekly bars for {len(first_touched)} stocks.")
+        return written
+
+    def rebuild_weekly_data(self, stock_ids: List[int]) -> int:
+        """
+        Drops and recomputes all weekly bars of the given stocks.
+        """
+        first_dates = dict(
+            self.session.query(DailyData.stock_id, func.min(DailyData.date))
+            .filter(DailyData.stock_id.in_(stock_ids))
+            .group_by(DailyData.stock_id)
+            .all()
+        )
+        self.session.query(WeeklyData).filter(
+            WeeklyData.stock_id.in_(stock_ids)
+        ).delete(synchronize_session=False)
+        return self.refresh_weekly_data(first_dates)
+
+    #
+    # 5) Persisted incremental indicator state
+    #
+    def get_indicator_states(
+        self, stock_ids: List[int], time_frame: str
+    ) -> Dict[int, IndicatorState]:
+        states = (
+            self.session.query(IndicatorState)
+            .filter(
+                IndicatorState.stock_id.in_(stock_ids),
+                IndicatorState.time_frame == time_frame,
+            )
+            .all()
+        )
+        return {state.stock_id: state for state in states}
+
+    def save_indicator_states(self, state_records: List[Dict]):
+        if not state_records:
+            return
+        stmt = dialect_insert(self.session, IndicatorState.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["stock_id", "time_frame"],
+            set_={
+                "last_date": stmt.excluded.last_date,
+                "last_close": stmt.excluded.last_close,
+                "recent_closes": stmt.excluded.recent_closes,
+                "state": stmt.excluded.state,
+            },
+        )
+        self.session.execute(stmt, state_records)
+
+    #
+    # 6) Screening bars: the latest n_bars bars (with indicators) per stock and
+    #    time frame, copied server-side with one ROW_NUMBER() window query.
+    #
+    def refresh_screening_bars(
+        self, stock_ids: List[int], time_frame: str, n_bars: int
+    ) -> int:
+        """
+        Replaces the screening_bars rows of the given stocks and time frame with
+        their latest n_bars stored bars. Returns the number of rows written.
+        """
+        names = list(INDICATOR_COLUMNS)
+        bars_query, price_model, date_column = bars_with_indicators_query(
+            time_frame, names
+        )
+        ranked = (
+            bars_query.add_columns(
+                func.row_number()
+                .over(partition_by=price_model.stock_id, order_by=date_column.desc())
+                .label("bar_rank")
+            )
+            .where(price_model.stock_id.in_(stock_ids))
+            .subquery()
+        )
+        latest = select(
+            ranked.c.stock_id,
+            literal(time_frame),
+            ranked.c[date_column.key],
+            ranked.c.open,
+            ranked.c.high,
+            ranked.c.low,
+            ranked.c.close,
+            ranked.c.volume,
+            *[ranked.c[name] for name in names],
+        ).where(ranked.c.bar_rank <= n_bars)
+
+        self.session.query(ScreeningBar).filter(
+            ScreeningBar.stock_id.in_(stock_ids),
+            ScreeningBar.time_frame == time_frame,
+        ).delete(synchronize_session=False)
+        result = self.session.execute(
+            insert(ScreeningBar).from_select(
+                ["stock_id", "time_frame", "date", *DAILY_COLUMNS[2:]]
+                + [INDICATOR_COLUMNS[name] for name in names],
+                latest,
+            )
+        )
+        return result.rowcount
+
     def get_all_symbols(self) -> List[str]:
         return [stock.symbol for stock in self.session.query(Stock.symbol).all()]
 
+    def get_latest_daily_dates(self, symbols: List[str]) -> Dict[str, date]:
+        """
+        Returns {symbol: latest stored DailyData.date} for every symbol that has
+        at least one daily bar, using a single grouped query.
+        """
+        rows = (
+            self.session.query(Stock.symbol, func.max(DailyData.date))
+            .join(DailyData, DailyData.stock_id == Stock.id)
+            .filter(Stock.symbol.in_(symbols))
+            .group_by(Stock.symbol)
+            .all()
+        )
+        return {symbol: latest for symbol, latest in rows}
+
+
+def yfinance_transport(
+    symbols: List[str], start_date: str, end_date: str
+) -> pd.DataFrame:
+    """
+    Default ChunkedDownloader transport: one yfinance request for a chunk of symbols,
+    grouped by ticker. Threading is left to the downloader's own worker pool.
+    """
+    return yf.download(
+        symbols,
+        start=start_date,
+        end=end_date,
+        group_by="ticker",
+        threads=False,
+        progress=False,
+    )
+
+
+class ChunkedDownloader(MarketDataSource):
+    """
+    Downloads a symbol universe in fixed-size chunks on a bounded worker pool.
+
+    Failed chunks are retried with exponential backoff, and symbols that still come
+    back without data are recorded in `failures` instead of aborting the run. Chunks
+    are yielded as {symbol: DataFrame} as soon as they complete, and no more than
+    `max_workers` chunks are in flight, so peak memory stays around one chunk per
+    worker rather than the whole universe.
+
+    `transport(symbols, start_date, end_date)` must return a ticker-grouped
+    DataFrame like yf.download(group_by="ticker"); swap it out to run offline.
+    """
+
+    def __init__(
+        self,
+        transport: Callable[[List[str], str, str], pd.DataFrame] = None,
+        chunk_size: int = 100,
+        max_workers: int = 4,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.transport = transport or yfinance_transport
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+        self.failures: Dict[str, str] = {}
 
-class StockDataFetcher:
     @staticmethod
-    def fetch_stock_data(
-        symbols: Union[str, List[str]], start_date: str, end_date: str
-    ) -> pd.DataFrame:
-        try:
-            data = yf.download(
-                symbols,
-                start=start_date,
-                end=end_date,
-                group_by="ticker" if isinstance(symbols, list) else None,
-                threads=True,
-            )
-            return data
-        except Exception as e:
-            logger.error(f"Error fetching stock data: {str(e)}")
-            logger.error(traceback.format_exc())
-            return pd.DataFrame()
+    def split_symbol_frames(
+        data: pd.DataFrame, symbols: List[str]
+    ) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+        """
+        Splits a ticker-grouped download into per-symbol frames.
+        Returns (frames, symbols_without_data).
+        """
+        frames = {}
+        missing = []
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    missing.append(symbol)
+                    continue
+                symbol_data = data[symbol]
+            elif len(symbols) == 1:
+                symbol_data = data
+            else:
+                missing.append(symbol)
+                continue
+
+            symbol_data = symbol_data.dropna(how="all")
+            if symbol_data.empty:
+                missing.append(symbol)
+                continue
+            frames[symbol] = symbol_data
+        return frames, missing
+
+    def _download_chunk(
+        self, chunk: List[str], start_date: str, end_date: str
+    ) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+        attempt = 0
+        while True:
+            try:
+                data = self.transport(chunk, start_date, end_date)
+                if data is None or data.empty:
+                    raise ValueError("transport returned no data")
+                return self.split_symbol_frames(data, chunk)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * (2**attempt))
+                logger.warning(
+                    f"Chunk starting {chunk[0]} failed ({str(e)}), "
+                    f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s."
+                )
+                self.sleep(delay)
+                attempt += 1
+
+    def iter_chunks(
+        self, symbols: List[str], start_date: str, end_date: str
+    ) -> Iterator[Dict[str, pd.DataFrame]]:
+        """
+        Yields {symbol: DataFrame} per completed chunk, in completion order.
+        Per-symbol failures for the run are collected in self.failures.
+        """
+        self.failures = {}
+        chunks = iter(
+            [
+                symbols[i : i + self.chunk_size]
+                for i in range(0, len(symbols), self.chunk_size)
+            ]
+        )
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = {}
+
+            def submit_next():
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    future = pool.submit(
+                        self._download_chunk, chunk, start_date, end_date
+                    )
+                    pending[future] = chunk
+
+            for _ in range(self.max_workers):
+                submit_next()
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = pending.pop(future)
+                    submit_next()
+                    try:
+                        frames, missing = future.result()
+                    except Exception as e:
+                        logger.error(
+                            f"Giving up on chunk of {len(chunk)} symbol(s) "
+                            f"starting {chunk[0]}: {str(e)}"
+                        )
+                        for symbol in chunk:
+                            self.failures[symbol] = str(e)
+                        continue
+
+                    for symbol in missing:
+                        self.failures[symbol] = "no data returned"
+                    if frames:
+                        yield frames
 
 
 class IndicatorCalculator:
+    def __init__(self, cache: IndicatorCache = None):
+        self.cache = cache
+
     @staticmethod
     def calculate_indicators(
-        close_prices: pd.Series, time_frame="daily"
+        close_prices: pd.Series,
+        time_frame="daily",
+        outputs: List[str] = None,
+        cache: IndicatorCache = None,
     ) -> pd.DataFrame:
+        """
+        The requested indicators (all registered ones by default) for one
+        symbol's closes, evaluated on the indicator graph in src/analysis/batch.py.
+        Repeat calls on the same closes are served from cache, if given.
+        """
         try:
-            indicators = pd.DataFrame(index=close_prices.index)
-            indicators["SMA12"] = sma(close_prices, 12, time_frame=time_frame)
-            indicators["SMA26"] = sma(close_prices, 26, time_frame=time_frame)
-            indicators["SMA50"] = sma(close_prices, 50, time_frame=time_frame)
-            indicators["SMA200"] = sma(close_prices, 200, time_frame=time_frame)
-
-            indicators["EMA12"] = ema(close_prices, 12, time_frame=time_frame)
-            indicators["EMA26"] = ema(close_prices, 26, time_frame=time_frame)
-            indicators["EMA50"] = ema(close_prices, 50, time_frame=time_frame)
-            indicators["EMA200"] = ema(close_prices, 200, time_frame=time_frame)
-
-            indicators["RSI"] = rsi(close_prices, 14, time_frame=time_frame)
-
-            macd_data = macd(close_prices, time_frame=time_frame)
-            indicators["MACD"] = macd_data["MACD"]
-            indicators["MACD_Signal"] = macd_data["Signal"]
-            indicators["MACD_Histogram"] = macd_data["Histogram"]
-
-            bollinger_data = bollinger_bands(close_prices, time_frame=time_frame)
-            indicators["BB_Middle"] = bollinger_data["SMA"]
-            indicators["BB_Upper"] = bollinger_data["Upper"]
-            indicators["BB_Lower"] = bollinger_data["Lower"]
-
-            return indicators
+            results = cached_indicator_matrix(
+                close_prices.to_numpy(dtype=np.float64)[:, None],
+                time_frame,
+                outputs,
+                cache,
+            )
+            return pd.DataFrame(
+                {name: values[:, 0] for name, values in results.items()},
+                index=close_prices.index,
+            )
         except Exception as e:
             logger.error(f"Error calculating indicators: {str(e)}")
             logger.error(traceback.format_exc())
             raise
 
+    def calculate_indicators_cached(
+        self, close_prices: pd.Series, time_frame="daily", outputs: List[str] = None
+    ) -> pd.DataFrame:
+        """
+        calculate_indicators through this calculator's cache.
+        """
+        return self.calculate_indicators(close_prices, time_frame, outputs, self.cache)
+
 
 class DataService:
-    def __init__(self, db_path: str):
+    def __init__(
+        self,
+        db_path: str,
+        source: MarketDataSource = None,
+        indicator_cache: IndicatorCache = None,
+    ):
         self.db_manager = DatabaseManager(db_path)
-        self.indicator_calc = IndicatorCalculator()
+        # Optional cache of indicator results, keyed by the closes they came from
+        self.indicator_cache = indicator_cache
+        self.indicator_calc = IndicatorCalculator(indicator_cache)
+        # Bars come from yfinance unless another source (e.g. a ReplaySource) is given
+        self.source = source or ChunkedDownloader()
 
     #
-    # Helper: Convert the downloaded raw DataFrame into a list-of-dicts
-    # for daily data, with columns we care about.
+    # Helper: Convert the downloaded raw DataFrame into daily_data rows
+    # (a DataFrame with exactly the table's columns).
     #
     def _process_symbol_data(
         self, symbol: str, data: pd.DataFrame, stock_id: int
-    ) -> List[Dict]:
+    ) -> pd.DataFrame:
         try:
             daily_data = data.reset_index()
             daily_data["stock_id"] = stock_id
@@ -216,147 +882,151 @@ class DataService:
             daily_data = daily_data.dropna()
 
             daily_data["date"] = pd.to_datetime(daily_data["date"]).dt.date
+            daily_data["volume"] = daily_data["volume"].astype("int64")
 
-            return daily_data.to_dict("records")
+            return daily_data[DAILY_COLUMNS]
         except Exception as e:
             logger.error(f"Error processing data for {symbol}: {str(e)}")
             logger.error(traceback.format_exc())
             raise
 
     #
-    # B) A single in-memory aggregator that handles ALL symbols together.
-    # We'll skip the old loop-based aggregator (see the "deprecated" method below).
+    # Helper: Work out which date window each symbol still needs. Symbols that
+    # share a fetch start date are grouped so they go out in one download.
     #
-    def _aggregate_weekly_data_in_memory(
-        self, all_daily_data: pd.DataFrame
-    ) -> pd.DataFrame:
-        try:
-            # all_daily_data is a DF containing columns:
-            #   [stock_id, date, open, high, low, close, volume, ...]
-            # We'll convert date to datetime index, groupby stock_id, resample weekly
-            df = all_daily_data.copy()
-            df["date"] = pd.to_datetime(df["date"])
-            df.set_index("date", inplace=True)
-
-            # Group by stock_id, then resample to weekly. "W-MON" means weekly on Monday.
-            weekly_df = (
-                df.groupby("stock_id")
-                .resample("W-MON")
-                .agg(
-                    {
-                        "open": "first",
-                        "high": "max",
-                        "low": "min",
-                        "close": "last",
-                        "volume": "sum",
-                    }
+    def _plan_incremental_fetch(
+        self,
+        symbols: List[str],
+        start_date: str,
+        end_date: str,
+        overlap_days: int = DEFAULT_OVERLAP_DAYS,
+    ) -> Dict[str, List[str]]:
+        with self.db_manager.session_scope() as session:
+            repository = StockRepository(session)
+            latest_dates = repository.get_latest_daily_dates(symbols)
+
+        requested_start = pd.to_datetime(start_date).date()
+        requested_end = pd.to_datetime(end_date).date()
+
+        fetch_plan = defaultdict(list)
+        for symbol in symbols:
+            latest = latest_dates.get(symbol)
+            if latest is None:
+                fetch_start = requested_start
+            else:
+                fetch_start = max(
+                    requested_start, latest - timedelta(days=overlap_days)
                 )
-                .dropna()
-            )
-            # This resample creates a MultiIndex: (stock_id, date)
-            weekly_df.reset_index(inplace=True)
-            weekly_df.rename(columns={"date": "week_start_date"}, inplace=True)
-            return weekly_df
-        except Exception as e:
-            logger.error(f"Error aggregating weekly data in memory: {str(e)}")
-            logger.error(traceback.format_exc())
-            raise
+            if fetch_start > requested_end:
+                continue
+            fetch_plan[fetch_start.strftime("%Y-%m-%d")].append(symbol)
+
+        logger.info(
+            f"Incremental fetch plan: {len(symbols)} symbols in "
+            f"{len(fetch_plan)} download group(s)."
+        )
+        return dict(fetch_plan)
 
     #
-    # MAIN ENTRY: Update daily data for all symbols, then do the weekly aggregator in memory.
+    # Helper: Upsert one downloaded chunk of {symbol: DataFrame}, then refresh the
+    # weekly bars of the weeks those daily rows touched. Each chunk commits on its own
+    # so a failure later in the run doesn't lose the chunks already stored.
     #
-    def update_all_stocks(
-        self, symbols: Union[str, List[str]], start_date: str, end_date: str
-    ):
-        if isinstance(symbols, str):
-            symbols = [symbols]
-
-        # 1) Fetch data from Yahoo for all symbols at once:
-        all_data = StockDataFetcher.fetch_stock_data(symbols, start_date, end_date)
-        if all_data.empty:
-            logger.warning("No data retrieved from yfinance.")
-            return
-
-        # 2) Upsert daily data in a single pass, then mark last_updated
+    def _store_chunk(self, frames: Dict[str, pd.DataFrame]):
         with self.db_manager.session_scope() as session:
             repository = StockRepository(session)
-            all_daily_records = []
-
-            for symbol in symbols:
-                # If multiple symbols, the downloaded DataFrame has a nested structure: data[symbol]
-                if len(symbols) > 1:
-                    symbol_data = all_data[symbol]
-                else:
-                    symbol_data = all_data
 
-                if symbol_data.empty:
-                    logger.warning(f"Empty data for {symbol}. Skipping.")
-                    continue
-
-                # Ensure we have a Stock record
-                stock = repository.get_stock_by_symbol(symbol)
-                if not stock:
-                    stock = Stock(symbol=symbol, name=symbol)
-                    repository.add_stock(stock)
+            # Ensure we have Stock records for the whole chunk
+            stock_ids = repository.resolve_stock_ids(list(frames), create_missing=True)
 
-                # Convert that DataFrame portion to a list of dicts for DB upsert
-                daily_data_records = self._process_symbol_data(
-                    symbol, symbol_data, stock.id
-                )
-                all_daily_records.extend(daily_data_records)
+            daily_parts = [
+                self._process_symbol_data(symbol, symbol_data, stock_ids[symbol])
+                for symbol, symbol_data in frames.items()
+            ]
+            daily_df = pd.concat(daily_parts, ignore_index=True)
+            if daily_df.empty:
+                logger.warning("No daily data in chunk, skipping upsert.")
+                return
 
             # Bulk upsert daily data
-            repository.bulk_upsert_daily_data(all_daily_records)
+            repository.upsert_daily_data(daily_df)
             # Mark last_updated on these stocks
-            updated_ids = {rec["stock_id"] for rec in all_daily_records}
+            updated_ids = [int(i) for i in daily_df["stock_id"].unique()]
             session.query(Stock).filter(Stock.id.in_(updated_ids)).update(
                 {Stock.last_updated: datetime.now().date()},
                 synchronize_session=False,
             )
 
-        # 3) Now do a single in-memory aggregation of weekly data for all symbols.
-        #    We'll reuse the same 'all_daily_records' to build a DF for weekly aggregator.
-        if not all_daily_records:
-            logger.warning("No daily data was upserted, skipping weekly aggregation.")
-            return
+            # Re-aggregate only the weeks these daily rows fall into
+            first_touched = daily_df.groupby("stock_id")["date"].min().to_dict()
+            repository.refresh_weekly_data(first_touched)
 
-        daily_df = pd.DataFrame(all_daily_records)
+    #
+    # MAIN ENTRY: Download daily data chunk by chunk, storing each chunk (daily rows
+    # and the weeks they touch) as soon as it arrives.
+    #
+    def update_all_stocks(
+        self,
+        symbols: Union[str, List[str]],
+        start_date: str,
+        end_date: str,
+        incremental: bool = False,
+        overlap_days: int = DEFAULT_OVERLAP_DAYS,
+    ) -> Dict[str, str]:
+        """
+        Downloads and upserts daily bars, and refreshes the weekly bars they touch.
 
-        # Only include the date range asked for (plus maybe a small buffer),
-        # in case the downloaded data had extra.
-        daily_df = daily_df[
-            (pd.to_datetime(daily_df["date"]) >= pd.to_datetime(start_date))
-            & (pd.to_datetime(daily_df["date"]) <= pd.to_datetime(end_date))
-        ]
+        With incremental=True each symbol is only fetched from its latest stored
+        bar (minus overlap_days) instead of the whole start_date..end_date window.
 
-        weekly_df = self._aggregate_weekly_data_in_memory(daily_df)
-        if weekly_df.empty:
-            logger.warning("No weekly data generated, skipping upsert.")
-            return
+        Returns {symbol: reason} for the symbols that could not be downloaded.
+        """
+        if isinstance(symbols, str):
+            symbols = [symbols]
 
-        # Convert to list-of-dicts for the weekly_data table
-        weekly_records = []
-        for _, row in weekly_df.iterrows():
-            weekly_records.append(
-                {
-                    "stock_id": int(row["stock_id"]),
-                    "week_start_date": row["week_start_date"].date(),
-                    "open": float(row["open"]),
-                    "high": float(row["high"]),
-                    "low": float(row["low"]),
-                    "close": float(row["close"]),
-                    "volume": int(row["volume"]),
-                }
+        if incremental:
+            fetch_plan = self._plan_incremental_fetch(
+                symbols, start_date, end_date, overlap_days
+            )
+            if not fetch_plan:
+                logger.info("All symbols are up to date. Nothing to fetch.")
+                return {}
+        else:
+            fetch_plan = {start_date: symbols}
+
+        failures = {}
+        for fetch_start, group_symbols in fetch_plan.items():
+            for frames in self.source.iter_chunks(group_symbols, fetch_start, end_date):
+                self._store_chunk(frames)
+            failures.update(self.source.failures)
+
+        if failures:
+            logger.warning(
+                f"Failed to download {len(failures)} of {len(symbols)} symbol(s): "
+                f"{sorted(failures)}"
             )
+        return failures
+
+    def rebuild_weekly_data(self, symbols: Union[str, List[str]] = None):
+        """
+        Recomputes every weekly bar of the given symbols (all stored stocks by default)
+        from the stored daily bars, e.g. after changing the week definition.
+        """
+        if isinstance(symbols, str):
+            symbols = [symbols]
 
-        # 4) Bulk upsert weekly data
         with self.db_manager.session_scope() as session:
             repository = StockRepository(session)
-            repository.bulk_upsert_weekly_data(weekly_records)
+            if symbols is None:
+                symbols = repository.get_all_symbols()
+            stock_ids = list(repository.resolve_stock_ids(symbols).values())
+            written = repository.rebuild_weekly_data(stock_ids)
+        logger.info(f"Rebuilt {written} weekly bars for {len(stock_ids)} stocks.")
 
     #
-    # Indicator updates remain the same. You could optimize further by combining queries,
-    # but this is unchanged for now.
+    # Indicators are computed for a batch of symbols at once on a (bar × symbol)
+    # close matrix (see src/analysis/batch.py). Only rows in [start_date, end_date]
+    # that changed are written, one transaction per batch.
     #
     def update_indicators(
         self,
@@ -364,7 +1034,14 @@ class DataService:
         start_date: str,
         end_date: str,
         time_frame: str = "daily",
-    ):
+        batch_size: int = INDICATOR_BATCH_SIZE,
+        outputs: List[str] = None,
+    ) -> Dict[str, int]:
+        """
+        Recalculates indicators for [start_date, end_date], with a year of earlier
+        bars as warm-up: the given outputs, or every stored indicator.
+        Returns row counts {"written", "skipped", "deleted"}.
+        """
         if isinstance(symbols, str):
             symbols = [symbols]
 
@@ -372,178 +1049,633 @@ class DataService:
             pd.to_datetime(start_date) - timedelta(days=365)
         ).strftime("%Y-%m-%d")
 
+        totals = {"written": 0, "skipped": 0, "deleted": 0}
         with self.db_manager.session_scope() as session:
             repository = StockRepository(session)
-            for symbol in symbols:
-                stock = repository.get_stock_by_symbol(symbol)
-                if not stock:
-                    logger.warning(f"Stock {symbol} not found in database. Skipping.")
-                    continue
-
-                if time_frame == "weekly":
-                    data_query = (
-                        session.query(WeeklyData)
-                        .filter(
-                            WeeklyData.stock_id == stock.id,
-                            WeeklyData.week_start_date >= start_date_with_buffer,
-                            WeeklyData.week_start_date <= end_date,
-                        )
-                        .all()
-                    )
-                    date_field = "week_start_date"
-                    indicator_model = WeeklyTechnicalIndicator
-                else:
-                    data_query = (
-                        session.query(DailyData)
-                        .filter(
-                            DailyData.stock_id == stock.id,
-                            DailyData.date >= start_date_with_buffer,
-                            DailyData.date <= end_date,
-                        )
-                        .all()
-                    )
-                    date_field = "date"
-                    indicator_model = TechnicalIndicator
+            stock_ids = repository.resolve_stock_ids(symbols)
+            missing = [symbol for symbol in symbols if symbol not in stock_ids]
+            if missing:
+                logger.warning(
+                    f"{len(missing)} stock(s) not found in database. Skipping: {missing}"
+                )
 
-                if not data_query:
-                    logger.warning(f"No data found for {symbol}. Skipping.")
+            ids = list(stock_ids.values())
+            updated_ids = []
+            for i in range(0, len(ids), batch_size):
+                batch_ids = ids[i : i + batch_size]
+                matrix = load_close_matrix(
+                    session.connection(),
+                    batch_ids,
+                    start_date_with_buffer,
+                    end_date,
+                    time_frame,
+                )
+                if matrix is None:
+                    logger.warning(f"No data found for {len(batch_ids)} stock(s).")
                     continue
 
-                df = pd.DataFrame([d.__dict__ for d in data_query])
-                df = df.drop(
-                    columns=["id", "stock_id", "_sa_instance_state"],
-                    errors="ignore",
+                results = cached_indicator_matrix(
+                    matrix.values,
+                    time_frame,
+                    outputs or list(INDICATOR_COLUMNS),
+                    self.indicator_cache,
+                    keys=matrix.keys,
                 )
-                df[date_field] = pd.to_datetime(df[date_field])
-                df.set_index(date_field, inplace=True)
+                self._write_indicator_batch(
+                    repository,
+                    matrix,
+                    results,
+                    time_frame,
+                    start_date,
+                    end_date,
+                    totals,
+                )
+                session.commit()
+                updated_ids.extend(int(stock_id) for stock_id in matrix.keys)
 
-                indicators = self.indicator_calc.calculate_indicators(
-                    df["close"], time_frame=time_frame
+            session.query(Stock).filter(Stock.id.in_(updated_ids)).update(
+                {Stock.last_updated: datetime.now().date()},
+                synchronize_session=False,
+            )
+        logger.info(
+            f"{time_frame.capitalize()} indicators for {len(updated_ids)} stocks: "
+            f"{totals['written']} rows written, {totals['skipped']} unchanged rows "
+            f"skipped, {totals['deleted']} stale rows deleted."
+        )
+        if self.indicator_cache:
+            logger.info(f"Indicator cache: {self.indicator_cache.stats()}")
+        return totals
+
+    @staticmethod
+    def _write_indicator_batch(
+        repository, matrix, results, time_frame, start_date, end_date, totals
+    ):
+        indicator_df = to_wide_frame(matrix, results, start_date=start_date)
+        indicator_df["date"] = indicator_df["date"].dt.date
+        counts = repository.sync_indicators(
+            indicator_df, time_frame, start_date, end_date
+        )
+        for key, count in counts.items():
+            totals[key] += count
+
+    def update_indicators_parallel(
+        self,
+        symbols: Union[str, List[str]],
+        start_date: str,
+        end_date: str,
+        time_frames: Tuple[str, ...] = ("daily", "weekly"),
+        workers: int = None,
+        shard_size: int = None,
+        outputs: List[str] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        update_indicators for several time frames at once on a process pool.
+
+        The stocks are split into shards of shard_size (by default small enough
+        to give every worker a few shards, at most INDICATOR_BATCH_SIZE); every
+        (time frame, shard) pair is one task, so daily and weekly shards run side
+        by side. Workers read and compute with their own engine and return the
+        indicator arrays; this process writes each shard's changed rows as it
+        completes.
+        Returns {time_frame: {"written", "skipped", "deleted"}}.
+        """
+        if isinstance(symbols, str):
+            symbols = [symbols]
+
+        start_date_with_buffer = (
+            pd.to_datetime(start_date) - timedelta(days=365)
+        ).strftime("%Y-%m-%d")
+        db_url = self.db_manager.engine.url.render_as_string(hide_password=False)
+
+        totals = {
+            time_frame: {"written": 0, "skipped": 0, "deleted": 0}
+            for time_frame in time_frames
+        }
+        with self.db_manager.session_scope() as session:
+            repository = StockRepository(session)
+            stock_ids = repository.resolve_stock_ids(symbols)
+            missing = [symbol for symbol in symbols if symbol not in stock_ids]
+            if missing:
+                logger.warning(
+                    f"{len(missing)} stock(s) not found in database. Skipping: {missing}"
                 )
+            ids = list(stock_ids.values())
+            if shard_size is None:
+                shard_size = -(-len(ids) // (4 * (workers or os.cpu_count())))
+                shard_size = max(1, min(INDICATOR_BATCH_SIZE, shard_size))
+            shards = [ids[i : i + shard_size] for i in range(0, len(ids), shard_size)]
+            session.commit()
 
-                # Remove old indicators in the same date range
-                repository.session.query(indicator_model).filter(
-                    indicator_model.stock_id == stock.id,
-                    indicator_model.date >= start_date_with_buffer,
-                    indicator_model.date <= end_date,
-                ).delete(synchronize_session=False)
-                repository.session.commit()
-
-                # Insert new rows
-                indicator_records = []
-                for date_idx, row in indicators.iterrows():
-                    for name, value in row.items():
-                        if pd.notna(value):
-                            indicator_records.append(
-                                {
-                                    "stock_id": stock.id,
-                                    "date": date_idx.date(),
-                                    "indicator_name": name,
-                                    "value": float(value),
-                                }
-                            )
-                if indicator_records:
-                    repository.session.bulk_insert_mappings(
-                        indicator_model, indicator_records
+            updated_ids = set()
+            cache = self.indicator_cache
+            cache_counts = defaultdict(int)
+            started = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(
+                        compute_indicator_shard,
+                        db_url,
+                        shard,
+                        start_date_with_buffer,
+                        end_date,
+                        time_frame,
+                        outputs or list(INDICATOR_COLUMNS),
+                        cache.cache_dir if cache else None,
+                        cache.max_entries if cache else 0,
+                    )
+                    for shard in shards
+                    for time_frame in time_frames
+                ]
+                for future in as_completed(futures):
+                    time_frame, matrix, results, counts = future.result()
+                    for key, count in counts.items():
+                        cache_counts[key] += count
+                    if matrix is None:
+                        continue
+                    self._write_indicator_batch(
+                        repository,
+                        matrix,
+                        results,
+                        time_frame,
+                        start_date,
+                        end_date,
+                        totals[time_frame],
                     )
-                    repository.session.commit()
+                    session.commit()
+                    updated_ids.update(int(stock_id) for stock_id in matrix.keys)
 
-                stock.last_updated = datetime.now().date()
-                repository.session.commit()
+            session.query(Stock).filter(Stock.id.in_(list(updated_ids))).update(
+                {Stock.last_updated: datetime.now().date()},
+                synchronize_session=False,
+            )
+        elapsed = time.perf_counter() - started
+        for time_frame, counts in totals.items():
+            logger.info(
+                f"{time_frame.capitalize()} indicators: {counts['written']} rows "
+                f"written, {counts['skipped']} unchanged rows skipped, "
+                f"{counts['deleted']} stale rows deleted."
+            )
+        logger.info(
+            f"Recalculated {len(shards) * len(time_frames)} shards of "
+            f"{len(updated_ids)} stocks in {elapsed:.2f}s with "
+            f"{workers or 'all'} workers."
+        )
+        if cache_counts:
+            logger.info(f"Worker indicator caches: {dict(cache_counts)}")
+        return totals
 
     #
-    # Reading data with indicators is unchanged.
+    # Incremental indicator updates: each symbol's IncrementalIndicators state is
+    # saved one bar behind its latest bar, so the latest (possibly still changing)
+    # bar, e.g. the current week, is recomputed on every run.
     #
-    def get_stock_data_with_indicators(
+    def update_indicators_incremental(
         self,
         symbols: Union[str, List[str]],
-        start_date: str,
-        end_date: str,
         time_frame: str = "daily",
-    ) -> pd.DataFrame:
+        rebuild: bool = False,
+        batch_size: int = INDICATOR_BATCH_SIZE,
+    ):
+        """
+        Advances each symbol's saved indicator state through the bars stored after it
+        and writes indicator rows for those bars only.
+
+        Symbols without a saved state, with a revised bar among the last
+        STATE_CHECK_BARS bars of the state, or all symbols with rebuild=True are
+        replayed from their first stored bar (the full rebuild). Both paths run
+        the same kernels, so they produce identical values; update_indicators
+        agrees with them within INDICATOR_RTOL.
+        """
         if isinstance(symbols, str):
             symbols = [symbols]
 
+        if time_frame == "weekly":
+            price_model = WeeklyData
+            date_column = WeeklyData.week_start_date
+        else:
+            price_model = DailyData
+            date_column = DailyData.date
+
         with self.db_manager.session_scope() as session:
             repository = StockRepository(session)
-            stocks = session.query(Stock).filter(Stock.symbol.in_(symbols)).all()
-            if not stocks:
-                logger.warning("No stocks found for the given symbols.")
-                return pd.DataFrame()
-
-            stock_id_to_symbol = {stock.id: stock.symbol for stock in stocks}
-            stock_ids = list(stock_id_to_symbol.keys())
-
-            if time_frame == "weekly":
-                data_query = (
-                    session.query(WeeklyData)
-                    .filter(
-                        WeeklyData.stock_id.in_(stock_ids),
-                        WeeklyData.week_start_date >= start_date,
-                        WeeklyData.week_start_date <= end_date,
+            ids = list(repository.resolve_stock_ids(symbols).values())
+            updated_ids = []
+            replayed = 0
+
+            for i in range(0, len(ids), batch_size):
+                batch_ids = ids[i : i + batch_size]
+                states = {}
+                if not rebuild:
+                    states = repository.get_indicator_states(batch_ids, time_frame)
+
+                # A saved state is only valid if its last bars are unchanged
+                if states:
+                    ranked = (
+                        session.query(
+                            price_model.stock_id,
+                            price_model.close,
+                            func.row_number()
+                            .over(
+                                partition_by=price_model.stock_id,
+                                order_by=date_column.desc(),
+                            )
+                            .label("bar_rank"),
+                        )
+                        .join(
+                            IndicatorState,
+                            and_(
+                                IndicatorState.stock_id == price_model.stock_id,
+                                IndicatorState.time_frame == time_frame,
+                                date_column <= IndicatorState.last_date,
+                            ),
+                        )
+                        .filter(price_model.stock_id.in_(list(states)))
+                        .subquery()
                     )
-                    .order_by(WeeklyData.week_start_date)
-                )
-                date_field = "week_start_date"
-                indicator_model = WeeklyTechnicalIndicator
-            else:
-                data_query = (
-                    session.query(DailyData)
-                    .filter(
-                        DailyData.stock_id.in_(stock_ids),
-                        DailyData.date >= start_date,
-                        DailyData.date <= end_date,
+                    stored_closes = defaultdict(list)
+                    for stock_id, close in (
+                        session.query(ranked.c.stock_id, ranked.c.close)
+                        .filter(ranked.c.bar_rank <= STATE_CHECK_BARS)
+                        .order_by(ranked.c.stock_id, ranked.c.bar_rank.desc())
+                    ):
+                        stored_closes[stock_id].append(close)
+                    states = {
+                        stock_id: state
+                        for stock_id, state in states.items()
+                        if state.recent_closes is not None
+                        and np.array_equal(
+                            np.frombuffer(state.recent_closes),
+                            stored_closes.get(stock_id, []),
+                        )
+                    }
+                replay_ids = [
+                    stock_id for stock_id in batch_ids if stock_id not in states
+                ]
+                replayed += len(replay_ids)
+
+                columns = [
+                    price_model.stock_id,
+                    date_column.label("date"),
+                    price_model.close,
+                ]
+                queries = []
+                if states:
+                    queries.append(
+                        session.query(*columns)
+                        .join(
+                            IndicatorState,
+                            and_(
+                                IndicatorState.stock_id == price_model.stock_id,
+                                IndicatorState.time_frame == time_frame,
+                            ),
+                        )
+                        .filter(
+                            price_model.stock_id.in_(list(states)),
+                            date_column > IndicatorState.last_date,
+                        )
                     )
-                    .order_by(DailyData.date)
+                if replay_ids:
+                    queries.append(
+                        session.query(*columns).filter(
+                            price_model.stock_id.in_(replay_ids)
+                        )
+                    )
+                closes_df = pd.concat(
+                    [pd.read_sql(q.statement, session.connection()) for q in queries],
+                    ignore_index=True,
                 )
-                date_field = "date"
-                indicator_model = TechnicalIndicator
-
-            data_df = pd.read_sql(data_query.statement, session.bind)
-            if data_df.empty:
-                logger.warning("No data found for the given date range.")
-                return pd.DataFrame()
-
-            data_df["symbol"] = data_df["stock_id"].map(stock_id_to_symbol)
-            data_df.drop(columns=["id", "stock_id"], inplace=True)
-            data_df[date_field] = pd.to_datetime(data_df[date_field])
-
-            indicators_query = (
-                session.query(indicator_model)
-                .filter(
-                    indicator_model.stock_id.in_(stock_ids),
-                    indicator_model.date >= start_date,
-                    indicator_model.date <= end_date,
+                if closes_df.empty:
+                    continue
+
+                matrix = build_price_matrix(closes_df)
+                keys = [int(stock_id) for stock_id in matrix.keys]
+                kernels = IncrementalIndicators(len(keys), time_frame)
+                saved = np.array([stock_id in states for stock_id in keys])
+                if saved.any():
+                    kernels.load_rows(
+                        np.vstack(
+                            [
+                                np.frombuffer(states[stock_id].state)
+                                for stock_id in keys
+                                if stock_id in states
+                            ]
+                        ),
+                        saved,
+                    )
+
+                # Run up to each symbol's second-to-last bar, save, then finish
+                head = kernels.run(matrix.values[:-1])
+                committed = kernels.to_rows()
+                tail = kernels.step(matrix.values[-1])
+                results = {
+                    name: (
+                        np.vstack([head[name], values[None]]) if head else values[None]
+                    )
+                    for name, values in tail.items()
+                }
+
+                if replay_ids:
+                    session.query(IndicatorValues).filter(
+                        IndicatorValues.stock_id.in_(replay_ids),
+                        IndicatorValues.time_frame == time_frame,
+                    ).delete(synchronize_session=False)
+
+                indicator_df = to_wide_frame(matrix, results)
+                indicator_df["date"] = indicator_df["date"].dt.date
+                indicator_df["time_frame"] = time_frame
+                repository.upsert_indicators(indicator_df)
+
+                state_records = []
+                for col, stock_id in enumerate(keys):
+                    if len(matrix.values) < 2 or np.isnan(matrix.values[-2, col]):
+                        # No new committed bar: keep the saved state as it is
+                        continue
+                    new_closes = matrix.values[:-1, col]
+                    new_closes = new_closes[~np.isnan(new_closes)]
+                    if stock_id in states and len(new_closes) < STATE_CHECK_BARS:
+                        # Fewer new bars than checked: the rest are the saved ones
+                        new_closes = np.concatenate(
+                            [np.frombuffer(states[stock_id].recent_closes), new_closes]
+                        )
+                    state_records.append(
+                        {
+                            "stock_id": stock_id,
+                            "time_frame": time_frame,
+                            "last_date": pd.Timestamp(matrix.dates[-2, col]).date(),
+                            "last_close": float(matrix.values[-2, col]),
+                            "recent_closes": new_closes[-STATE_CHECK_BARS:].tobytes(),
+                            "state": committed[col].tobytes(),
+                        }
+                    )
+                repository.save_indicator_states(state_records)
+                session.commit()
+                updated_ids.extend(keys)
+
+            session.query(Stock).filter(Stock.id.in_(updated_ids)).update(
+                {Stock.last_updated: datetime.now().date()},
+                synchronize_session=False,
+            )
+        logger.info(
+            f"Incremental {time_frame} indicators: {len(updated_ids)} stocks updated, "
+            f"{replayed} replayed from full history."
+        )
+
+    def refresh_screening_bars(
+        self,
+        symbols: Union[str, List[str]],
+        time_frames=("daily", "weekly"),
+        n_bars: int = SCREENING_BARS,
+    ) -> Dict[str, int]:
+        """
+        Rewrites the latest n_bars bars of each symbol in screening_bars, after
+        its bars and indicators were updated. Returns {time_frame: rows written}.
+        """
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        written = {}
+        with self.db_manager.session_scope() as session:
+            repository = StockRepository(session)
+            stock_ids = list(repository.resolve_stock_ids(symbols).values())
+            for time_frame in time_frames:
+                written[time_frame] = repository.refresh_screening_bars(
+                    stock_ids, time_frame, n_bars
                 )
-                .order_by(indicator_model.date)
+        logger.info(f"Refreshed screening bars: {written}")
+        return written
+
+    def get_screening_bars(
+        self,
+        symbols: Union[str, List[str]],
+        time_frame: str = "daily",
+        indicators: List[str] = None,
+        float_dtype=np.float32,
+    ) -> pd.DataFrame:
+        """
+        The latest bars of the given symbols from screening_bars, shaped like
+        get_stock_data_with_indicators (the date column is named date for both
+        time frames).
+        """
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        if indicators is None:
+            indicators = list(INDICATOR_COLUMNS)
+
+        with self.db_manager.session_scope() as session:
+            symbol_to_stock_id = StockRepository(session).resolve_stock_ids(symbols)
+        if not symbol_to_stock_id:
+            logger.warning("No stocks found for the given symbols.")
+            return pd.DataFrame()
+        stock_id_to_symbol = {
+            stock_id: symbol for symbol, stock_id in symbol_to_stock_id.items()
+        }
+
+        query = (
+            select(
+                ScreeningBar.stock_id,
+                ScreeningBar.date,
+                ScreeningBar.open,
+                ScreeningBar.high,
+                ScreeningBar.low,
+                ScreeningBar.close,
+                ScreeningBar.volume,
+                *[
+                    getattr(ScreeningBar, INDICATOR_COLUMNS[name]).label(name)
+                    for name in indicators
+                ],
             )
-            indicators_df = pd.read_sql(indicators_query.statement, session.bind)
-            if indicators_df.empty:
-                logger.warning("No technical indicators found for the given range.")
-                data_pivot = data_df.pivot_table(
-                    index=[date_field, "symbol"],
-                    values=["open", "high", "low", "close", "volume"],
+            .where(
+                ScreeningBar.stock_id.in_(list(stock_id_to_symbol)),
+                ScreeningBar.time_frame == time_frame,
+            )
+            .order_by(ScreeningBar.stock_id, ScreeningBar.date)
+        )
+        with self.db_manager.engine.connect() as connection:
+            df = pd.read_sql(query, connection)
+        if df.empty:
+            logger.warning("No screening bars found; run an update first.")
+            return pd.DataFrame()
+
+        df = bars_frame(
+            df,
+            stock_id_to_symbol,
+            pd.CategoricalDtype(sorted(symbol_to_stock_id)),
+            indicators,
+            float_dtype,
+        )
+        df.sort_values(by=["symbol", "date"], inplace=True)
+        df.reset_index(drop=True, inplace=True)
+        return df
+
+    #
+    # Reading data with indicators: one LEFT JOIN of the bars with their row of the
+    # wide indicators table (no pivot needed), streamed from a server-side cursor
+    # in stock-ordered chunks with compact dtypes.
+    #
+    def iter_stock_data_chunks(
+        self,
+        symbols: Union[str, List[str]],
+        start_date: str,
+        end_date: str,
+        time_frame: str = "daily",
+        indicators: List[str] = None,
+        chunk_rows: int = READ_CHUNK_ROWS,
+        float_dtype=np.float32,
+        by_date: bool = False,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Yields frames of at most chunk_rows bars, ordered by stock and date (by
+        date and stock if by_date), with a categorical symbol column, float_dtype
+        prices/indicators and int64 volume. A stock's (date's) bars may continue
+        in the next chunk.
+        """
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        if indicators is None:
+            indicators = list(INDICATOR_COLUMNS)
+
+        with self.db_manager.session_scope() as session:
+            symbol_to_stock_id = StockRepository(session).resolve_stock_ids(symbols)
+        if not symbol_to_stock_id:
+            logger.warning("No stocks found for the given symbols.")
+            return
+
+        stock_id_to_symbol = {
+            stock_id: symbol for symbol, stock_id in symbol_to_stock_id.items()
+        }
+        symbol_dtype = pd.CategoricalDtype(sorted(symbol_to_stock_id))
+
+        data_query, price_model, date_column = bars_with_indicators_query(
+            time_frame, indicators
+        )
+        data_query = data_query.where(
+            price_model.stock_id.in_(list(stock_id_to_symbol)),
+            date_column >= start_date,
+            date_column <= end_date,
+        )
+        if by_date:
+            data_query = data_query.order_by(date_column, price_model.stock_id)
+        else:
+            data_query = data_query.order_by(price_model.stock_id, date_column)
+
+        with self.db_manager.engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True, max_row_buffer=chunk_rows
+            ).execute(data_query)
+            columns = list(result.keys())
+            for rows in result.partitions(chunk_rows):
+                yield bars_frame(
+                    pd.DataFrame.from_records(rows, columns=columns),
+                    stock_id_to_symbol,
+                    symbol_dtype,
+                    indicators,
+                    float_dtype,
                 )
-                final_df = data_pivot.reset_index()
-                return final_df
-
-            indicators_df["symbol"] = indicators_df["stock_id"].map(stock_id_to_symbol)
-            indicators_df.drop(columns=["id", "stock_id"], inplace=True)
-            indicators_df[date_field] = pd.to_datetime(indicators_df[date_field])
-
-            indicators_pivot = indicators_df.pivot_table(
-                index=[date_field, "symbol"],
-                columns="indicator_name",
-                values="value",
-            ).reset_index()
-
-            merged_df = pd.merge(
-                data_df,
-                indicators_pivot,
-                on=[date_field, "symbol"],
-                how="left",
+
+    def iter_stock_data_with_indicators(
+        self,
+        symbols: Union[str, List[str]],
+        start_date: str,
+        end_date: str,
+        time_frame: str = "daily",
+        indicators: List[str] = None,
+        chunk_rows: int = READ_CHUNK_ROWS,
+        float_dtype=np.float32,
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Yields (symbol, frame) per stock, in stock id order, holding at most one
+        chunk plus one stock's bars in memory at a time.
+        """
+        pending = None
+        for chunk in self.iter_stock_data_chunks(
+            symbols,
+            start_date,
+            end_date,
+            time_frame,
+            indicators,
+            chunk_rows,
+            float_dtype,
+        ):
+            if pending is not None:
+                chunk = pd.concat([pending, chunk], ignore_index=True)
+            # Only the chunk's last stock can continue in the next chunk
+            complete = chunk["symbol"] != chunk["symbol"].iat[-1]
+            for symbol, frame in chunk[complete].groupby(
+                "symbol", observed=True, sort=False
+            ):
+                yield symbol, frame.reset_index(drop=True)
+            pending = chunk[~complete]
+
+        if pending is not None:
+            yield pending["symbol"].iat[0], pending.reset_index(drop=True)
+
+    def iter_bars_by_date(
+        self,
+        symbols: Union[str, List[str]],
+        start_date: str,
+        end_date: str,
+        time_frame: str = "daily",
+        indicators: List[str] = None,
+        chunk_rows: int = READ_CHUNK_ROWS,
+        float_dtype=np.float32,
+    ) -> Iterator[Tuple[pd.Timestamp, pd.DataFrame]]:
+        """
+        Yields (date, frame) with every symbol's bar of that date, in date order,
+        holding at most one chunk plus one date's bars in memory at a time (the
+        input of the event-driven backtester).
+        """
+        pending = None
+        for chunk in self.iter_stock_data_chunks(
+            symbols,
+            start_date,
+            end_date,
+            time_frame,
+            indicators,
+            chunk_rows,
+            float_dtype,
+            by_date=True,
+        ):
+            if pending is not None:
+                chunk = pd.concat([pending, chunk], ignore_index=True)
+            dates = chunk.iloc[:, 1].to_numpy()
+            # Only the chunk's last date can continue in the next chunk
+            bounds = np.flatnonzero(dates[1:] != dates[:-1]) + 1
+            starts = np.concatenate([[0], bounds])
+            for start, end in zip(starts[:-1], bounds):
+                yield dates[start], chunk.iloc[start:end].reset_index(drop=True)
+            pending = chunk.iloc[starts[-1] :]
+
+        if pending is not None:
+            yield pending.iat[0, 1], pending.reset_index(drop=True)
+
+    def get_stock_data_with_indicators(
+        self,
+        symbols: Union[str, List[str]],
+        start_date: str,
+        end_date: str,
+        time_frame: str = "daily",
+        indicators: List[str] = None,
+        float_dtype=np.float32,
+    ) -> pd.DataFrame:
+        """
+        Bars of the given symbols with their indicator columns (the given
+        indicators, or every stored one) as one frame sorted by symbol and date.
+        """
+        chunks = list(
+            self.iter_stock_data_chunks(
+                symbols,
+                start_date,
+                end_date,
+                time_frame,
+                indicators,
+                float_dtype=float_dtype,
             )
-            merged_df.sort_values(by=["symbol", date_field], inplace=True)
-            merged_df.reset_index(drop=True, inplace=True)
+        )
+        if not chunks:
+            logger.warning("No data found for the given date range.")
+            return pd.DataFrame()
 
-            return merged_df
+        date_field = "week_start_date" if time_frame == "weekly" else "date"
+        merged_df = pd.concat(chunks, ignore_index=True)
+        merged_df.sort_values(by=["symbol", date_field], inplace=True)
+        merged_df.reset_index(drop=True, inplace=True)
+        return merged_df
@@ -0,0 +1,227 @@
+import logging
+import os
+import shutil
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.data.fetcher import DataService, StockRepository
+
+logger = logging.getLogger(__name__)
+
+# Symbols read from the database and written per export batch
+SNAPSHOT_BATCH_SIZE = 500
+
+# Rows per Parquet row group; groups cover contiguous symbol ranges
+SNAPSHOT_ROW_GROUP_ROWS = 65_536
+
+
+class AnalyticsSnapshot:
+    """
+    Read-only Parquet copy of the bars and indicators, so screeners and backtests
+    can load the universe without a database round trip.
+
+    The dataset under `path` is hive-partitioned as time_frame=<tf>/year=<yyyy>/,
+    with one row per bar: symbol, date (week start for weekly bars), open, high,
+    low, close, volume and every indicator column. Files and row groups are
+    written in symbol order, so symbol predicates are pruned by row-group
+    statistics as well as date predicates by the year partitions.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _frame_dir(self, time_frame: str) -> str:
+        return os.path.join(self.path, f"time_frame={time_frame}")
+
+    def exists(self, time_frame: str = "daily") -> bool:
+        return os.path.isdir(self._frame_dir(time_frame))
+
+    def export(
+        self,
+        data_service: DataService,
+        start_date: str,
+        end_date: str,
+        time_frames: Iterable[str] = ("daily", "weekly"),
+        symbols: List[str] = None,
+        batch_size: int = SNAPSHOT_BATCH_SIZE,
+        float_dtype=np.float32,
+    ) -> Dict[str, int]:
+        """
+        Rewrites the snapshot of each time frame from the database (every stored
+        symbol by default) and returns {time_frame: rows written}. Each time
+        frame is written to a hidden directory first and swapped in at the end
+        by renames (the old copy is moved aside, then deleted), so readers never
+        see a half-written snapshot.
+        """
+        if symbols is None:
+            with data_service.db_manager.session_scope() as session:
+                symbols = StockRepository(session).get_all_symbols()
+        symbols = sorted(symbols)
+
+        written = {}
+        for time_frame in time_frames:
+            final_dir = self._frame_dir(time_frame)
+            tmp_dir = os.path.join(self.path, f".time_frame={time_frame}.tmp")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+
+            rows = 0
+            for i in range(0, len(symbols), batch_size):
+                df = data_service.get_stock_data_with_indicators(
+                    symbols[i : i + batch_size],
+                    start_date,
+                    end_date,
+                    time_frame,
+                    float_dtype=float_dtype,
+                )
+                if df.empty:
+                    continue
+                df = df.rename(columns={"week_start_date": "date"})
+                df["symbol"] = df["symbol"].astype(str)
+                df["year"] = df["date"].dt.year.astype(np.int16)
+
+                ds.write_dataset(
+                    pa.Table.from_pandas(df, preserve_index=False),
+                    tmp_dir,
+                    format="parquet",
+                    partitioning=ds.partitioning(
+                        pa.schema([("year", pa.int16())]), flavor="hive"
+                    ),
+                    basename_template=f"part-{i // batch_size:05d}-{{i}}.parquet",
+                    max_rows_per_group=SNAPSHOT_ROW_GROUP_ROWS,
+                    preserve_order=True,
+                    existing_data_behavior="overwrite_or_ignore",
+                )
+                rows += len(df)
+
+            # Swap by renames only; the old copy is deleted once the new one
+            # is in place
+            old_dir = os.path.join(self.path, f".time_frame={time_frame}.old")
+            shutil.rmtree(old_dir, ignore_errors=True)
+            if os.path.exists(final_dir):
+                os.replace(final_dir, old_dir)
+            os.replace(tmp_dir, final_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+            written[time_frame] = rows
+            logger.info(f"Exported {rows} {time_frame} rows to {final_dir}.")
+        return written
+
+    def _date_scalar(self, value, date_type: pa.DataType) -> pa.Scalar:
+        return pa.scalar(pd.Timestamp(value).to_pydatetime(), type=date_type)
+
+    def read_table(
+        self,
+        time_frame: str = "daily",
+        columns: List[str] = None,
+        symbols: Union[str, List[str]] = None,
+        start_date=None,
+        end_date=None,
+        memory_map: bool = True,
+    ) -> pa.Table:
+        """
+        Arrow table of the snapshot's bars, sorted by symbol and date. Only the
+        given columns (plus symbol and date) are decoded; symbols and the
+        inclusive date range are pushed down to partitions and row groups.
+        """
+        path = self._frame_dir(time_frame)
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"No {time_frame} snapshot at {path}")
+
+        dataset = ds.dataset(path, format="parquet", partitioning="hive")
+        date_type = dataset.schema.field("date").type
+        predicate = ds.scalar(True)
+        if symbols is not None:
+            if isinstance(symbols, str):
+                symbols = [symbols]
+            predicate &= ds.field("symbol").isin(symbols)
+        if start_date is not None:
+            predicate &= ds.field("year") >= pd.Timestamp(start_date).year
+            predicate &= ds.field("date") >= self._date_scalar(start_date, date_type)
+        if end_date is not None:
+            predicate &= ds.field("year") <= pd.Timestamp(end_date).year
+            predicate &= ds.field("date") <= self._date_scalar(end_date, date_type)
+
+        if columns is not None:
+            columns = ["symbol", "date"] + [
+                c for c in columns if c not in ("symbol", "date")
+            ]
+        table = pq.read_table(
+            path,
+            columns=columns,
+            filters=predicate,
+            memory_map=memory_map,
+            partitioning="hive",
+        )
+        if columns is None:
+            table = table.drop_columns(["year"])
+        return table.sort_by([("symbol", "ascending"), ("date", "ascending")])
+
+    def read(
+        self,
+        time_frame: str = "daily",
+        columns: List[str] = None,
+        symbols: Union[str, List[str]] = None,
+        start_date=None,
+        end_date=None,
+        memory_map: bool = True,
+    ) -> pd.DataFrame:
+        """
+        read_table as a pandas frame shaped like
+        DataService.get_stock_data_with_indicators (categorical symbol, float32
+        values), with the date column named date for both time frames.
+        """
+        table = self.read_table(
+            time_frame, columns, symbols, start_date, end_date, memory_map
+        )
+        return table.to_pandas(categories=["symbol"])
+
+    def iter_bars_by_date(
+        self,
+        time_frame: str = "daily",
+        columns: List[str] = None,
+        symbols: Union[str, List[str]] = None,
+        start_date=None,
+        end_date=None,
+    ) -> Iterator[Tuple[pd.Timestamp, pd.DataFrame]]:
+        """
+        Yields (date, frame) with every symbol's bar of that date, in date order,
+        like DataService.iter_bars_by_date. One year partition is read at a time.
+        """
+        path = self._frame_dir(time_frame)
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"No {time_frame} snapshot at {path}")
+        years = sorted(
+            int(name.split("=", 1)[1])
+            for name in os.listdir(path)
+            if name.startswith("year=")
+        )
+        if start_date is not None:
+            years = [y for y in years if y >= pd.Timestamp(start_date).year]
+        if end_date is not None:
+            years = [y for y in years if y <= pd.Timestamp(end_date).year]
+
+        for year in years:
+            year_start = pd.Timestamp(year, 1, 1)
+            year_end = pd.Timestamp(year, 12, 31)
+            frame = self.read(
+                time_frame,
+                columns,
+                symbols,
+                max(year_start, pd.Timestamp(start_date or year_start)),
+                min(year_end, pd.Timestamp(end_date or year_end)),
+            )
+            if frame.empty:
+                continue
+            # Symbol order is kept within each date
+            frame = frame.iloc[np.argsort(frame["date"].to_numpy(), kind="stable")]
+            dates = frame["date"].to_numpy()
+            bounds = np.flatnonzero(dates[1:] != dates[:-1]) + 1
+            starts = np.concatenate([[0], bounds])
+            ends = np.append(bounds, len(frame))
+            for start, end in zip(starts, ends):
+                yield dates[start], frame.iloc[start:end].reset_index(drop=True)
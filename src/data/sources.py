@@ -0,0 +1,158 @@
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+
+class MarketDataSource(ABC):
+    """
+    Where DataService.update_all_stocks gets its bars from.
+
+    iter_chunks yields {symbol: DataFrame} batches, each frame indexed by date with
+    Open/High/Low/Close/Volume columns (the yfinance shape). Symbols that could not
+    be served during the last call are reported in `failures`.
+    """
+
+    failures: Dict[str, str]
+
+    @abstractmethod
+    def iter_chunks(
+        self, symbols: List[str], start_date: str, end_date: str
+    ) -> Iterator[Dict[str, pd.DataFrame]]:
+        pass
+
+
+class ReplaySource(MarketDataSource):
+    """
+    Replays pre-recorded OHLCV bars from a Parquet file/dataset directory or a CSV file,
+    so ingestion can be run and profiled without a network connection.
+
+    The file is long-format with columns symbol, date, open, high, low, close, volume.
+    Parquet is read memory-mapped with column projection and symbol/date predicates
+    pushed down to the row groups. A CSV is memory-mapped and parsed once into an
+    Arrow table. As with yfinance, end_date is exclusive.
+    """
+
+    COLUMNS = ["symbol", "date", "open", "high", "low", "close", "volume"]
+
+    def __init__(self, path: str, chunk_size: int = 200):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.is_csv = path.lower().endswith(".csv")
+        self.failures: Dict[str, str] = {}
+        self._cached_dataset = None
+
+    def _date_scalar(self, value: str, date_type: pa.DataType) -> pa.Scalar:
+        ts = pd.Timestamp(value)
+        if pa.types.is_timestamp(date_type):
+            return pa.scalar(ts.to_pydatetime(), type=date_type)
+        return pa.scalar(ts.date(), type=pa.date32()).cast(date_type)
+
+    def _dataset(self) -> ds.Dataset:
+        if self._cached_dataset is None:
+            if self.is_csv:
+                table = pacsv.read_csv(
+                    pa.memory_map(self.path),
+                    convert_options=pacsv.ConvertOptions(
+                        include_columns=self.COLUMNS,
+                        column_types={"symbol": pa.string(), "date": pa.date32()},
+                    ),
+                )
+                self._cached_dataset = ds.dataset(table)
+            else:
+                # A single file or a (hive-partitioned) dataset directory
+                self._cached_dataset = ds.dataset(
+                    self.path, format="parquet", partitioning="hive"
+                )
+        return self._cached_dataset
+
+    def _read(self, symbols: List[str], start_date: str, end_date: str) -> pa.Table:
+        date_type = self._dataset().schema.field("date").type
+        predicate = (
+            ds.field("symbol").isin(symbols)
+            & (ds.field("date") >= self._date_scalar(start_date, date_type))
+            & (ds.field("date") < self._date_scalar(end_date, date_type))
+        )
+        if self.is_csv:
+            return self._dataset().to_table(columns=self.COLUMNS, filter=predicate)
+        return pq.read_table(
+            self.path, columns=self.COLUMNS, filters=predicate, memory_map=True
+        )
+
+    def iter_chunks(
+        self, symbols: List[str], start_date: str, end_date: str
+    ) -> Iterator[Dict[str, pd.DataFrame]]:
+        self.failures = {}
+        for i in range(0, len(symbols), self.chunk_size):
+            chunk = symbols[i : i + self.chunk_size]
+            df = self._read(chunk, start_date, end_date).to_pandas()
+            df = df.rename(
+                columns={
+                    "date": "Date",
+                    "open": "Open",
+                    "high": "High",
+                    "low": "Low",
+                    "close": "Close",
+                    "volume": "Volume",
+                }
+            )
+            df["Date"] = pd.to_datetime(df["Date"])
+
+            frames = {
+                symbol: group.drop(columns="symbol").set_index("Date").sort_index()
+                for symbol, group in df.groupby("symbol", sort=False)
+            }
+            for symbol in chunk:
+                if symbol not in frames:
+                    self.failures[symbol] = "no data in replay file"
+            if frames:
+                yield frames
+
+    @staticmethod
+    def record(
+        source: MarketDataSource,
+        symbols: List[str],
+        start_date: str,
+        end_date: str,
+        path: str,
+    ):
+        """
+        Captures the bars served by another source (e.g. the live downloader) into a
+        Parquet replay file, one row group per downloaded chunk.
+        """
+        schema = pa.schema(
+            [
+                ("symbol", pa.string()),
+                ("date", pa.date32()),
+                ("open", pa.float64()),
+                ("high", pa.float64()),
+                ("low", pa.float64()),
+                ("close", pa.float64()),
+                ("volume", pa.int64()),
+            ]
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with pq.ParquetWriter(path, schema) as writer:
+            for frames in source.iter_chunks(symbols, start_date, end_date):
+                parts = []
+                for symbol, frame in frames.items():
+                    part = frame[["Open", "High", "Low", "Close", "Volume"]].dropna()
+                    part.columns = ["open", "high", "low", "close", "volume"]
+                    part = part.reset_index(names="date")
+                    part.insert(0, "symbol", symbol)
+                    parts.append(part)
+                chunk_df = pd.concat(parts, ignore_index=True)
+                chunk_df["date"] = pd.to_datetime(chunk_df["date"]).dt.date
+                chunk_df["volume"] = chunk_df["volume"].astype("int64")
+                writer.write_table(
+                    pa.Table.from_pandas(chunk_df, schema=schema, preserve_index=False)
+                )
+        logger.info(f"Recorded replay file at {path}")
@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SymbolUniverse:
+    """
+    Lazily loaded symbol list backed by a JSON cache file with a TTL.
+
+    Nothing is fetched until `symbols` is first read. A fresh cache is used as-is,
+    a stale cache is returned immediately while a background thread refreshes it,
+    and the remote loader is only called synchronously when there is no cache at
+    all. If the loader fails (e.g. offline), any cached list is used instead.
+    Processes share the cache file, so pool workers don't each hit the endpoint.
+    """
+
+    # A refresh claim older than this is assumed to belong to a dead process
+    REFRESH_LOCK_TIMEOUT = 300
+
+    def __init__(
+        self,
+        loader: Callable[[], List[str]],
+        cache_path: str,
+        ttl: float = 24 * 60 * 60,
+    ):
+        self.loader = loader
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self._symbols: Optional[List[str]] = None
+        self._lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    @property
+    def symbols(self) -> List[str]:
+        if self._symbols is None:
+            with self._lock:
+                if self._symbols is None:
+                    self._symbols = self._load()
+        return self._symbols
+
+    def _read_cache(self) -> Optional[Tuple[float, List[str]]]:
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+            return cached["fetched_at"], cached["symbols"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_cache(self, symbols: List[str]):
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"fetched_at": time.time(), "symbols": symbols}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _load(self) -> List[str]:
+        cached = self._read_cache()
+        if cached is None:
+            return self.refresh()
+
+        fetched_at, symbols = cached
+        if time.time() - fetched_at > self.ttl:
+            logger.info("Symbol cache is stale, refreshing in the background.")
+            self.refresh(background=True)
+        return symbols
+
+    def _claim_refresh(self) -> bool:
+        # Only one process refreshes a stale cache; the others keep using it.
+        lock_path = f"{self.cache_path}.lock"
+        try:
+            if time.time() - os.path.getmtime(lock_path) > self.REFRESH_LOCK_TIMEOUT:
+                os.remove(lock_path)
+        except OSError:
+            pass
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    def _release_refresh(self):
+        try:
+            os.remove(f"{self.cache_path}.lock")
+        except OSError:
+            pass
+
+    def _fetch_and_store(self) -> List[str]:
+        symbols = self.loader()
+        self._write_cache(symbols)
+        self._symbols = symbols
+        logger.info(f"Refreshed symbol cache with {len(symbols)} symbols.")
+        return symbols
+
+    def _refresh_worker(self):
+        try:
+            self._fetch_and_store()
+        except Exception as e:
+            logger.warning(f"Background symbol refresh failed: {str(e)}")
+        finally:
+            self._release_refresh()
+
+    def refresh(self, background: bool = False) -> Optional[List[str]]:
+        """
+        Fetches the symbol list from the loader and rewrites the cache.
+
+        With background=True the fetch runs on a daemon thread and None is returned.
+        Otherwise the fresh list is returned, falling back to the cached list if the
+        loader fails.
+        """
+        if background:
+            if self._refresh_thread and self._refresh_thread.is_alive():
+                return None
+            if not self._claim_refresh():
+                return None
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_worker, daemon=True
+            )
+            self._refresh_thread.start()
+            return None
+
+        try:
+            return self._fetch_and_store()
+        except Exception as e:
+            cached = self._read_cache()
+            if cached is None:
+                raise
+            logger.warning(
+                f"Could not refresh symbols ({str(e)}), using cached list instead."
+            )
+            self._symbols = cached[1]
+            return self._symbols
@@ -2,6 +2,7 @@
 
 from sqlalchemy import (
     create_engine,
+    inspect,
     Column,
     Integer,
     String,
@@ -10,6 +11,7 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     Index,
+    LargeBinary,
     UniqueConstraint,
 )
 from sqlalchemy.orm import declarative_base, relationship
@@ -26,10 +28,8 @@ class Stock(Base):
     last_updated = Column(DateTime)
     daily_data = relationship("DailyData", back_populates="stock")
     weekly_data = relationship("WeeklyData", back_populates="stock")
-    technical_indicators = relationship("TechnicalIndicator", back_populates="stock")
-    weekly_technical_indicators = relationship(
-        "WeeklyTechnicalIndicator", back_populates="stock"
-    )  # New relationship
+    indicators = relationship("IndicatorValues", back_populates="stock")
+    screening_bars = relationship("ScreeningBar", back_populates="stock")
 
 
 class DailyData(Base):
@@ -68,56 +68,207 @@ class WeeklyData(Base):
     )
 
 
-class TechnicalIndicator(Base):
-    __tablename__ = "technical_indicators"
+class IndicatorValues(Base):
+    """
+    One row per stock, bar and time frame, with a nullable Float column per
+    indicator (see INDICATOR_COLUMNS). Replaces the one-row-per-indicator
+    technical_indicators / weekly_technical_indicators tables.
+    """
+
+    __tablename__ = "indicators"
     id = Column(Integer, primary_key=True)
-    stock_id = Column(Integer, ForeignKey("stocks.id"), nullable=False)
+    stock_id = Column(
+        Integer, ForeignKey("stocks.id", ondelete="CASCADE"), nullable=False
+    )
     date = Column(Date, nullable=False)
-    indicator_name = Column(String, nullable=False)
-    value = Column(Float, nullable=False)
     time_frame = Column(String, nullable=False, default="daily")
-    stock = relationship("Stock", back_populates="technical_indicators")
+    stock = relationship("Stock", back_populates="indicators")
 
     __table_args__ = (
         UniqueConstraint(
-            "stock_id",
-            "date",
-            "indicator_name",
-            "time_frame",
-            name="uix_stock_date_indicator",
+            "stock_id", "time_frame", "date", name="uix_indicators_stock_frame_date"
         ),
-        Index("idx_technical_indicators_stock_date", "stock_id", "date"),
     )
 
 
-class WeeklyTechnicalIndicator(Base):
-    __tablename__ = "weekly_technical_indicators"
+class ScreeningBar(Base):
+    """
+    The latest bars of each stock and time frame with their indicator columns,
+    rewritten by the update pipeline so screeners read a few rows per stock
+    instead of the full history. date is the week start for weekly bars.
+    """
+
+    __tablename__ = "screening_bars"
     id = Column(Integer, primary_key=True)
     stock_id = Column(
         Integer, ForeignKey("stocks.id", ondelete="CASCADE"), nullable=False
     )
+    time_frame = Column(String, nullable=False)
     date = Column(Date, nullable=False)
-    indicator_name = Column(String, nullable=False)
-    value = Column(Float, nullable=False)
-    stock = relationship("Stock", back_populates="weekly_technical_indicators")
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    volume = Column(Integer, nullable=False)
+    stock = relationship("Stock", back_populates="screening_bars")
 
     __table_args__ = (
         UniqueConstraint(
-            "stock_id",
-            "date",
-            "indicator_name",
-            name="uix_weekly_stock_date_indicator",
+            "stock_id", "time_frame", "date", name="uix_screening_stock_frame_date"
         ),
-        Index("idx_weekly_technical_indicators_stock_date", "stock_id", "date"),
     )
 
 
+# Indicator name (as computed by src/analysis) -> column of the indicators table.
+INDICATOR_COLUMNS = {}
+
+# Tables with a Float column per registered indicator
+INDICATOR_COLUMN_MODELS = (IndicatorValues, ScreeningBar)
+
+
+def register_indicator_column(indicator_name: str, column_name: str = None) -> str:
+    """
+    Adds a Float column for a new indicator to IndicatorValues and ScreeningBar.
+    Existing databases get the column from migrate_indicator_storage().
+    """
+    column_name = column_name or indicator_name.lower()
+    INDICATOR_COLUMNS[indicator_name] = column_name
+    for model in INDICATOR_COLUMN_MODELS:
+        if column_name not in model.__table__.c:
+            setattr(model, column_name, Column(Float))
+    return column_name
+
+
+for _name in (
+    "SMA12",
+    "SMA26",
+    "SMA50",
+    "SMA200",
+    "EMA12",
+    "EMA26",
+    "EMA50",
+    "EMA200",
+    "RSI",
+    "MACD",
+    "MACD_Signal",
+    "MACD_Histogram",
+    "BB_Middle",
+    "BB_Upper",
+    "BB_Lower",
+):
+    register_indicator_column(_name)
+
+
+class IndicatorState(Base):
+    """
+    Saved IncrementalIndicators state per stock and time frame, as of last_date.
+    recent_closes (float64 bytes, oldest first) are the closes of the last bars up
+    to last_date; if any of them was revised since, the state is discarded and the
+    symbol replayed from its full history.
+    """
+
+    __tablename__ = "indicator_state"
+    id = Column(Integer, primary_key=True)
+    stock_id = Column(
+        Integer, ForeignKey("stocks.id", ondelete="CASCADE"), nullable=False
+    )
+    time_frame = Column(String, nullable=False)
+    last_date = Column(Date, nullable=False)
+    last_close = Column(Float, nullable=False)
+    recent_closes = Column(LargeBinary)
+    state = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("stock_id", "time_frame", name="uix_indicator_state"),
+    )
+
+
+# Old one-row-per-indicator tables -> their time frame (None: a time_frame column)
+LEGACY_INDICATOR_TABLES = {
+    "technical_indicators": None,
+    "weekly_technical_indicators": "weekly",
+}
+
+
+def migrate_indicator_storage(engine, drop_legacy: bool = False) -> dict:
+    """
+    Creates the indicators table, adds columns registered since it was created
+    (to it and to screening_bars) and copies the rows of the legacy
+    technical_indicators tables into it (pivoted with one GROUP BY per table,
+    keeping rows already present). With drop_legacy=True the legacy tables are
+    dropped afterwards. Returns {legacy_table: rows copied}.
+    """
+    Base.metadata.create_all(engine)
+    table = IndicatorValues.__table__
+    columns = list(INDICATOR_COLUMNS.items())
+    copied = {}
+
+    with engine.begin() as connection:
+        for model in INDICATOR_COLUMN_MODELS:
+            model_table = model.__table__
+            existing = {
+                c["name"] for c in inspect(connection).get_columns(model_table.name)
+            }
+            for _, column_name in columns:
+                if column_name not in existing:
+                    column_type = model_table.c[column_name].type.compile(
+                        dialect=engine.dialect
+                    )
+                    connection.exec_driver_sql(
+                        f"ALTER TABLE {model_table.name} "
+                        f"ADD COLUMN {column_name} {column_type}"
+                    )
+
+        # Nullable indicator_state columns added since it was created; states
+        # saved without them are replayed once
+        state_table = IndicatorState.__table__
+        existing = {
+            c["name"] for c in inspect(connection).get_columns(state_table.name)
+        }
+        for column in state_table.c:
+            if column.name not in existing:
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {state_table.name} ADD COLUMN {column.name} "
+                    f"{column.type.compile(dialect=engine.dialect)}"
+                )
+
+        for legacy_table, time_frame in LEGACY_INDICATOR_TABLES.items():
+            if not inspect(connection).has_table(legacy_table):
+                continue
+            pivot = ", ".join(
+                f"MAX(CASE WHEN indicator_name = '{name}' THEN value END)"
+                for name, _ in columns
+            )
+            if time_frame:
+                frame_sql, group_by = f"'{time_frame}'", "stock_id, date"
+            else:
+                frame_sql, group_by = "time_frame", "stock_id, date, time_frame"
+            result = connection.exec_driver_sql(
+                f"INSERT INTO {table.name} (stock_id, date, time_frame, "
+                f"{', '.join(column_name for _, column_name in columns)}) "
+                f"SELECT stock_id, date, {frame_sql}, {pivot} FROM {legacy_table} "
+                f"WHERE true GROUP BY {group_by} "
+                f"ON CONFLICT (stock_id, time_frame, date) DO NOTHING"
+            )
+            copied[legacy_table] = result.rowcount
+            if drop_legacy:
+                connection.exec_driver_sql(f"DROP TABLE {legacy_table}")
+    return copied
+
+
 def init_db(db_path):
     engine = create_engine(f"sqlite:///{db_path}")
+    # WAL is persistent in the database file; per-connection pragmas are set by
+    # src.database.upsert.configure_sqlite.
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA journal_mode=WAL")
     Base.metadata.create_all(engine)
+    return migrate_indicator_storage(engine)
 
 
 if __name__ == "__main__":
     db_path = os.path.join(os.path.dirname(__file__), "..", "..", "data", "stocks.db")
-    init_db(db_path)
+    copied = init_db(db_path)
+    for legacy_table, rows in copied.items():
+        print(f"Copied {rows} indicator rows from {legacy_table}")
     print(f"Database initialized at {db_path}")
@@ -0,0 +1,162 @@
+import logging
+import time
+from typing import List
+
+import pandas as pd
+from sqlalchemy import Date, Table, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from src.database.bulk import copy_upsert
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL frames with at least this many values (rows × columns) go through
+# COPY + merge; smaller ones are cheaper as multi-row INSERT ... ON CONFLICT
+# statements, whose compile time grows with every bound value.
+COPY_THRESHOLD = 5_000
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": -64_000,  # KiB, i.e. ~64 MB
+    "mmap_size": 268_435_456,
+}
+
+
+def configure_sqlite(engine: Engine):
+    """
+    Applies SQLITE_PRAGMAS to every new connection of a SQLite engine.
+    WAL lets readers (screeners, dashboard) run while an update is writing.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def dialect_insert(session: Session, table: Table):
+    """
+    insert() construct for the session's dialect, with on_conflict_do_* support.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    if dialect == "sqlite":
+        return sqlite.insert(table)
+    raise ValueError(f"Upserts are not supported on {dialect}")
+
+
+def _values_upsert(
+    session: Session,
+    table: Table,
+    df: pd.DataFrame,
+    conflict_columns: List[str],
+    batch_size: int = 500,
+) -> int:
+    # PostgreSQL: multi-row VALUES per statement; NaN is stored as NULL
+    records = df.astype(object).where(df.notna(), None).to_dict("records")
+    for i in range(0, len(records), batch_size):
+        stmt = dialect_insert(session, table).values(records[i : i + batch_size])
+        update_dict = {
+            c.name: c
+            for c in stmt.excluded
+            if c.name in df.columns and c.name not in conflict_columns
+        }
+        if update_dict:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=conflict_columns, set_=update_dict
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+        session.execute(stmt)
+    return len(records)
+
+
+def _executemany_upsert(
+    session: Session,
+    table: Table,
+    df: pd.DataFrame,
+    conflict_columns: List[str],
+) -> int:
+    # SQLite: one prepared INSERT ... ON CONFLICT statement, executemany'd over
+    # plain tuples. SQLAlchemy stores Date columns as ISO strings on SQLite.
+    columns = list(df.columns)
+    df = df.copy()
+    for column in columns:
+        if isinstance(table.c[column].type, Date):
+            df[column] = pd.to_datetime(df[column]).dt.strftime("%Y-%m-%d")
+    df = df.astype(object).where(df.notna(), None)
+
+    update_columns = [c for c in columns if c not in conflict_columns]
+    if update_columns:
+        conflict_action = "DO UPDATE SET " + ", ".join(
+            f"{c} = excluded.{c}" for c in update_columns
+        )
+    else:
+        conflict_action = "DO NOTHING"
+    sql = (
+        f"INSERT INTO {table.name} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT ({', '.join(conflict_columns)}) {conflict_action}"
+    )
+    rows = list(df.itertuples(index=False, name=None))
+    session.connection().exec_driver_sql(sql, rows)
+    return len(rows)
+
+
+def bulk_upsert(
+    session: Session,
+    table: Table,
+    df: pd.DataFrame,
+    conflict_columns: List[str],
+    strategy: str = None,
+) -> int:
+    """
+    Upserts a DataFrame into `table` (insert, or update on conflict_columns) using the
+    fastest strategy for the session's dialect:
+
+    - "copy": PostgreSQL COPY into a staging table + one merge (large frames)
+    - "values": PostgreSQL multi-row INSERT ... ON CONFLICT batches (small frames)
+    - "executemany": SQLite prepared INSERT ... ON CONFLICT over row tuples
+
+    `strategy` forces one of them (e.g. for benchmarks). Duplicate keys keep the
+    last row. Returns the number of rows written.
+    """
+    if df.empty:
+        return 0
+
+    dialect = session.get_bind().dialect.name
+    if strategy is None:
+        if dialect == "postgresql":
+            strategy = "copy" if df.size >= COPY_THRESHOLD else "values"
+        elif dialect == "sqlite":
+            strategy = "executemany"
+        else:
+            raise ValueError(f"Upserts are not supported on {dialect}")
+
+    if strategy == "copy":
+        return copy_upsert(session, table, df, conflict_columns)
+
+    started = time.perf_counter()
+    df = df.drop_duplicates(subset=conflict_columns, keep="last")
+    if strategy == "values":
+        written = _values_upsert(session, table, df, conflict_columns)
+    elif strategy == "executemany":
+        written = _executemany_upsert(session, table, df, conflict_columns)
+    else:
+        raise ValueError(f"Unknown upsert strategy: {strategy}")
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Upserted {written} rows into {table.name} ({dialect}, {strategy}) in "
+        f"{elapsed:.2f}s ({written / max(elapsed, 1e-9):,.0f} rows/s)."
+    )
+    return written
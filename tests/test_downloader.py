@@ -0,0 +1,122 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.fetcher import ChunkedDownloader
+
+
+def ticker_frame(symbols, start_date, end_date):
+    # A yf.download(group_by="ticker")-shaped frame of constant bars
+    dates = pd.bdate_range(start_date, end_date, inclusive="left")
+    return pd.concat(
+        {
+            symbol: pd.DataFrame(
+                {column: 1.0 for column in ("Open", "High", "Low", "Close", "Volume")},
+                index=dates,
+            )
+            for symbol in symbols
+        },
+        axis=1,
+    )
+
+
+class FakeTransport:
+    """Records calls and fails the first `failures[symbol]` calls of a chunk."""
+
+    def __init__(self, failures=None, empty=()):
+        self.failures = dict(failures or {})
+        self.empty = set(empty)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, symbols, start_date, end_date):
+        with self.lock:
+            self.calls.append(list(symbols))
+            if self.failures.get(symbols[0], 0) > 0:
+                self.failures[symbols[0]] -= 1
+                raise ConnectionError("rate limited")
+        frame = ticker_frame(symbols, start_date, end_date)
+        for symbol in self.empty & set(symbols):
+            frame[symbol] = np.nan
+        return frame
+
+
+SYMBOLS = [f"S{i}.TO" for i in range(7)]
+
+
+def download(downloader, symbols=SYMBOLS):
+    chunks = list(downloader.iter_chunks(symbols, "2024-01-01", "2024-01-10"))
+    return chunks, {s: f for chunk in chunks for s, f in chunk.items()}
+
+
+def test_splits_symbols_into_chunks():
+    transport = FakeTransport()
+    chunks, frames = download(ChunkedDownloader(transport, chunk_size=3, max_workers=2))
+    assert sorted(map(tuple, transport.calls)) == [
+        tuple(SYMBOLS[0:3]),
+        tuple(SYMBOLS[3:6]),
+        tuple(SYMBOLS[6:7]),
+    ]
+    assert sorted(len(chunk) for chunk in chunks) == [1, 3, 3]
+    assert sorted(frames) == SYMBOLS
+    assert list(frames["S0.TO"].columns) == ["Open", "High", "Low", "Close", "Volume"]
+
+
+def test_retries_failed_chunks_with_backoff():
+    transport = FakeTransport(failures={"S0.TO": 2})
+    sleeps = []
+    downloader = ChunkedDownloader(
+        transport, chunk_size=3, max_workers=1, backoff_base=0.5, sleep=sleeps.append
+    )
+    _, frames = download(downloader)
+    assert sleeps == [0.5, 1.0]
+    assert transport.calls.count(SYMBOLS[0:3]) == 3
+    assert sorted(frames) == SYMBOLS
+    assert downloader.failures == {}
+
+
+def test_backoff_is_capped():
+    transport = FakeTransport(failures={"S0.TO": 3})
+    sleeps = []
+    downloader = ChunkedDownloader(
+        transport, chunk_size=7, backoff_base=1.0, backoff_max=2.5, sleep=sleeps.append
+    )
+    download(downloader)
+    assert sleeps == [1.0, 2.0, 2.5]
+
+
+def test_reports_failures_per_symbol():
+    # The first chunk never succeeds; one symbol of another chunk has no data
+    transport = FakeTransport(failures={"S0.TO": 10}, empty={"S4.TO"})
+    downloader = ChunkedDownloader(
+        transport, chunk_size=3, max_retries=2, sleep=lambda _: None
+    )
+    _, frames = download(downloader)
+    assert sorted(frames) == ["S3.TO", "S5.TO", "S6.TO"]
+    assert set(downloader.failures) == {"S0.TO", "S1.TO", "S2.TO", "S4.TO"}
+    assert downloader.failures["S0.TO"] == "rate limited"
+    assert downloader.failures["S4.TO"] == "no data returned"
+    assert transport.calls.count(SYMBOLS[0:3]) == 3
+
+
+def test_yields_chunks_while_downloading():
+    # The consumer sees the first chunk before later chunks are requested, and
+    # no more than max_workers chunks are in flight at once
+    transport = FakeTransport()
+    downloader = ChunkedDownloader(transport, chunk_size=1, max_workers=2)
+    chunks = downloader.iter_chunks(SYMBOLS, "2024-01-01", "2024-01-10")
+    first = next(chunks)
+    assert len(first) == 1
+    assert len(transport.calls) <= 3
+    rest = list(chunks)
+    assert len(rest) == len(SYMBOLS) - 1
+    assert len(transport.calls) == len(SYMBOLS)
+
+
+def test_rejects_invalid_sizes():
+    with pytest.raises(ValueError):
+        ChunkedDownloader(FakeTransport(), chunk_size=0)
+    with pytest.raises(ValueError):
+        ChunkedDownloader(FakeTransport(), max_workers=0)
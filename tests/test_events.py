@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtesting.events import BarBatch, Broker
+
+
+def batch(day, open_, high, low, close):
+    return BarBatch(
+        pd.Timestamp(day),
+        np.array(["AAA.TO"]),
+        np.array([0]),
+        {
+            "open": np.array([open_]),
+            "high": np.array([high]),
+            "low": np.array([low]),
+            "close": np.array([close]),
+        },
+    )
+
+
+def test_stop_fills_at_open_gapping_through_it():
+    broker = Broker(10_000)
+    broker.buy("AAA.TO", 50, stop_loss=0.1)
+    broker.process(batch("2024-01-02", 100, 101, 99, 100))
+    broker.process(batch("2024-01-03", 85, 86, 84, 85))
+    assert not broker.positions
+    assert broker.cash == pytest.approx(10_000 - 50 * 100 + 50 * 85)
+
+
+def test_stop_on_bar_without_open_fills_at_stop():
+    broker = Broker(10_000)
+    broker.buy("AAA.TO", 50, stop_loss=0.1)
+    broker.process(batch("2024-01-02", 100, 101, 99, 100))
+    broker.process(batch("2024-01-03", np.nan, 92, 85, 88))
+    assert not broker.positions
+    assert broker.cash == pytest.approx(10_000 - 50 * 100 + 50 * 90)
+    assert broker.equity == pytest.approx(broker.cash)
+    assert broker.trades[0][-1] == "stop"
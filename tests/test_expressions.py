@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analysis.expressions import (
+    compile_expression,
+    evaluate_masks,
+    evaluate_matrix_masks,
+    max_lag,
+    required_columns,
+)
+
+
+def frame(columns, symbols=("AAA.TO", "BBB.TO")):
+    # Equal-length histories per symbol, grouped and in date order
+    n = len(next(iter(columns.values()))) // len(symbols)
+    return pd.DataFrame(
+        {
+            "symbol": np.repeat(symbols, n),
+            "date": np.tile(pd.bdate_range("2024-01-01", periods=n), len(symbols)),
+            **columns,
+        }
+    )
+
+
+def masks(data, **expressions):
+    nodes = {name: compile_expression(text) for name, text in expressions.items()}
+    return evaluate_masks(data, nodes)
+
+
+def test_lag_does_not_cross_symbols():
+    # BBB's first bar follows AAA's last one in x, but has no previous bar
+    data = frame({"x": [1.0, 2, 3, 4, 5, 6]})
+    result = masks(data, step="x == lag(x) + 1", two="x == lag(x, 2) + 2")
+    np.testing.assert_array_equal(result["step"], [0, 1, 1, 0, 1, 1])
+    np.testing.assert_array_equal(result["two"], [0, 0, 1, 0, 0, 1])
+
+
+def test_cross_does_not_cross_symbols():
+    # AAA ends below b and BBB starts above it: not a cross
+    data = frame({"a": [0.0, 0, 0, 0, 2, 2, 0, 2], "b": [1.0] * 8})
+    result = masks(data, above="cross_above(a, b)", below="cross_below(a, b)")
+    np.testing.assert_array_equal(result["above"], [0, 0, 0, 0, 0, 0, 0, 1])
+    np.testing.assert_array_equal(result["below"], [0, 0, 0, 0, 0, 0, 1, 0])
+
+
+def test_unsorted_rows_are_evaluated_per_symbol_in_date_order():
+    data = frame({"x": [1.0, 2, 3, 4, 5, 6]})
+    expected = masks(data, step="x == lag(x) + 1")["step"]
+    shuffled = data.sample(frac=1, random_state=1)
+    result = masks(shuffled, step="x == lag(x) + 1")["step"]
+    np.testing.assert_array_equal(result, expected[shuffled.index])
+
+
+def test_symbol_shorter_than_lag():
+    data = pd.DataFrame(
+        {
+            "symbol": ["AAA.TO", "BBB.TO", "BBB.TO", "BBB.TO"],
+            "date": pd.to_datetime(
+                ["2024-01-01", "2024-01-01", "2024-01-02", "2024-01-03"]
+            ),
+            "x": [1.0, 2, 3, 4],
+        }
+    )
+    result = masks(data, two="x == lag(x, 2) + 2")["two"]
+    np.testing.assert_array_equal(result, [0, 0, 0, 1])
+
+
+def test_matrix_lag_does_not_cross_symbols():
+    # (dates × symbols): the second column starts where the first one ends
+    x = np.array([[1.0, 4], [2, 5], [3, 6]])
+    result = evaluate_matrix_masks(
+        {"x": x}, {"step": compile_expression("x == lag(x) + 1")}
+    )["step"]
+    np.testing.assert_array_equal(result, [[0, 0], [1, 1], [1, 1]])
+
+
+@pytest.mark.parametrize(
+    "text, columns, lag",
+    [
+        ("RSI < 30", ["RSI"], 0),
+        ("cross_above(SMA50, SMA200)", ["SMA50", "SMA200"], 1),
+        (
+            "close > SMA200 and SMA200 > lag(SMA200, 5) and RSI < 40",
+            ["close", "SMA200", "RSI"],
+            5,
+        ),
+        ("lag(lag(close, 2), 3) < close", ["close"], 5),
+        ("cross_below(lag(close, 2), BB_Lower)", ["close", "BB_Lower"], 3),
+    ],
+)
+def test_required_columns_and_max_lag(text, columns, lag):
+    n = compile_expression(text)
+    assert required_columns(n) == columns
+    assert max_lag(n) == lag
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "RSI <",
+        "close ** 2 > 1",
+        "close.mean() > 1",
+        "unknown(close) > 1",
+        "lag(close, 0) > 1",
+        "lag(close, 1.5) > 1",
+        "lag(close, RSI) > 1",
+        "lag(close, periods=2) > 1",
+        "'RSI' < 30",
+    ],
+)
+def test_invalid_expressions(text):
+    with pytest.raises(ValueError):
+        compile_expression(text)
+
+
+def test_non_condition_and_missing_columns():
+    data = frame({"x": [1.0, 2, 3, 4]})
+    with pytest.raises(ValueError, match="not a condition"):
+        masks(data, value="x + 1")
+    with pytest.raises(KeyError, match="RSI"):
+        masks(data, oversold="RSI < 30")
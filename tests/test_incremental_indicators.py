@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.fetcher import DataService, StockRepository
+from src.data.sources import ReplaySource
+from src.database.init_db import init_db
+
+SYMBOLS = ["AAA.TO", "BBB.TO", "CCC.TO"]
+START, SPLIT, END = "2023-01-02", "2024-03-01", "2024-05-01"
+
+
+def write_bars(path, revise=None):
+    # Random-walk bars; revise=(symbol, date, factor) scales one bar's prices
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(START, END, inclusive="left")
+    frames = []
+    for symbol in SYMBOLS:
+        close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+        frames.append(
+            pd.DataFrame(
+                {
+                    "symbol": symbol,
+                    "date": dates.date,
+                    "open": close * 0.995,
+                    "high": close * 1.01,
+                    "low": close * 0.99,
+                    "close": close,
+                    "volume": rng.integers(1_000, 100_000, len(dates)),
+                }
+            )
+        )
+    bars = pd.concat(frames, ignore_index=True)
+    if revise:
+        symbol, day, factor = revise
+        row = (bars["symbol"] == symbol) & (bars["date"] == pd.Timestamp(day).date())
+        assert row.sum() == 1
+        bars.loc[row, ["open", "high", "low", "close"]] *= factor
+    bars.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "stocks.db"
+    init_db(str(path))
+    StockRepository.clear_stock_id_cache()
+    return f"sqlite:///{path}"
+
+
+def update_indicators(service):
+    for time_frame in ("daily", "weekly"):
+        service.update_indicators_incremental(SYMBOLS, time_frame=time_frame)
+
+
+def read_indicators(service):
+    return {
+        time_frame: service.get_stock_data_with_indicators(
+            SYMBOLS, START, END, time_frame=time_frame, float_dtype=np.float64
+        )
+        for time_frame in ("daily", "weekly")
+    }
+
+
+def assert_matches_rebuild(service):
+    incremental = read_indicators(service)
+    for time_frame in ("daily", "weekly"):
+        service.update_indicators_incremental(
+            SYMBOLS, time_frame=time_frame, rebuild=True
+        )
+    rebuilt = read_indicators(service)
+    for time_frame, frame in incremental.items():
+        assert not frame.empty
+        pd.testing.assert_frame_equal(frame, rebuilt[time_frame])
+
+
+def test_incremental_matches_rebuild(tmp_path, database):
+    csv = write_bars(tmp_path / "bars.csv")
+    service = DataService(database, source=ReplaySource(csv))
+    service.update_all_stocks(SYMBOLS, START, SPLIT)
+    update_indicators(service)
+    service.update_all_stocks(SYMBOLS, START, END, incremental=True)
+    update_indicators(service)
+    assert_matches_rebuild(service)
+
+
+def test_revision_inside_overlap_window_replays(tmp_path, database):
+    # The second download revises a bar a few days before the first one's
+    # last bar (inside the overlap window, but not the saved state's last bar)
+    first = write_bars(tmp_path / "first.csv")
+    second = write_bars(tmp_path / "second.csv", revise=("BBB.TO", "2024-02-27", 1.05))
+    service = DataService(database, source=ReplaySource(first))
+    service.update_all_stocks(SYMBOLS, START, SPLIT)
+    update_indicators(service)
+
+    service.source = ReplaySource(second)
+    service.update_all_stocks(SYMBOLS, START, END, incremental=True)
+    update_indicators(service)
+    assert_matches_rebuild(service)
+
+
+def test_recalculate_after_incremental_skips_unchanged_rows(tmp_path, database):
+    # The two engines differ only by rounding, which must not count as a change
+    csv = write_bars(tmp_path / "bars.csv")
+    service = DataService(database, source=ReplaySource(csv))
+    service.update_all_stocks(SYMBOLS, START, END)
+    update_indicators(service)
+    for time_frame in ("daily", "weekly"):
+        counts = service.update_indicators(SYMBOLS, START, END, time_frame=time_frame)
+        assert counts["written"] == 0 and counts["deleted"] == 0
+        assert counts["skipped"] > 0
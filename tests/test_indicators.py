@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from src.analysis.batch import calculate_indicator_matrix, indicator_registry
+from src.analysis.indicators import IncrementalIndicators
+from src.data.fetcher import INDICATOR_RTOL
+
+
+@pytest.mark.parametrize("time_frame", ["daily", "weekly"])
+def test_incremental_kernels_match_batch_engine(time_frame):
+    # Right-aligned closes as build_price_matrix lays them out, one symbol
+    # with a shorter history
+    rng = np.random.default_rng(0)
+    closes = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, (600, 4)), axis=0))
+    closes[:250, 3] = np.nan
+
+    incremental = IncrementalIndicators(4, time_frame).run(closes)
+    batch = calculate_indicator_matrix(closes, time_frame)
+    for name in indicator_registry:
+        np.testing.assert_allclose(
+            incremental[name], batch[name], rtol=INDICATOR_RTOL, atol=0, err_msg=name
+        )
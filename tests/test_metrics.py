@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from src.backtesting.metrics import METRICS, RunningMetrics, summary_metrics
+
+
+def streamed(returns, trade_returns=()):
+    metrics = RunningMetrics()
+    for ret in returns:
+        metrics.update(ret, 1.0)
+    for trade_return in trade_returns:
+        metrics.add_trade(trade_return)
+    return metrics.summary()
+
+
+def test_running_metrics_match_batch():
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0.0005, 0.01, 500)
+    trade_returns = rng.normal(0.01, 0.05, 40)
+    batch = summary_metrics(returns, trade_returns, np.ones(500))
+    online = streamed(returns, trade_returns)
+    for name in METRICS:
+        assert online[name] == pytest.approx(batch[name], nan_ok=True), name
+
+
+@pytest.mark.parametrize("ret", [0.001, -0.001, 0.0])
+def test_constant_returns_have_no_sharpe(ret):
+    # Rounding noise in the deviations of a constant curve is not variance
+    returns = np.full(300, ret)
+    for metrics in (summary_metrics(returns, [], np.ones(300)), streamed(returns)):
+        assert np.isnan(metrics["sharpe"])
+        if ret >= 0:
+            assert np.isnan(metrics["sortino"])
+        else:
+            assert metrics["sortino"] == pytest.approx(-np.sqrt(252))
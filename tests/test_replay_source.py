@@ -0,0 +1,89 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.data.sources import ReplaySource
+
+SYMBOLS = ["AAA.TO", "BBB.TO", "CCC.TO"]
+
+
+@pytest.fixture
+def bars():
+    dates = pd.bdate_range("2024-01-01", periods=20)
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(
+        [(symbol, day.date()) for symbol in SYMBOLS for day in dates],
+        columns=["symbol", "date"],
+    )
+    close = rng.uniform(10, 20, len(frame))
+    frame["open"] = close * 0.99
+    frame["high"] = close * 1.01
+    frame["low"] = close * 0.98
+    frame["close"] = close
+    frame["volume"] = rng.integers(1_000, 10_000, len(frame))
+    return frame
+
+
+def replayed(source, symbols=SYMBOLS, start="2024-01-03", end="2024-01-20"):
+    frames = {}
+    for chunk in source.iter_chunks(symbols, start, end):
+        frames.update(chunk)
+    return frames
+
+
+def check(frames, bars, start="2024-01-03", end="2024-01-20"):
+    assert sorted(frames) == SYMBOLS
+    for symbol, frame in frames.items():
+        expected = bars[
+            (bars["symbol"] == symbol)
+            & (pd.to_datetime(bars["date"]) >= start)
+            & (pd.to_datetime(bars["date"]) < end)
+        ]
+        assert list(frame.columns) == ["Open", "High", "Low", "Close", "Volume"]
+        assert list(frame.index) == list(pd.to_datetime(expected["date"]))
+        np.testing.assert_allclose(frame["Close"], expected["close"])
+
+
+def test_replays_parquet_file(tmp_path, bars):
+    path = str(tmp_path / "bars.parquet")
+    bars.to_parquet(path, index=False)
+    check(replayed(ReplaySource(path, chunk_size=2)), bars)
+
+
+def test_replays_parquet_dataset_directory(tmp_path, bars):
+    directory = tmp_path / "bars"
+    directory.mkdir()
+    for i, symbol in enumerate(SYMBOLS):
+        part = bars[bars["symbol"] == symbol]
+        pq.write_table(
+            pa.Table.from_pandas(part, preserve_index=False),
+            str(directory / f"part-{i}.parquet"),
+        )
+    check(replayed(ReplaySource(str(directory), chunk_size=2)), bars)
+
+
+def test_replays_csv(tmp_path, bars):
+    path = str(tmp_path / "bars.csv")
+    bars.to_csv(path, index=False)
+    check(replayed(ReplaySource(path)), bars)
+
+
+def test_reports_symbols_without_bars(tmp_path, bars):
+    path = str(tmp_path / "bars.parquet")
+    bars.to_parquet(path, index=False)
+    source = ReplaySource(path)
+    frames = replayed(source, SYMBOLS + ["ZZZ.TO"])
+    assert sorted(frames) == SYMBOLS
+    assert source.failures == {"ZZZ.TO": "no data in replay file"}
+
+
+def test_record_round_trip(tmp_path, bars):
+    source = ReplaySource(os.fspath(tmp_path / "bars.csv"))
+    bars.to_csv(source.path, index=False)
+    path = str(tmp_path / "recorded" / "bars.parquet")
+    ReplaySource.record(source, SYMBOLS, "2024-01-03", "2024-01-20", path)
+    check(replayed(ReplaySource(path)), bars)
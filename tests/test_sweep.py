@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analysis.batch import rsi
+from src.backtesting.strategies import strategy_registry
+from src.backtesting.sweep import parameter_grid, run_sweep
+from src.backtesting.vectorized import MarketData, run_backtest
+
+
+@pytest.fixture
+def market():
+    # Random walks with missing bars, and a stored RSI the strategies must not
+    # read in place of their computed one
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (300, 6)), axis=0))
+    close[rng.random(close.shape) < 0.02] = np.nan
+    open_ = close * np.exp(rng.normal(0, 0.005, close.shape))
+    return MarketData(
+        pd.bdate_range("2020-01-01", periods=300).values,
+        np.array([f"S{i}.TO" for i in range(6)]),
+        {"open": open_, "close": close, "RSI": rng.uniform(0, 100, close.shape)},
+    )
+
+
+@pytest.mark.parametrize(
+    "name, grid",
+    [
+        ("rsi_reversion", {"period": [7, 14], "exit_threshold": [50, 60]}),
+        ("macd_cross", {"fast": [8, 12], "slow": [26], "signal": [9]}),
+    ],
+)
+def test_sweep_rows_match_direct_backtests(market, name, grid):
+    results = run_sweep(market, name, grid=grid, workers=2, chunk_size=1, fee=0.001)
+    strategy_class = strategy_registry[name]
+    assert len(results) == len(parameter_grid(grid))
+    for row in results.to_dict("records"):
+        strategy = strategy_class(**{param: row[param] for param in grid})
+        expected = run_backtest(market, *strategy.signals(market), fee=0.001)
+        for metric, value in expected.summary().items():
+            assert row[metric] == pytest.approx(value, nan_ok=True), (row, metric)
+
+    # The grid holds the default parameters: their row is the default strategy's
+    default = strategy_class()
+    row = results.loc[
+        np.logical_and.reduce(
+            [results[param] == getattr(default, param) for param in grid]
+        )
+    ].iloc[0]
+    expected = run_backtest(market, *default.signals(market), fee=0.001).summary()
+    for metric, value in expected.items():
+        assert row[metric] == pytest.approx(value, nan_ok=True), metric
+
+
+def test_default_columns_are_computed_like_other_periods(market):
+    # The default RSI period reads the closes' RSI, not the stored column
+    strategy = strategy_registry["rsi_reversion"]()
+    entries, _ = strategy.signals(market)
+    computed = rsi(market.columns["close"], 14)
+    np.testing.assert_array_equal(entries, np.nan_to_num(computed, nan=100) < 30)
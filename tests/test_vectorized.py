@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtesting.vectorized import MarketData, positions_from_signals, run_backtest
+
+OPEN = [10.0, 10.5, 11.5, 12.0, 12.0]
+CLOSE = [10.0, 11.0, 12.0, 11.0, 13.0]
+
+
+def market(n_symbols=1):
+    # AAA.TO trades OPEN/CLOSE; other symbols stay flat at 10
+    dates = pd.bdate_range("2024-01-01", periods=len(CLOSE)).values
+    open_ = np.full((len(CLOSE), n_symbols), 10.0)
+    close = np.full((len(CLOSE), n_symbols), 10.0)
+    open_[:, 0], close[:, 0] = OPEN, CLOSE
+    symbols = np.array(["AAA.TO", "BBB.TO", "CCC.TO"][:n_symbols])
+    return MarketData(dates, symbols, {"open": open_, "close": close})
+
+
+def signals(n_symbols=1, entry=0, exit=2):
+    entries = np.zeros((len(CLOSE), n_symbols), bool)
+    exits = np.zeros((len(CLOSE), n_symbols), bool)
+    entries[entry, 0] = True
+    if exit is not None:
+        exits[exit, 0] = True
+    return entries, exits
+
+
+def test_positions_from_signals():
+    entries = np.array([1, 0, 1, 0, 0, 1], bool)[:, None]
+    exits = np.array([0, 0, 0, 1, 0, 1], bool)[:, None]
+    # Repeated entries keep the position, an exit wins over an entry
+    np.testing.assert_array_equal(
+        positions_from_signals(entries, exits)[:, 0], [1, 1, 1, 0, 0, 0]
+    )
+
+
+@pytest.mark.parametrize(
+    "fill, returns, entry, exit",
+    [
+        # Filled at the signal bars' closes: 10 -> 12
+        ("close", [0, 11 / 10 - 1, 12 / 11 - 1, 0, 0], 10.0, 12.0),
+        # Filled at the next opens: 10.5 -> 12, holding bar 2 overnight
+        ("next_open", [0, 11 / 10.5 - 1, 12 / 11 - 1, 12 / 12 - 1, 0], 10.5, 12.0),
+    ],
+)
+def test_fills(fill, returns, entry, exit):
+    result = run_backtest(market(), *signals(), fill=fill)
+    np.testing.assert_allclose(result.portfolio_returns, returns)
+    trade = result.trades.iloc[0]
+    assert len(result.trades) == 1 and not trade["open"]
+    assert (trade["entry_price"], trade["exit_price"]) == (entry, exit)
+    assert trade["return"] == pytest.approx(exit / entry - 1)
+    assert result.equity[-1] == pytest.approx(exit / entry)
+
+
+@pytest.mark.parametrize("fill", ["close", "next_open"])
+def test_fees_are_paid_on_both_fills(fill):
+    fee = 0.01
+    plain = run_backtest(market(), *signals(), fill=fill)
+    result = run_backtest(market(), *signals(), fill=fill, fee=fee)
+    traded = np.flatnonzero(result.returns[:, 0] != plain.returns[:, 0])
+    assert len(traded) == 2
+    np.testing.assert_allclose(
+        1 + result.returns[traded, 0], (1 + plain.returns[traded, 0]) * (1 - fee)
+    )
+    expected = (1 + plain.trades["return"].iloc[0]) * (1 - fee) ** 2 - 1
+    assert result.trades["return"].iloc[0] == pytest.approx(expected)
+
+
+def test_weighting():
+    by_positions = run_backtest(market(2), *signals(2), fill="close")
+    by_universe = run_backtest(
+        market(2), *signals(2), fill="close", weighting="universe"
+    )
+    single = run_backtest(market(), *signals(), fill="close")
+    # One position held: it gets the whole portfolio, or half of it
+    np.testing.assert_allclose(by_positions.portfolio_returns, single.portfolio_returns)
+    np.testing.assert_allclose(
+        by_universe.portfolio_returns, single.portfolio_returns / 2
+    )
+    np.testing.assert_array_equal(by_positions.exposure, [0, 1, 1, 0, 0])
+    np.testing.assert_array_equal(by_universe.exposure, [0, 0.5, 0.5, 0, 0])
+    with pytest.raises(ValueError):
+        run_backtest(market(), *signals(), weighting="equal")
+
+
+@pytest.mark.parametrize("fill", ["close", "next_open"])
+def test_trade_returns_compound_the_equity_curve(fill):
+    # One symbol, positions weighting: the curve is the trades back to back
+    entries = np.array([1, 0, 0, 1, 0], bool)[:, None]
+    exits = np.array([0, 1, 0, 0, 0], bool)[:, None]
+    result = run_backtest(market(), entries, exits, fill=fill, fee=0.002)
+    trades = result.trades
+    assert len(trades) == 2 and trades["open"].tolist() == [False, True]
+    assert np.isnan(trades["exit_price"].iloc[1])
+    assert result.equity[-1] == pytest.approx(np.prod(1 + trades["return"]))
+
+
+def test_entry_on_last_bar_does_not_fill_at_next_open():
+    result = run_backtest(market(), *signals(entry=4, exit=None), fill="next_open")
+    assert result.trades.empty
+    assert result.equity[-1] == 1.0
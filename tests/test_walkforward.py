@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtesting.vectorized import MarketData
+from src.backtesting.walkforward import Window, run_walk_forward, walk_forward_windows
+
+
+@pytest.fixture
+def market():
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (400, 5)), axis=0))
+    open_ = close * np.exp(rng.normal(0, 0.005, close.shape))
+    return MarketData(
+        pd.bdate_range("2020-01-01", periods=400).values,
+        np.array([f"S{i}.TO" for i in range(5)]),
+        {"open": open_, "close": close},
+    )
+
+
+def test_walk_forward_windows():
+    assert walk_forward_windows(10, 4, 3) == [
+        Window(0, 4, 7),
+        Window(3, 7, 10),
+    ]
+    assert walk_forward_windows(10, 4, 3, step=2, anchored=True) == [
+        Window(0, 4, 7),
+        Window(0, 6, 9),
+        Window(0, 8, 10),
+    ]
+    assert walk_forward_windows(4, 4, 3) == []
+
+
+@pytest.mark.parametrize("step", [None, 40, 25])
+def test_stitched_out_of_sample_periods_do_not_overlap(market, step):
+    result = run_walk_forward(
+        market,
+        "rsi_reversion",
+        grid={"period": [7, 14], "exit_threshold": [50, 60]},
+        in_sample=200,
+        out_of_sample=60,
+        step=step,
+        workers=2,
+    )
+    # Every out-of-sample bar once, in order, from the first window's start
+    assert len(result.returns) == len(result.dates) == len(result.exposure)
+    assert (np.diff(result.dates.astype("int64")) > 0).all()
+    np.testing.assert_array_equal(result.dates, market.dates[200:])
+
+    windows = result.windows
+    starts = windows["out_of_sample_start"].to_numpy()
+    ends = windows["out_of_sample_end"].to_numpy()
+    assert (starts[1:] > ends[:-1]).all()
+    # Window metrics and the stitched curve count the same trades
+    assert windows["out_of_sample_trades"].sum() == len(result.trade_returns)
+    assert result.summary()["trades"] == len(result.trade_returns)